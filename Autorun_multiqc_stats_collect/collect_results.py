@@ -1,69 +1,544 @@
 #!/usr/bin/env python3
 import json
+import hashlib
+import io
 import argparse
 import sys
 import os
-import subprocess
-from typing import List, Dict, Union
-try:
-    import pyEager
-except ImportError:
-    print("Installing required package 'pyEager'", file=sys.stderr)
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "pyEager"])
-    import pyEager
-import pandas as pd
-import numpy as np
+import re
+import mmap
+import gzip
+import heapq
+import shutil
+import tempfile
+import importlib.util
+import threading
+import sqlite3
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, lru_cache
+from contextlib import contextmanager
+from typing import List, Dict, Union, Tuple, Any, TYPE_CHECKING
+## Heavy and optional packages (numpy, pandas, pyarrow, ijson, PyYAML, asyncio) are only imported by the functions that need them,
+## so that small runs, --help and --version start quickly. Missing packages are reported, never installed automatically.
+if TYPE_CHECKING:
+    import asyncio
 try:
     import pyPandoraHelper as pH
 except ImportError:
-    print("Installing required package 'pyPandoraHelper'", file=sys.stderr)
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "/mnt/archgen/tools/helper_scripts/py_helpers/"])
-    import pyPandoraHelper as pH
+    sys.exit("ERROR: This script requires pyPandoraHelper. Please install it with 'pip install /mnt/archgen/tools/helper_scripts/py_helpers/'.")
+
+VERSION = "1.27.1"
+
+JSON_PARSERS = ["auto", "ijson", "scan", "full"]
+
+ANALYSIS_TYPES = ["SG", "TF", "TM", "RP", "RM", "IM", "YC"]
+
+OUTPUT_FORMATS = ["tsv", "parquet", "feather", "csv.gz"]
+## The optional packages needed to write each output format
+OUTPUT_FORMAT_REQUIREMENTS = {
+    "tsv": [],
+    "parquet": ["pandas", "pyarrow"],
+    "feather": ["pandas", "pyarrow"],
+    "csv.gz": ["pandas"],
+}
+## The packages needed to compute the read length stats from the mapDamage results
+READ_LENGTH_REQUIREMENTS = ["numpy"]
+
+def get_missing_packages(packages: List[str]) -> List[str]:
+    '''
+    Returns the packages that are not installed, without importing any of them.
+    '''
+    return [package for package in packages if importlib.util.find_spec(package) is None]
+
+@lru_cache(maxsize=None)
+def _import_ijson():
+    '''
+    Imports ijson on first use. Returns None if it is not installed.
+    '''
+    try:
+        import ijson
+    except ImportError:
+        return None
+    return ijson
+
+def _read_general_stats_ijson(mqc_data: str) -> Union[Dict[str, Dict], None]:
+    '''
+    Streams the MultiQC data JSON with ijson, and returns the general stats as soon as they have been parsed.
+    Returns None if the general stats could not be found or parsed (e.g. ijson does not support NaN values).
+    '''
+    ijson = _import_ijson()
+    try:
+        with open(mqc_data, "rb") as f:
+            for general_stats in ijson.items(f, "report_saved_raw_data.multiqc_general_stats", use_float=True):
+                return general_stats
+    except ijson.JSONError:
+        return None
+    return None
+
+def _read_general_stats_scan(mqc_data: str) -> Union[Dict[str, Dict], None]:
+    '''
+    Memory-maps the MultiQC data JSON, searches for the general stats key and decodes only the value of that key.
+    The search relies on the layout MultiQC writes the file in (json.dump with indent=4): since strings cannot contain line
+    breaks, a key at the start of a line indented by 4 spaces is a key of the top-level object, and a key indented by 8 spaces
+    between it and the next line indented by 4 spaces is a key of its value. Returns None if the file has a different layout,
+    or the general stats could not be found or parsed.
+    '''
+    with open(mqc_data, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            ## Empty file
+            return None
+    with mm:
+        ## Matches elsewhere, e.g. in string values or nested objects, are not at these indentation levels.
+        if mm[:7] != b'{\n    "':
+            return None
+        start = mm.find(b'\n    "report_saved_raw_data": {\n')
+        if start == -1:
+            return None
+        end = mm.find(b"\n    }", start)
+        if end == -1:
+            return None
+        start = mm.find(b'\n        "multiqc_general_stats":', start, end)
+        if start == -1:
+            return None
+        separator = re.compile(rb"\s*:\s*").match(mm, start + len(b'\n        "multiqc_general_stats"'))
+        if separator is None:
+            return None
+        ## Decode increasingly large windows, until the window contains the whole value.
+        decoder = json.JSONDecoder()
+        start = separator.end()
+        window = 1 << 20
+        while True:
+            try:
+                general_stats, _ = decoder.raw_decode(mm[start:start + window].decode("utf-8", errors="replace"))
+            except json.JSONDecodeError:
+                if start + window >= len(mm):
+                    return None
+                window *= 4
+                continue
+            if not isinstance(general_stats, dict):
+                return None
+            return general_stats
+
+def read_general_stats(mqc_data: str, json_parser: str = "auto") -> Dict[str, Dict]:
+    '''
+    Reads report_saved_raw_data.multiqc_general_stats from a MultiQC data JSON. The rest of the file (plot data, raw
+    module data etc.) can be hundreds of MB, so by default only the general stats are extracted, using a memory-mapped
+    search, or ijson if that fails and ijson is installed. If neither works, the whole file is loaded instead.
+    '''
+    general_stats = None
+    if json_parser in ["auto", "scan"]:
+        general_stats = _read_general_stats_scan(mqc_data)
+    if general_stats is None and (json_parser == "ijson" or (json_parser == "auto" and _import_ijson() is not None)):
+        if _import_ijson() is None:
+            raise ImportError("The 'ijson' JSON parser was requested, but the package 'ijson' is not installed.")
+        general_stats = _read_general_stats_ijson(mqc_data)
+    if general_stats is None:
+        with open(mqc_data, "r") as json_file:
+            general_stats = json.load(json_file)["report_saved_raw_data"]["multiqc_general_stats"]
+    return general_stats
+
+## The layout of the MultiQC general stats differs between nf-core/eager (and MultiQC) versions. The schema maps each
+## output column to its source keys in each known version. A different schema can be loaded from a JSON/YAML file with --schema.
+BUILTIN_SCHEMA = {
+    ## Each version is detected by the presence of any of its marker keys in the general stats of a library.
+    ## Versions are checked in order, so newer versions should come first.
+    "versions": [
+        {
+            "name": "eager-2.5",
+            "markers": ["mapDamage_mqc-generalstats-mapdamage-mapdamage_3_Prime1"],
+            ## The read length stats are not in the general stats, but computed from the mapDamage results
+            "mapdamage_read_lengths": {
+                "mean": "mean_read_length",
+                "median": "median_read_length",
+                "std": "read_length_std_dev",
+            },
+        },
+        {
+            "name": "eager-2.4",
+            "markers": ["DamageProfiler_mqc-generalstats-damageprofiler-3_Prime1"],
+        },
+    ],
+    ## eager 2.5.0 also splits some library stats by UDG treatment, in keys like <Library_ID>_udg<treatment>.
+    "library_key_separators": ["_udg"],
+    ## Columns of the eager input TSV that are added to the stats of each library
+    "tsv_columns": ["UDG_Treatment", "Strandedness"],
+    ## The output columns, in order. "name" is the human-readable header and "header" the original one.
+    ## "sources" lists the general stats keys a column is taken from, in order of preference, either for all versions,
+    ## or per version. If omitted, the column is taken from the key "header". Columns without a source are N/A.
+    "columns": [
+        {
+            "name": "Covered_SNPs_on_1240K",
+            "header": "snps_covered",
+            "sources": {
+                "eager-2.5": ["base snp_coverage_mqc-generalstats-base_snp_coverage-Covered_Snps"],
+                "eager-2.4": ["snp_coverage_mqc-generalstats-snp_coverage-Covered_Snps"],
+            },
+        },
+        {
+            "name": "Total_SNPs_on_1240K",
+            "header": "snps_total",
+            "sources": {
+                "eager-2.5": ["base snp_coverage_mqc-generalstats-base_snp_coverage-Total_Snps"],
+                "eager-2.4": ["snp_coverage_mqc-generalstats-snp_coverage-Total_Snps"],
+            },
+        },
+        {"name": "Nr_of_input_reads", "header": "Samtools Flagstat (pre-samtools filter)_mqc-generalstats-samtools_flagstat_pre_samtools_filter-flagstat_total"},
+        {"name": "Nr_of_mapped_reads", "header": "Samtools Flagstat (pre-samtools filter)_mqc-generalstats-samtools_flagstat_pre_samtools_filter-mapped_passed"},
+        {"name": "Nr_of_input_reads_over_30bp", "header": "Samtools Flagstat (post-samtools filter)_mqc-generalstats-samtools_flagstat_post_samtools_filter-flagstat_total"},
+        {
+            "name": "%_Endogenous_DNA",
+            "header": "endogenous",
+            "sources": {
+                "eager-2.5": ["base endorSpy_mqc-generalstats-base_endorspy-endogenous_dna"],
+                "eager-2.4": ["endorSpy_mqc-generalstats-endorspy-endogenous_dna"],
+            },
+        },
+        {"name": "Nr_of_mapped_reads_over_30bp", "header": "Samtools Flagstat (post-samtools filter)_mqc-generalstats-samtools_flagstat_post_samtools_filter-mapped_passed"},
+        {
+            "name": "%_Endogenous_DNA_over_30bp",
+            "header": "endogenous_post",
+            "sources": {
+                "eager-2.5": ["base endorSpy_mqc-generalstats-base_endorspy-endogenous_dna_post"],
+                "eager-2.4": ["endorSpy_mqc-generalstats-endorspy-endogenous_dna_post"],
+            },
+        },
+        {"name": "Proportion_of_duplicate_reads", "header": "Picard_mqc-generalstats-picard-PERCENT_DUPLICATION"},
+        {
+            "name": "Damage_5'_bp1",
+            "header": "dmg_5p_1",
+            "sources": {
+                "eager-2.5": ["mapDamage_mqc-generalstats-mapdamage-mapdamage_5_Prime1"],
+                "eager-2.4": ["DamageProfiler_mqc-generalstats-damageprofiler-5_Prime1"],
+            },
+        },
+        {
+            "name": "Damage_5'_bp2",
+            "header": "dmg_5p_2",
+            "sources": {
+                "eager-2.5": ["mapDamage_mqc-generalstats-mapdamage-mapdamage_5_Prime2"],
+                "eager-2.4": ["DamageProfiler_mqc-generalstats-damageprofiler-5_Prime2"],
+            },
+        },
+        {
+            "name": "Damage_3'_bp1",
+            "header": "dmg_3p_1",
+            "sources": {
+                "eager-2.5": ["mapDamage_mqc-generalstats-mapdamage-mapdamage_3_Prime1"],
+                "eager-2.4": ["DamageProfiler_mqc-generalstats-damageprofiler-3_Prime1"],
+            },
+        },
+        {
+            "name": "Damage_3'_bp2",
+            "header": "dmg_3p_2",
+            "sources": {
+                "eager-2.5": ["mapDamage_mqc-generalstats-mapdamage-mapdamage_3_Prime2"],
+                "eager-2.4": ["DamageProfiler_mqc-generalstats-damageprofiler-3_Prime2"],
+            },
+        },
+        {
+            "name": "Mean_read_length",
+            "header": "mean_read_length",
+            "sources": {
+                "eager-2.4": ["DamageProfiler_mqc-generalstats-damageprofiler-mean_readlength"],
+            },
+        },
+        {
+            "name": "Median_read_length",
+            "header": "median_read_length",
+            "sources": {
+                "eager-2.4": ["DamageProfiler_mqc-generalstats-damageprofiler-median"],
+            },
+        },
+        {"name": "Nr_mtDNA_reads", "header": "mtnucratio_mqc-generalstats-mtnucratio-mtreads"},
+        {"name": "Mean_mt_coverage", "header": "mtnucratio_mqc-generalstats-mtnucratio-mt_cov_avg"},
+        {"name": "mt_to_nuclear_read_ratio", "header": "mtnucratio_mqc-generalstats-mtnucratio-mt_nuc_ratio"},
+        {"name": "Nr_of_unique_mapped_reads", "header": "QualiMap_mqc-generalstats-qualimap-mapped_reads"},
+        {"name": "Mean_fold_coverage", "header": "QualiMap_mqc-generalstats-qualimap-mean_coverage"},
+        {"name": "Median_fold_coverage", "header": "QualiMap_mqc-generalstats-qualimap-median_coverage"},
+        {"name": "%_of_genome_covered_by_at_least_1_read", "header": "QualiMap_mqc-generalstats-qualimap-1_x_pc"},
+        {"name": "%_of_genome_covered_by_at_least_2_reads", "header": "QualiMap_mqc-generalstats-qualimap-2_x_pc"},
+        {"name": "%_of_genome_covered_by_at_least_3_reads", "header": "QualiMap_mqc-generalstats-qualimap-3_x_pc"},
+        {"name": "%_of_genome_covered_by_at_least_4_reads", "header": "QualiMap_mqc-generalstats-qualimap-4_x_pc"},
+        {"name": "%_of_genome_covered_by_at_least_5_reads", "header": "QualiMap_mqc-generalstats-qualimap-5_x_pc"},
+        {"name": "%_GC_of_unique_reads", "header": "QualiMap_mqc-generalstats-qualimap-avg_gc"},
+        {
+            "name": "Read_length_std_dev",
+            "header": "read_length_std_dev",
+            "sources": {
+                "eager-2.4": ["DamageProfiler_mqc-generalstats-damageprofiler-std"],
+            },
+        },
+        {"name": "Mean_fold_coverage_on_nuclear_genome", "header": "mtnucratio_mqc-generalstats-mtnucratio-nuc_cov_avg"},
+        {"name": "Nr_nuclearDNA_reads", "header": "mtnucratio_mqc-generalstats-mtnucratio-nucreads"},
+        # {"name": "%_of_mapped_reads", "header": "QualiMap_mqc-generalstats-qualimap-percentage_aligned"},
+        {"name": "Nr_of_reads_total", "header": "QualiMap_mqc-generalstats-qualimap-total_reads"},
+        {"name": "Qualimap_General_error_rate", "header": "QualiMap_mqc-generalstats-qualimap-general_error_rate"},
+        {"name": "StdErr_of_X_relative_coverage", "header": "SexDetErrmine_mqc-generalstats-sexdeterrmine-RateErrX"},
+        {"name": "StdErr_of_Y_relative_coverage", "header": "SexDetErrmine_mqc-generalstats-sexdeterrmine-RateErrY"},
+        {"name": "Relative_coverage_on_X_chromosome", "header": "SexDetErrmine_mqc-generalstats-sexdeterrmine-RateX"},
+        {"name": "Relative_coverage_on_Y_chromosome", "header": "SexDetErrmine_mqc-generalstats-sexdeterrmine-RateY"},
+        {
+            "name": "Nr_SNPs_used_in_contamination_estimation",
+            "header": "nuc_cont_snps",
+            "sources": {
+                "eager-2.5": ["base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Num_SNPs"],
+                "eager-2.4": ["nuclear_contamination_mqc-generalstats-nuclear_contamination-Num_SNPs"],
+            },
+        },
+        {
+            "name": "Nuclear_contamination_M1_ML",
+            "header": "nuc_cont_m1_ml_est",
+            "sources": {
+                "eager-2.5": ["base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method1_ML_estimate"],
+                "eager-2.4": ["nuclear_contamination_mqc-generalstats-nuclear_contamination-Method1_ML_estimate"],
+            },
+        },
+        {
+            "name": "Nuclear_contamination_M1_ML_Error",
+            "header": "nuc_cont_m1_ml_se",
+            "sources": {
+                "eager-2.5": ["base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method1_ML_SE"],
+                "eager-2.4": ["nuclear_contamination_mqc-generalstats-nuclear_contamination-Method1_ML_SE"],
+            },
+        },
+        {
+            "name": "Nuclear_contamination_M1_MOM",
+            "header": "nuc_cont_m1_mom_est",
+            "sources": {
+                "eager-2.5": ["base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method1_MOM_estimate"],
+                "eager-2.4": ["nuclear_contamination_mqc-generalstats-nuclear_contamination-Method1_MOM_estimate"],
+            },
+        },
+        {
+            "name": "Nuclear_contamination_M1_MOM_Error",
+            "header": "nuc_cont_m1_mom_se",
+            "sources": {
+                "eager-2.5": ["base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method1_MOM_SE"],
+                "eager-2.4": ["nuclear_contamination_mqc-generalstats-nuclear_contamination-Method1_MOM_SE"],
+            },
+        },
+        {
+            "name": "Nuclear_contamination_M2_ML",
+            "header": "nuc_cont_m2_ml_est",
+            "sources": {
+                "eager-2.5": ["base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method2_ML_estimate"],
+                "eager-2.4": ["nuclear_contamination_mqc-generalstats-nuclear_contamination-Method2_ML_estimate"],
+            },
+        },
+        {
+            "name": "Nuclear_contamination_M2_ML_Error",
+            "header": "nuc_cont_m2_ml_se",
+            "sources": {
+                "eager-2.5": ["base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method2_ML_SE"],
+                "eager-2.4": ["nuclear_contamination_mqc-generalstats-nuclear_contamination-Method2_ML_SE"],
+            },
+        },
+        {
+            "name": "Nuclear_contamination_M2_MOM",
+            "header": "nuc_cont_m2_mom_est",
+            "sources": {
+                "eager-2.5": ["base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method2_MOM_estimate"],
+                "eager-2.4": ["nuclear_contamination_mqc-generalstats-nuclear_contamination-Method2_MOM_estimate"],
+            },
+        },
+        {
+            "name": "Nuclear_contamination_M2_MOM_Error",
+            "header": "nuc_cont_m2_mom_se",
+            "sources": {
+                "eager-2.5": ["base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method2_MOM_SE"],
+                "eager-2.4": ["nuclear_contamination_mqc-generalstats-nuclear_contamination-Method2_MOM_SE"],
+            },
+        },
+        {"name": "UDG_Treatment", "header": "UDG_Treatment"},
+        {"name": "Strandedness", "header": "Strandedness"},
+        {"name": "Data_type", "header": "Data_type"},
+    ],
+}
+
+
+## Key under which the detected schema version of a library is kept with its stats. Not part of the output.
+SCHEMA_VERSION_KEY = "_schema_version"
+
+def validate_schema(schema: Any, source: str) -> None:
+    '''
+    Checks that a MultiQC schema has the expected structure, and raises a ValueError describing the first problem found.
+    '''
+    if not isinstance(schema, dict):
+        raise ValueError(f"The schema in '{source}' must be a mapping.")
+    for field in ["versions", "columns"]:
+        if not isinstance(schema.get(field), list):
+            raise ValueError(f"The schema in '{source}' must have a list of '{field}'.")
+    version_names = []
+    for version in schema["versions"]:
+        if not isinstance(version, dict) or not isinstance(version.get("name"), str) or not isinstance(version.get("markers"), list):
+            raise ValueError(f"Each version in the schema in '{source}' must have a 'name' and a list of 'markers'.")
+        version_names.append(version["name"])
+    column_names = set()
+    for column in schema["columns"]:
+        if not isinstance(column, dict) or not isinstance(column.get("name"), str) or not isinstance(column.get("header"), str):
+            raise ValueError(f"Each column in the schema in '{source}' must have a 'name' and a 'header'.")
+        if column["name"] in column_names:
+            raise ValueError(f"The column '{column['name']}' appears more than once in the schema in '{source}'.")
+        column_names.add(column["name"])
+        sources = column.get("sources", [])
+        if isinstance(sources, dict):
+            unknown_versions = [name for name in sources if name not in version_names]
+            if unknown_versions:
+                raise ValueError(
+                    f"The column '{column['name']}' in the schema in '{source}' has sources for unknown version(s): {', '.join(unknown_versions)}."
+                )
+        elif not isinstance(sources, list):
+            raise ValueError(f"The sources of column '{column['name']}' in the schema in '{source}' must be a list, or a mapping of version to list.")
+
+def compile_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Prepares a MultiQC schema for collection. Returns a dictionary with the schema itself, its fingerprint (used to
+    invalidate cached results when the schema changes), the output columns as a dictionary of human-readable header to
+    original header, the versions by name, and the candidate source keys of each column for each detected version.
+    '''
+    version_names = [version["name"] for version in schema["versions"]]
+    ## For each detected version (or None), the sources of that version are tried first, then those of all other versions.
+    ## This keeps mixed or partially populated key sets correct.
+    column_sources = {}
+    for detected in [None] + version_names:
+        candidates = []
+        for column in schema["columns"]:
+            sources = column.get("sources", [column["header"]])
+            if isinstance(sources, dict):
+                ordered = [detected] + [name for name in version_names if name != detected]
+                sources = [key for name in ordered for key in sources.get(name, [])]
+            candidates.append((column["header"], tuple(sources)))
+        column_sources[detected] = tuple(candidates)
+    return {
+        "schema": schema,
+        "fingerprint": hashlib.sha1(json.dumps(schema, sort_keys=True).encode()).hexdigest(),
+        "output_columns": {column["name"]: column["header"] for column in schema["columns"]},
+        "versions": {version["name"]: version for version in schema["versions"]},
+        "column_sources": column_sources,
+        "resolved": {},
+    }
+
+def load_schema(file_path: str) -> Dict[str, Any]:
+    '''
+    Reads a MultiQC schema from a JSON or YAML (requires PyYAML) file, validates it and compiles it.
+    '''
+    with open(file_path, "r") as f:
+        if file_path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("Reading a YAML schema requires the package 'PyYAML'. Please install it, or use a JSON schema instead.")
+            try:
+                schema = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(f"Could not parse YAML: {e}")
+        else:
+            schema = json.load(f)
+    validate_schema(schema, file_path)
+    return compile_schema(schema)
+
+def get_library_key(key: str, schema: Dict[str, Any]) -> str:
+    '''
+    Returns the Library_ID of a library-level general stats key, removing any suffix like the '_udg' splits of eager 2.5.0.
+    '''
+    for separator in schema["schema"].get("library_key_separators", []):
+        key = key.split(separator)[0]
+    return key
+
+def resolve_schema_columns(keys: frozenset, schema: Dict[str, Any]) -> Tuple[Union[str, None], Tuple[Tuple[str, Union[str, None]], ...]]:
+    '''
+    Detects the schema version of a set of general stats keys, and resolves the source key of each output column.
+    Since all libraries of a report (usually) share the same keys, this is only computed once per key set.
+    '''
+    resolved = schema["resolved"].get(keys)
+    if resolved is None:
+        detected = None
+        for name, version in schema["versions"].items():
+            if any(marker in keys for marker in version["markers"]):
+                detected = name
+                break
+        sources = tuple(
+            (header, next((key for key in candidates if key in keys), None))
+            for header, candidates in schema["column_sources"][detected]
+        )
+        resolved = (detected, sources)
+        schema["resolved"][keys] = resolved
+    return resolved
+
+def project_library_stats(collected_stats: Dict[str, Dict], schema: Dict[str, Any]) -> Dict[str, Dict]:
+    '''
+    Projects the stats of each library onto the output columns of the schema, keyed by the original header.
+    Columns without a source in the stats of a library are N/A. The detected schema version is kept under SCHEMA_VERSION_KEY.
+    '''
+    projected = {}
+    for library, stats in collected_stats.items():
+        detected, sources = resolve_schema_columns(frozenset(stats), schema)
+        row = {header: "N/A" if source is None else stats[source] for header, source in sources}
+        row[SCHEMA_VERSION_KEY] = detected
+        projected[library] = row
+    return projected
+
+def needs_mapdamage_read_lengths(stats: Dict[str, Any], schema: Dict[str, Any]) -> Dict[str, str]:
+    '''
+    Returns the output columns for the read length stats (mean, median, std) of a library that have to be computed from
+    its mapDamage results. Empty if its schema version has no mapDamage read lengths, or they are already in the general stats.
+    '''
+    version = schema["versions"].get(stats.get(SCHEMA_VERSION_KEY), {})
+    read_length_columns = version.get("mapdamage_read_lengths", {})
+    if any(stats.get(header, "N/A") != "N/A" for header in read_length_columns.values()):
+        return {}
+    return read_length_columns
+
+DEFAULT_SCHEMA = compile_schema(BUILTIN_SCHEMA)
 
-VERSION = "1.6.1"
+class UnknownSampleError(Exception):
+    '''
+    Raised when the MultiQC data of an individual has stats for a library, but none for the sample it belongs to.
+    '''
 
-def get_individual_library_stats(mqc_data : str, data_type: str, main_id_dict : Dict[str,str] = None):
-    ## Read json file, and combine relevant sample and library stats into a dictionary
-    with open(mqc_data, "r") as json_file:
-        data = json.load(json_file)
+def get_individual_library_stats(mqc_data : str, data_type: str, main_id_dict : Dict[str,str] = None, json_parser: str = "auto", schema: Dict[str, Any] = DEFAULT_SCHEMA):
+    ## Read the general stats from the json file, and combine relevant sample and library stats into a dictionary
+    general_stats = read_general_stats(mqc_data, json_parser)
     ## Create empty dicts and lists to store results
     results = {}
     sample_stats = {}
     library_stats = {}
     sample_libraries = []
     ## Loop through json file and store relevant stats in dicts
-    for key in data["report_saved_raw_data"]["multiqc_general_stats"].keys():
+    for key in general_stats.keys():
         ## If the key contains a '.', it is a library stat, otherwise it is a sample stat
         if len(key.split(".")) > 1:
             ## eager 2.5.0 also has split by UDG for some stats. we want to compile these together, as each library can only have one udg treatment.
-            ## By splitting by '_udg', we can get the library ID, and then add the attributes to the library dict for both cases.
+            ## By splitting by the library key separators of the schema (i.e. '_udg'), we can get the library ID, and then add the attributes to the library dict for both cases.
+            library = get_library_key(key, schema)
             try:
                 ## If the library key is already in the dict, add the attributes to it
-                library_stats[key.split("_udg")[0]].update(
-                    data["report_saved_raw_data"]["multiqc_general_stats"][key]
+                library_stats[library].update(
+                    general_stats[key]
                 )
             except KeyError:
                 ## If the library ID doesn't exist in the dict, create it
-                library_stats[key.split("_udg")[0]] = data["report_saved_raw_data"][
-                    "multiqc_general_stats"
-                ][key]
+                library_stats[library] = general_stats[key]
                 sample_libraries.append(
-                    key
+                    library
                 )  ## Keep track of library IDs for later. Only add it if its new.
             ## Not actually needed since key.split("_udg")[0] will always be the Library_ID
             # else:
             #     ## Library key is actual Library_ID
             #     try:
             #         ## If the library key is already in the dict, add the attributes to it
-            #         library_stats[key].update(data["report_saved_raw_data"]["multiqc_general_stats"][key])
+            #         library_stats[key].update(general_stats[key])
             #     except KeyError:
             #         ## If the library ID doesn't exist in the dict, create it
-            #         library_stats[key] = data["report_saved_raw_data"]["multiqc_general_stats"][key]
+            #         library_stats[key] = general_stats[key]
             #     sample_libraries.append(key)  ## Keep track of library IDs for later
         else:
-            sample_stats[key] = data["report_saved_raw_data"]["multiqc_general_stats"][
-                key
-            ]
+            sample_stats[key] = general_stats[key]
     ## Add the same data type (analysis type) to all sample stats
     for key in sample_stats.keys():
         sample_stats[key]["Data_type"] = data_type
@@ -81,10 +556,10 @@ def get_individual_library_stats(mqc_data : str, data_type: str, main_id_dict :
         try:
             compiled_results.update(sample_stats[ind_id])
         except KeyError as e:
-            if ind_id_no_ss in main_id_dict.keys():
+            if main_id_dict is not None and ind_id_no_ss in main_id_dict:
                 compiled_results.update(sample_stats[main_id_dict[ind_id_no_ss]+ind_suffix])
             else:
-                raise Exception(
+                raise UnknownSampleError(
                     f"Unknown sample for library: {library}."
                 ) from e
         compiled_results.update(library_stats[library])
@@ -93,158 +568,160 @@ def get_individual_library_stats(mqc_data : str, data_type: str, main_id_dict :
         ## Use union of attributes to combine dicts. attributes from the library level will overwrite any that exist in the sample level. Should be no overlap, but good to note.
         # results[library] = dict(sample_stats[library.split('.')[0]] | library_stats[library])
 
-    ## Standardise column naming across multiqc versions
-    results = standardise_column_names(results)
     ## results is a dict of dicts, with the library ID as the key. The value then contains a dict of the combined stats for that library/sample.
     return results
 
 
-## Some column names changed from 2.4.5 to 2.5.0, so we need to standardise the names of these columns across both versions.
-def standardise_column_names(collected_stats):
-    #    OLD NAME                                                                               NEW NAME
-    #    DamageProfiler_mqc-generalstats-damageprofiler-3_Prime1                                mapDamage_mqc-generalstats-mapdamage-mapdamage_3_Prime1
-    #    DamageProfiler_mqc-generalstats-damageprofiler-3_Prime2                                mapDamage_mqc-generalstats-mapdamage-mapdamage_3_Prime2
-    #    DamageProfiler_mqc-generalstats-damageprofiler-5_Prime1                                mapDamage_mqc-generalstats-mapdamage-mapdamage_5_Prime1
-    #    DamageProfiler_mqc-generalstats-damageprofiler-5_Prime2                                mapDamage_mqc-generalstats-mapdamage-mapdamage_5_Prime2
-    #    DamageProfiler_mqc-generalstats-damageprofiler-mean_readlength                         NA
-    #    DamageProfiler_mqc-generalstats-damageprofiler-median                                  NA
-    #    DamageProfiler_mqc-generalstats-damageprofiler-std                                     NA
-    #    endorSpy_mqc-generalstats-endorspy-endogenous_dna                                      base endorSpy_mqc-generalstats-base_endorspy-endogenous_dna
-    #    endorSpy_mqc-generalstats-endorspy-endogenous_dna_post                                 base endorSpy_mqc-generalstats-base_endorspy-endogenous_dna_post
-    #    nuclear_contamination_mqc-generalstats-nuclear_contamination-Method1_ML_SE             base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method1_ML_SE
-    #    nuclear_contamination_mqc-generalstats-nuclear_contamination-Method1_ML_estimate       base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method1_ML_estimate
-    #    nuclear_contamination_mqc-generalstats-nuclear_contamination-Method1_MOM_SE            base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method1_MOM_SE
-    #    nuclear_contamination_mqc-generalstats-nuclear_contamination-Method1_MOM_estimate      base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method1_MOM_estimate
-    #    nuclear_contamination_mqc-generalstats-nuclear_contamination-Method2_ML_SE             base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method2_ML_SE
-    #    nuclear_contamination_mqc-generalstats-nuclear_contamination-Method2_ML_estimate       base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method2_ML_estimate
-    #    nuclear_contamination_mqc-generalstats-nuclear_contamination-Method2_MOM_SE            base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method2_MOM_SE
-    #    nuclear_contamination_mqc-generalstats-nuclear_contamination-Method2_MOM_estimate      base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method2_MOM_estimate
-    #    nuclear_contamination_mqc-generalstats-nuclear_contamination-Num_SNPs                  base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Num_SNPs
-    #    snp_coverage_mqc-generalstats-snp_coverage-Covered_Snps                                base snp_coverage_mqc-generalstats-base_snp_coverage-Covered_Snps
-    #    snp_coverage_mqc-generalstats-snp_coverage-Total_Snps                                  base snp_coverage_mqc-generalstats-base_snp_coverage-Total_Snps
-    new_attributes = {
-        "dmg_3p_1": "N/A",
-        "dmg_3p_2": "N/A",
-        "dmg_5p_1": "N/A",
-        "dmg_5p_2": "N/A",
-        "mean_read_length": "N/A",
-        "median_read_length": "N/A",
-        "read_length_std_dev": "N/A",
-        "endogenous": "N/A",
-        "endogenous_post": "N/A",
-        "nuc_cont_m1_ml_se": "N/A",
-        "nuc_cont_m1_ml_est": "N/A",
-        "nuc_cont_m1_mom_se": "N/A",
-        "nuc_cont_m1_mom_est": "N/A",
-        "nuc_cont_m2_ml_se": "N/A",
-        "nuc_cont_m2_ml_est": "N/A",
-        "nuc_cont_m2_mom_se": "N/A",
-        "nuc_cont_m2_mom_est": "N/A",
-        "nuc_cont_snps": "N/A",
-        "snps_covered": "N/A",
-        "snps_total": "N/A",
-    }
+def file_signature(path: str) -> Union[List[float], None]:
+    '''
+    Returns the modification time and size of a file, used to detect if the file has changed. Returns None if the file does not exist.
+    '''
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat_result.st_mtime, stat_result.st_size]
 
-    old_names = {
-        "dmg_3p_1": "DamageProfiler_mqc-generalstats-damageprofiler-3_Prime1",
-        "dmg_3p_2": "DamageProfiler_mqc-generalstats-damageprofiler-3_Prime2",
-        "dmg_5p_1": "DamageProfiler_mqc-generalstats-damageprofiler-5_Prime1",
-        "dmg_5p_2": "DamageProfiler_mqc-generalstats-damageprofiler-5_Prime2",
-        "mean_read_length": "DamageProfiler_mqc-generalstats-damageprofiler-mean_readlength",
-        "median_read_length": "DamageProfiler_mqc-generalstats-damageprofiler-median",
-        "read_length_std_dev": "DamageProfiler_mqc-generalstats-damageprofiler-std",
-        "endogenous": "endorSpy_mqc-generalstats-endorspy-endogenous_dna",
-        "endogenous_post": "endorSpy_mqc-generalstats-endorspy-endogenous_dna_post",
-        "nuc_cont_m1_ml_se": "nuclear_contamination_mqc-generalstats-nuclear_contamination-Method1_ML_SE",
-        "nuc_cont_m1_ml_est": "nuclear_contamination_mqc-generalstats-nuclear_contamination-Method1_ML_estimate",
-        "nuc_cont_m1_mom_se": "nuclear_contamination_mqc-generalstats-nuclear_contamination-Method1_MOM_SE",
-        "nuc_cont_m1_mom_est": "nuclear_contamination_mqc-generalstats-nuclear_contamination-Method1_MOM_estimate",
-        "nuc_cont_m2_ml_se": "nuclear_contamination_mqc-generalstats-nuclear_contamination-Method2_ML_SE",
-        "nuc_cont_m2_ml_est": "nuclear_contamination_mqc-generalstats-nuclear_contamination-Method2_ML_estimate",
-        "nuc_cont_m2_mom_se": "nuclear_contamination_mqc-generalstats-nuclear_contamination-Method2_MOM_SE",
-        "nuc_cont_m2_mom_est": "nuclear_contamination_mqc-generalstats-nuclear_contamination-Method2_MOM_estimate",
-        "nuc_cont_snps": "nuclear_contamination_mqc-generalstats-nuclear_contamination-Num_SNPs",
-        "snps_covered": "snp_coverage_mqc-generalstats-snp_coverage-Covered_Snps",
-        "snps_total": "snp_coverage_mqc-generalstats-snp_coverage-Total_Snps",
-    }
+## The files of an individual that are checked before its results are collected
+INDIVIDUAL_FILES = ["mqc_data", "report", "tsv"]
 
-    new_names = {
-        "dmg_3p_1": "mapDamage_mqc-generalstats-mapdamage-mapdamage_3_Prime1",
-        "dmg_3p_2": "mapDamage_mqc-generalstats-mapdamage-mapdamage_3_Prime2",
-        "dmg_5p_1": "mapDamage_mqc-generalstats-mapdamage-mapdamage_5_Prime1",
-        "dmg_5p_2": "mapDamage_mqc-generalstats-mapdamage-mapdamage_5_Prime2",
-        "endogenous": "base endorSpy_mqc-generalstats-base_endorspy-endogenous_dna",
-        "endogenous_post": "base endorSpy_mqc-generalstats-base_endorspy-endogenous_dna_post",
-        "nuc_cont_m1_ml_se": "base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method1_ML_SE",
-        "nuc_cont_m1_ml_est": "base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method1_ML_estimate",
-        "nuc_cont_m1_mom_se": "base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method1_MOM_SE",
-        "nuc_cont_m1_mom_est": "base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method1_MOM_estimate",
-        "nuc_cont_m2_ml_se": "base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method2_ML_SE",
-        "nuc_cont_m2_ml_est": "base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method2_ML_estimate",
-        "nuc_cont_m2_mom_se": "base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method2_MOM_SE",
-        "nuc_cont_m2_mom_est": "base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Method2_MOM_estimate",
-        "nuc_cont_snps": "base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-Num_SNPs",
-        "snps_covered": "base snp_coverage_mqc-generalstats-base_snp_coverage-Covered_Snps",
-        "snps_total": "base snp_coverage_mqc-generalstats-base_snp_coverage-Total_Snps",
-    }
+def get_file_signatures(paths: Dict[str, str]) -> Dict[str, Union[List[float], None]]:
+    '''
+    Returns the signature of the MultiQC data, MultiQC report and eager input TSV of an individual, with a single stat call per file.
+    '''
+    return {name: file_signature(paths[name]) for name in INDIVIDUAL_FILES}
 
-    ## Starting with all NAs, add in any values that exist in either the old dict or the new dict
-    for library in collected_stats:
-        new_stats = collected_stats[library]
-        new_stats.update(new_attributes)  ## Add all new attributed with NAs
-        ## Deal with older versions of multiqc
-        try:
-            for name, old_name in old_names.items():
-                new_stats[name] = new_stats[old_name]
-        except KeyError:
-            pass
-        ## Deal with newer versions of multiqc
-        try:
-            for name, new_name in new_names.items():
-                new_stats[name] = new_stats[new_name]
-        except KeyError:
-            pass
-        # print("library:", library, "stats", new_stats, sep="\n")
-        collected_stats[library] = new_stats
-    return collected_stats
+def signatures_are_consistent(mqc_data_signature: Union[List[float], None], report_signature: Union[List[float], None], skip_check: bool = False) -> bool:
+    '''
+    Checks that the MultiQC data and report are up to date with each other, by comparing the modification times in file
+    signatures that were already read. Raises a FileNotFoundError if either file does not exist.
+    '''
+    if mqc_data_signature is None or report_signature is None:
+        raise FileNotFoundError
+    ## Complain if the difference is more than 1 minute (should be less than a second, but give some leeway for network/filesystem latency etc.)
+    if abs(mqc_data_signature[0] - report_signature[0]) > 60:
+        return skip_check
+    return True
 
+## Cache entries that have not been written or used for this many days are deleted, see prune_cache()
+CACHE_MAX_AGE_DAYS = 90
+## The cache is pruned at most once a day, in seconds
+CACHE_PRUNE_INTERVAL = 24 * 60 * 60
+## The files that prune_cache() deletes: cache entries, main ID indices and leftovers of interrupted writes
+CACHE_FILE_SUFFIXES = (".json", ".sqlite", ".tmp")
 
-def timestamp_diff_in_sec(file1, file2):
-    ## Get the creation time of each file
-    for f in [file1, file2]:
-        ## Check that the files indeed exist
-        if not os.path.exists(f) or not os.path.isfile(f):
-            raise FileNotFoundError
+def get_default_cache_dir() -> str:
+    '''
+    Returns the default directory for the results cache, following the XDG base directory specification.
+    '''
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "collect_results")
 
-    timestamp1 = os.path.getmtime(file1)
-    timestamp2 = os.path.getmtime(file2)
+def touch_cache_entry(path: str) -> None:
+    '''
+    Marks a cache entry as used by updating its modification time, so that prune_cache() keeps it.
+    '''
+    try:
+        os.utime(path)
+    except OSError:
+        pass
 
-    ## Return the modification time difference in seconds
-    return abs(timestamp1 - timestamp2)
+def read_cache_entry(cache_dir: str, namespace: str, name: str, key: Dict[str, Any]) -> Any:
+    '''
+    Reads a cache entry from <cache_dir>/<namespace>/<name>.json. Returns None if the entry does not exist,
+    cannot be read, or was stored with a different key.
+    '''
+    entry_path = os.path.join(cache_dir, namespace, name + ".json")
+    try:
+        with open(entry_path, "r") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry.get("key") != key:
+        return None
+    touch_cache_entry(entry_path)
+    return entry["value"]
 
+def write_cache_entry(cache_dir: str, namespace: str, name: str, key: Dict[str, Any], value: Any) -> None:
+    '''
+    Writes a cache entry to <cache_dir>/<namespace>/<name>.json. The entry is written to a temporary file first and then
+    moved into place, so that concurrent workers never see a partially written entry.
+    '''
+    entry_dir = os.path.join(cache_dir, namespace)
+    entry_path = os.path.join(entry_dir, name + ".json")
+    tmp_path = "{}.{}.{}.tmp".format(entry_path, os.getpid(), threading.get_ident())
+    try:
+        os.makedirs(entry_dir, exist_ok=True)
+        with open(tmp_path, "w") as f:
+            json.dump({"key": key, "value": value}, f)
+        os.replace(tmp_path, entry_path)
+    except OSError:
+        ## A cache that cannot be written to should never stop the collection.
+        pass
 
-def files_are_consistent(mqc_data, mqc_html, skip_check=False):
-    ## Check if the multiqc data and html files are up to date
-    ## Complain if the difference is more than 1 minute (should be less than a second, but give some leeway for network/filesystem latency etc.)
-    if timestamp_diff_in_sec(mqc_data, mqc_html) > 60:
-        return skip_check
-    return True
+def prune_cache(cache_dir: str, max_age_days: float, interval: float = CACHE_PRUNE_INTERVAL) -> int:
+    '''
+    Deletes the cache entries and main ID indices in cache_dir that have not been written or used in the last max_age_days
+    days, and returns the number of files deleted. Since this walks the whole cache, it is done at most once per interval
+    (in seconds), as recorded by the modification time of <cache_dir>/last_pruned.
+    '''
+    marker = os.path.join(cache_dir, "last_pruned")
+    now = time.time()
+    last_pruned = file_signature(marker)
+    if last_pruned is not None and now - last_pruned[0] < interval:
+        return 0
+    try:
+        with open(marker, "w"):
+            pass
+    except OSError:
+        ## A cache that cannot be written to cannot be pruned either.
+        return 0
+    cutoff = now - max_age_days * 24 * 60 * 60
+    n_pruned = 0
+    for dir_path, dir_names, file_names in os.walk(cache_dir):
+        for file_name in file_names:
+            if not file_name.endswith(CACHE_FILE_SUFFIXES):
+                continue
+            path = os.path.join(dir_path, file_name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+                    n_pruned += 1
+            except OSError:
+                ## Other runs may replace or prune the same entries concurrently
+                pass
+    return n_pruned
 
-def read_eager_tsv(file_path) -> map:
+def iter_eager_tsv(file_handle, columns: List[str]):
     '''
-    Reads the contents of an eager input TSV into a dictionary with the column names as keys.
+    Streams the rows of an eager input TSV as tuples with the values of the requested columns, in the order requested.
+    The indices of the columns are resolved from the header once. Line endings (including '\r\n') and surrounding whitespace
+    are stripped from the values, and blank lines are skipped. Raises a ValueError if a column is not in the header, or if a
+    row does not have enough fields.
     '''
-    l = file_path.readlines()
-    headers = l[0].strip().split('\t')
-    return map(lambda row: dict(zip(headers, row.split('\t'))), l[1:])
+    header = [column.strip() for column in file_handle.readline().split('\t')]
+    missing = [column for column in columns if column not in header]
+    if missing:
+        raise ValueError(f"Column(s) {', '.join(missing)} not found in the header of the eager input TSV.")
+    indices = [header.index(column) for column in columns]
+    n_fields = max(indices) + 1
+    for line_number, line in enumerate(file_handle, start=2):
+        line = line.rstrip('\r\n')
+        if not line.strip():
+            continue
+        fields = line.split('\t')
+        if len(fields) < n_fields:
+            raise ValueError(f"Line {line_number} of the eager input TSV has {len(fields)} fields, but at least {n_fields} are needed.")
+        yield tuple(fields[i].strip() for i in indices)
 
-def get_eager_tsv_data(path: str ='', columns: List[str] = []) -> Union[Dict[str, Dict[str, str]], None]:
+def get_eager_tsv_data(path: str ='', columns: List[str] = [], contents: str = None) -> Union[Dict[str, Dict[str, str]], None]:
     '''
     Reads the contents of an eager input TSV and returns a dictionary with the Library_ID as key a
     dictionary containing the requested column and values as values.
+    If the contents of the file were already read (e.g. by prefetch_individuals), they can be given instead of reading the file again.
     '''
     ## Check that path is a file and exists
-    if not os.path.isfile(path):
+    if contents is None and not os.path.isfile(path):
         print(f"File {path} not found. Exiting.")
         return None
     
@@ -266,15 +743,66 @@ def get_eager_tsv_data(path: str ='', columns: List[str] = []) -> Union[Dict[str
     
     else:
         collected_library_stats = {}
-        with open(path, 'r') as f:
-            for row in read_eager_tsv(f):
-                row_results = {}
-                for col in collect_me:
-                    row_results[col] = row[col]
-                ## This will always overwrite later entries with the same Library_ID, but that is fine for now.
-                collected_library_stats[row["Library_ID"]] = row_results
+        with (io.StringIO(contents) if contents is not None else open(path, 'r')) as f:
+            for library, *values in iter_eager_tsv(f, ["Library_ID"] + collect_me):
+                ## Libraries sequenced on several lanes have one row per lane, with the same library-level values. The last row wins.
+                collected_library_stats[library] = dict(zip(collect_me, values))
         return collected_library_stats
 
+def index_eager_tsvs(tsv_paths: List[str], columns: List[str], threads: int = 1) -> Dict[str, Tuple[str, ...]]:
+    '''
+    Reads the requested columns of many eager input TSVs, using a pool of threads if requested, and returns a combined index
+    with the Library_ID as key and a tuple of the values of the requested columns as value. TSVs that do not exist are skipped.
+    If a Library_ID appears in several TSVs, the last TSV in tsv_paths wins.
+    '''
+    def read_tsv(path: str) -> List[Tuple[str, ...]]:
+        try:
+            with open(path, 'r') as f:
+                return list(iter_eager_tsv(f, ["Library_ID"] + columns))
+        except FileNotFoundError:
+            return []
+
+    index = {}
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+        for rows in executor.map(read_tsv, tsv_paths):
+            for library, *values in rows:
+                index[library] = tuple(values)
+    return index
+
+def index_eager_inputs(root_output_path: str, analysis_type: str, columns: List[str], threads: int = 1) -> Dict[str, Tuple[str, ...]]:
+    '''
+    Walks the eager_inputs directory next to root_output_path once, and returns an index of the requested columns of the eager
+    input TSVs of all individuals of an analysis type (see index_eager_tsvs), e.g. {Library_ID: (UDG_Treatment, Strandedness)}.
+    This is for other scripts that need these columns for many individuals. The collection itself does not use it, since it
+    only reads the TSV of an individual whose results are not cached.
+    '''
+    inputs_path = os.path.join(root_output_path, "..", "eager_inputs", analysis_type)
+    tsv_paths = [
+        os.path.join(ind_entry.path, "{}.tsv".format(ind_entry.name))
+        for site_entry in _list_directories(inputs_path)
+        for ind_entry in _list_directories(site_entry.path)
+    ]
+    return index_eager_tsvs(tsv_paths, columns, threads)
+
+def iter_main_id_list(file_path: str):
+    '''
+    Reads a file with a header and two tab-separated columns, where the first column is the Pandora Full individual ID and
+    the second column is the Pandora Main individual ID, and yields the (Full ID, Main ID) pairs.
+    Raises a ValueError for lines that do not have both IDs.
+    '''
+    with open(file_path, 'r') as f:
+        for line_number, line in enumerate(f, start=1):
+            if line.startswith("#") or not line.strip():
+                continue
+            if line.startswith("Full_Individual_Id\tMain_Individual_Id"):
+                continue
+            fields = line.strip().split('\t')
+            if len(fields) < 2 or not fields[0].strip() or not fields[1].strip():
+                raise ValueError(
+                    f"Malformed line {line_number} in main ID list '{file_path}': expected a Full individual ID and a Main individual ID separated by a tab, but found '{line.rstrip()}'."
+                )
+            yield (fields[0], fields[1])
+
 def read_main_id_list(file_path: str) -> Dict[str, str]:
     '''
     Reads a file with a header and two columns, where the first column is the Pandora Full individual ID and the second column is the Pandora Main individual ID.
@@ -287,265 +815,2228 @@ def read_main_id_list(file_path: str) -> Dict[str, str]:
         return None
     
     main_id_dict = {}
-    with open(file_path, 'r') as f:
-        for line in f:
-            if line.startswith("#") or not line.strip():
-                continue
-            if line.startswith("Full_Individual_Id\tMain_Individual_Id"):
-                continue
-            fields = line.strip().split('\t')
-            main_id_dict[fields[0]] = fields[1]
+    for full_id, main_id in iter_main_id_list(file_path):
+        main_id_dict[full_id] = main_id
     return main_id_dict
 
-def main():
-    ## Column order same as old script.
-    output_columns = {
-        "Covered_SNPs_on_1240K": "snps_covered",
-        "Total_SNPs_on_1240K": "snps_total",
-        "Nr_of_input_reads": "Samtools Flagstat (pre-samtools filter)_mqc-generalstats-samtools_flagstat_pre_samtools_filter-flagstat_total",
-        "Nr_of_mapped_reads": "Samtools Flagstat (pre-samtools filter)_mqc-generalstats-samtools_flagstat_pre_samtools_filter-mapped_passed",
-        "Nr_of_input_reads_over_30bp": "Samtools Flagstat (post-samtools filter)_mqc-generalstats-samtools_flagstat_post_samtools_filter-flagstat_total",
-        "%_Endogenous_DNA": "endogenous",
-        "Nr_of_mapped_reads_over_30bp": "Samtools Flagstat (post-samtools filter)_mqc-generalstats-samtools_flagstat_post_samtools_filter-mapped_passed",
-        "%_Endogenous_DNA_over_30bp": "endogenous_post",
-        "Proportion_of_duplicate_reads": "Picard_mqc-generalstats-picard-PERCENT_DUPLICATION",
-        "Damage_5'_bp1": "dmg_5p_1",
-        "Damage_5'_bp2": "dmg_5p_2",
-        "Damage_3'_bp1": "dmg_3p_1",
-        "Damage_3'_bp2": "dmg_3p_2",
-        "Mean_read_length": "mean_read_length",
-        "Median_read_length": "median_read_length",
-        "Nr_mtDNA_reads": "mtnucratio_mqc-generalstats-mtnucratio-mtreads",
-        "Mean_mt_coverage": "mtnucratio_mqc-generalstats-mtnucratio-mt_cov_avg",
-        "mt_to_nuclear_read_ratio": "mtnucratio_mqc-generalstats-mtnucratio-mt_nuc_ratio",
-        "Nr_of_unique_mapped_reads": "QualiMap_mqc-generalstats-qualimap-mapped_reads",
-        "Mean_fold_coverage": "QualiMap_mqc-generalstats-qualimap-mean_coverage",
-        "Median_fold_coverage": "QualiMap_mqc-generalstats-qualimap-median_coverage",
-        "%_of_genome_covered_by_at_least_1_read": "QualiMap_mqc-generalstats-qualimap-1_x_pc",
-        "%_of_genome_covered_by_at_least_2_reads": "QualiMap_mqc-generalstats-qualimap-2_x_pc",
-        "%_of_genome_covered_by_at_least_3_reads": "QualiMap_mqc-generalstats-qualimap-3_x_pc",
-        "%_of_genome_covered_by_at_least_4_reads": "QualiMap_mqc-generalstats-qualimap-4_x_pc",
-        "%_of_genome_covered_by_at_least_5_reads": "QualiMap_mqc-generalstats-qualimap-5_x_pc",
-        "%_GC_of_unique_reads": "QualiMap_mqc-generalstats-qualimap-avg_gc",
-        "Read_length_std_dev": "read_length_std_dev",
-        "Mean_fold_coverage_on_nuclear_genome": "mtnucratio_mqc-generalstats-mtnucratio-nuc_cov_avg",
-        "Nr_nuclearDNA_reads": "mtnucratio_mqc-generalstats-mtnucratio-nucreads",
-        # "%_of_mapped_reads": "QualiMap_mqc-generalstats-qualimap-percentage_aligned",
-        "Nr_of_reads_total": "QualiMap_mqc-generalstats-qualimap-total_reads",
-        "Qualimap_General_error_rate": "QualiMap_mqc-generalstats-qualimap-general_error_rate",
-        "StdErr_of_X_relative_coverage": "SexDetErrmine_mqc-generalstats-sexdeterrmine-RateErrX",
-        "StdErr_of_Y_relative_coverage": "SexDetErrmine_mqc-generalstats-sexdeterrmine-RateErrY",
-        "Relative_coverage_on_X_chromosome": "SexDetErrmine_mqc-generalstats-sexdeterrmine-RateX",
-        "Relative_coverage_on_Y_chromosome": "SexDetErrmine_mqc-generalstats-sexdeterrmine-RateY",
-        "Nr_SNPs_used_in_contamination_estimation": "nuc_cont_snps",
-        "Nuclear_contamination_M1_ML": "nuc_cont_m1_ml_est",
-        "Nuclear_contamination_M1_ML_Error": "nuc_cont_m1_ml_se",
-        "Nuclear_contamination_M1_MOM": "nuc_cont_m1_mom_est",
-        "Nuclear_contamination_M1_MOM_Error": "nuc_cont_m1_mom_se",
-        "Nuclear_contamination_M2_ML": "nuc_cont_m2_ml_est",
-        "Nuclear_contamination_M2_ML_Error": "nuc_cont_m2_ml_se",
-        "Nuclear_contamination_M2_MOM": "nuc_cont_m2_mom_est",
-        "Nuclear_contamination_M2_MOM_Error": "nuc_cont_m2_mom_se",
-        "UDG_Treatment": "UDG_Treatment",
-        "Strandedness": "Strandedness",
-        "Data_type": "Data_type",
-    }
+class MainIdIndex:
+    '''
+    A lazily loaded, read-only mapping of Pandora Full individual IDs to Main individual IDs, backed by an SQLite index of
+    the main ID list. Only the IDs that are looked up are read from the index, and each of them only once. Supports the
+    parts of the dict interface used by this script (get, in and []). Can be shared between threads, and pickled to worker
+    processes, which reopen the index.
+    '''
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+        self._lookups = {}
+        self._local = threading.local()
 
-    parser = argparse.ArgumentParser(
-        description="This is a script for collecting a batch of library-level multiqc stats for individuals for which capture or shotgun data exists."
-    )
-    parser.add_argument(
-        "-r",
-        "--root_output_path",
-        help="The root directory where the eager output lies. Within this directory there should be the structure <analysis_type>/<site_id>/<individual_id>/*.",
-        required=False,
-        default="/mnt/archgen/Autorun_eager/eager_outputs/",
-    )
-    parser.add_argument(
-        "-i",
-        "--input",
-        help="Input file with a list of individuals for which capture or shotgun data exists.",
-        required=True,
-    )
-    parser.add_argument(
-        "-o",
-        "--output",
-        help="Output file with a list of individuals for which capture or shotgun data exists.",
-        required=True,
-    )
-    parser.add_argument(
-        "-a",
-        "--analysis_type",
-        help="Analysis type: capture or shotgun. Options are: SG, TF, TM, RP, RM, IM, YC. Defaults to TF.",
-        default="TF",
-        choices=["SG", "TF", "TM", "RP", "RM", "IM", "YC"],
+    def __getstate__(self):
+        return {"index_path": self.index_path}
+
+    def __setstate__(self, state):
+        self.__init__(state["index_path"])
+
+    def _connection(self) -> sqlite3.Connection:
+        ## SQLite connections cannot be shared between threads, so each thread opens its own.
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.index_path)
+            self._local.connection = connection
+        return connection
+
+    def get(self, full_id: str, default: Any = None) -> Any:
+        if full_id not in self._lookups:
+            row = self._connection().execute(
+                "SELECT main_id FROM main_ids WHERE full_id = ?", (full_id,)
+            ).fetchone()
+            self._lookups[full_id] = row[0] if row else None
+        main_id = self._lookups[full_id]
+        return default if main_id is None else main_id
+
+    def __contains__(self, full_id: str) -> bool:
+        return self.get(full_id) is not None
+
+    def __getitem__(self, full_id: str) -> str:
+        main_id = self.get(full_id)
+        if main_id is None:
+            raise KeyError(full_id)
+        return main_id
+
+def build_main_id_index(file_path: str, index_path: str, source: Dict[str, Any]) -> None:
+    '''
+    Builds an SQLite index of the main ID list. The index is written to a temporary file first and then moved into place,
+    so that concurrent runs never see a partially written index. source is stored with the index to detect when it is outdated.
+    '''
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp_path = "{}.{}.{}.tmp".format(index_path, os.getpid(), threading.get_ident())
+    try:
+        connection = sqlite3.connect(tmp_path)
+        try:
+            connection.execute("CREATE TABLE main_ids (full_id TEXT PRIMARY KEY, main_id TEXT NOT NULL) WITHOUT ROWID")
+            connection.execute("CREATE TABLE source (value TEXT NOT NULL)")
+            ## Later lines overwrite earlier ones, like in read_main_id_list
+            connection.executemany("INSERT OR REPLACE INTO main_ids VALUES (?, ?)", iter_main_id_list(file_path))
+            connection.execute("INSERT INTO source VALUES (?)", (json.dumps(source, sort_keys=True),))
+            connection.commit()
+        finally:
+            connection.close()
+        os.replace(tmp_path, index_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def open_main_id_index(file_path: str, cache_dir: str) -> Union[MainIdIndex, Dict[str, str], None]:
+    '''
+    Returns a lazily loaded MainIdIndex of the main ID list, (re)building its index in <cache_dir>/main_ids if the list has
+    changed since the index was built. Falls back to reading the whole list into a dictionary if the index cannot be used.
+    '''
+    if not os.path.isfile(file_path):
+        print(f"File {file_path} not found. Exiting.")
+        return None
+    source = {"version": VERSION, "path": os.path.abspath(file_path), "signature": file_signature(file_path)}
+    index_path = os.path.join(
+        cache_dir, "main_ids", hashlib.sha1(source["path"].encode()).hexdigest() + ".sqlite"
     )
-    parser.add_argument(
-        "--skip_check",
-        help="By default, results from runs where the consistency of the MultiQC output files cannot be verified will be skipped. Use this flag to disable this behaviour. Only recommended if you know why the check failed to begin with.",
-        default=False,
-        action="store_true",
+    try:
+        current_source = None
+        if os.path.isfile(index_path):
+            connection = sqlite3.connect(index_path)
+            try:
+                current_source = json.loads(connection.execute("SELECT value FROM source").fetchone()[0])
+            except (sqlite3.Error, TypeError, ValueError):
+                current_source = None
+            finally:
+                connection.close()
+        if current_source != source:
+            build_main_id_index(file_path, index_path, source)
+        else:
+            touch_cache_entry(index_path)
+    except (sqlite3.Error, OSError):
+        ## An index that cannot be written to should never stop the collection.
+        return read_main_id_list(file_path)
+    return MainIdIndex(index_path)
+
+def get_individual_paths(root_output_path: str, analysis_type: str, ind: str) -> Dict[str, str]:
+    '''
+    Infers the paths to the MultiQC data, MultiQC report, nf-core/eager input TSV and mapDamage results directory of an individual.
+    '''
+    ## Set input file path
+    mqc_data = "{}/{}/{}/{}/multiqc/multiqc_data/multiqc_data.json".format(
+        root_output_path, analysis_type, pH.get_site_id(ind), ind
     )
-    parser.add_argument(
-        "--main_id_list",
-        metavar="FILE",
-        help="A file with two columns, where the first column is the Pandora Full individual ID and the second column is the Pandora Main individual ID. This is used to map Full IDs to Main IDs.",
-        default="/mnt/archgen/tools/helper_scripts/assets/pandora_tables/pandora_main_ind_id_list.txt",
-        required=False,
+
+    ## Infer path to MQC report
+    report_path = mqc_data.replace(
+        "multiqc_data/multiqc_data.json", "multiqc_report.html"
     )
-    parser.add_argument(
-        "-H",
-        "--header",
-        help="Use human-readable header, instead of original MultiQC table header.",
-        default=False,
-        action="store_true",
+
+    ## Infer path to nf-core/eager input TSV
+    ##  Making the assumption that the eager_inputs and eager_outputs are in the same directory as the root_output_path
+    tsv_path = "{}/../eager_inputs/{}/{}/{}/{}.tsv".format(
+        root_output_path, analysis_type, pH.get_site_id(ind), ind, ind
     )
-    parser.add_argument(
-        "-v",
-        "--version",
-        action="version",
-        version="%(prog)s {}".format(VERSION),
-        help="Print the version and exit.",
+
+    ## Infer path to the directory containing the mapDamage results of all libraries
+    mapdamage_path = "{}/{}/{}/{}/mapdamage".format(
+        root_output_path, analysis_type, pH.get_site_id(ind), ind
     )
-    args = parser.parse_args()
+    return {"mqc_data": mqc_data, "report": report_path, "tsv": tsv_path, "mapdamage": mapdamage_path}
 
-    ## Print version info to stderr on runtime
-    print("## {}: {}".format(parser.prog, VERSION), file=sys.stderr)
+def _list_directories(path: str) -> List[os.DirEntry]:
+    '''
+    Lists the subdirectories of path with a single os.scandir call. Returns an empty list if path does not exist.
+    '''
+    try:
+        with os.scandir(path) as entries:
+            return [entry for entry in entries if entry.is_dir()]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
 
-    ## Loudly declare when the script is run with the --skip_check flag
-    if args.skip_check:
-        print(
-            "WARNING: Skipping the check for consistency between MultiQC data and report files. This may result in the inclusion of outdated results, or runtime errors!",
-            file=sys.stderr,
-        )
+def discover_individuals(root_output_path: str, analysis_type: str) -> Dict[str, Dict[str, Any]]:
+    '''
+    Walks <root_output_path>/<analysis_type> and the matching eager_inputs directory once, and returns the paths and
+    signatures (modification time and size) of the MultiQC data, MultiQC report, eager input TSV and mapDamage results
+    of each individual found. Files that do not exist have a signature of None. Only files of individuals that have
+    an output directory are stat'ed, so no stat calls are made for individuals that do not exist.
+    '''
+    individuals = {}
+    for site_entry in _list_directories(os.path.join(root_output_path, analysis_type)):
+        for ind_entry in _list_directories(site_entry.path):
+            ind = ind_entry.name
+            ## Skip directories that are not where the paths of the individual would be inferred from its ID
+            if pH.get_site_id(ind) != site_entry.name:
+                continue
+            paths = get_individual_paths(root_output_path, analysis_type, ind)
+            with os.scandir(ind_entry.path) as entries:
+                subdirectories = {entry.name for entry in entries if entry.is_dir()}
+            signatures = {"mqc_data": None, "report": None, "tsv": None, "mapdamage": None}
+            if "multiqc" in subdirectories:
+                signatures["mqc_data"] = file_signature(paths["mqc_data"])
+                signatures["report"] = file_signature(paths["report"])
+            if "mapdamage" in subdirectories:
+                signatures["mapdamage"] = file_signature(paths["mapdamage"])
+            individuals[ind] = {"paths": paths, "signatures": signatures}
 
-    ## Read in list of individuals
-    with open(args.input, "r") as f:
-        individuals = [pH._remove_suffix(_) for _ in f.read().splitlines()]
-        print(
-            "Found {} individuals in input file.".format(len(individuals)), file=sys.stderr
+    ## The eager input TSVs are in a separate tree, so only look for those of individuals that were found.
+    inputs_path = os.path.join(root_output_path, "..", "eager_inputs", analysis_type)
+    for site_entry in _list_directories(inputs_path):
+        for ind_entry in _list_directories(site_entry.path):
+            if ind_entry.name in individuals:
+                individual = individuals[ind_entry.name]
+                individual["signatures"]["tsv"] = file_signature(individual["paths"]["tsv"])
+    return individuals
+
+def build_manifest(root_output_path: str, analysis_types: List[str]) -> Dict[str, Any]:
+    '''
+    Discovers the individuals of each analysis type under root_output_path, walking the analysis types in parallel.
+    Returns a manifest with the individuals of each analysis type, and their paths and signatures.
+    '''
+    with ThreadPoolExecutor(max_workers=max(1, len(analysis_types))) as executor:
+        discovered = list(
+            executor.map(partial(discover_individuals, root_output_path), analysis_types)
         )
+    return {
+        "version": VERSION,
+        "root_output_path": root_output_path,
+        "created": time.time(),
+        "analysis_types": dict(zip(analysis_types, discovered)),
+    }
 
-    ## Read list of main IDs
-    main_id_dict = read_main_id_list(args.main_id_list)
+def write_manifest(file_path: str, manifest: Dict[str, Any]) -> None:
+    '''
+    Writes a manifest as JSON.
+    '''
+    with open(file_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
 
-    ## Iterate over individuals and collect stats
-    collected_stats = {}
-    skip_count = 0
-    for ind in individuals:
-        ## Set input file path
-        mqc_data = "{}/{}/{}/{}/multiqc/multiqc_data/multiqc_data.json".format(
-            args.root_output_path, args.analysis_type, pH.get_site_id(ind), ind
-        )
+@contextmanager
+def record_time(timings: Union[Dict[str, float], None], stage: str):
+    '''
+    Adds the wall time spent in the with block to timings[stage]. Does nothing if timings is None.
+    '''
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
 
-        ## Infer path to MQC report
-        report_path = mqc_data.replace(
-            "multiqc_data/multiqc_data.json", "multiqc_report.html"
-        )
+def record_bytes(timings: Union[Dict[str, float], None], *paths: str) -> None:
+    '''
+    Adds the size on disk of the files at paths to timings["bytes_on_disk"]. This is not the number of bytes actually read,
+    which can be much smaller, e.g. when only the general stats are decoded from a memory-mapped MultiQC data JSON.
+    Does nothing if timings is None.
+    '''
+    if timings is None:
+        return
+    for path in paths:
+        signature = file_signature(path)
+        if signature is not None:
+            timings["bytes_on_disk"] = timings.get("bytes_on_disk", 0) + signature[1]
+
+def run_timed(func, task: Any) -> Tuple[Any, Dict[str, float]]:
+    '''
+    Runs func on task with a new timings dictionary, and returns the result together with the timings, including the total
+    wall time. Used to collect the timings of each task from worker threads or processes.
+    '''
+    timings = {}
+    start = time.perf_counter()
+    result = func(task, timings=timings)
+    timings["total"] = time.perf_counter() - start
+    return (result, timings)
 
-        ## Infer path to nf-core/eager input TSV
-        ##  Making the assumption that the eager_inputs and eager_outputs are in the same directory as the root_output_path
-        tsv_path = "{}/../eager_inputs/{}/{}/{}/{}.tsv".format(
-            args.root_output_path, args.analysis_type, pH.get_site_id(ind), ind, ind
+def collect_individual(
+    task: Union[Tuple[str, str, Dict[str, str]], Tuple[str, str, Dict[str, str], Dict[str, Any]]],
+    main_id_dict: Dict[str, str] = None,
+    skip_check: bool = False,
+    cache_dir: str = None,
+    json_parser: str = "auto",
+    schema: Dict[str, Any] = DEFAULT_SCHEMA,
+    timings: Dict[str, float] = None,
+) -> Tuple[str, Dict[str, Dict]]:
+    '''
+    Collects the library stats of a single individual for a single analysis type (data_type), including the eager input TSV columns of the schema, projected onto the output columns of the schema.
+    Returns a status ("collected", "cached", "inconsistent" or "missing") and the collected stats.
+    Does not print anything, so that it can be run in a worker pool with the reporting done in input order by the caller.
+    If a cache_dir is given, the results are stored there, and reused as long as none of the input files have changed.
+    If a timings dictionary is given, the wall time of each step and the size on disk of the files read are added to it.
+    Tasks from prefetch_individuals carry a fourth element with the file signatures and eager input TSV contents, which are then not read again.
+    '''
+    ind, data_type, paths = task[:3]
+    prefetched = task[3] if len(task) > 3 else {}
+    try:
+        ## First, ensure the MQC data are consistent with the report. Each file is only stat'ed once, for this check and the cache key.
+        with record_time(timings, "signatures_are_consistent"):
+            signatures = prefetched.get("signatures") or get_file_signatures(paths)
+            consistent = signatures_are_consistent(signatures["mqc_data"], signatures["report"], skip_check)
+        if not consistent:
+            return ("inconsistent", {})
+        if cache_dir is not None:
+            with record_time(timings, "cache"):
+                ## Any change to the MultiQC data, report or eager input TSV invalidates the cached results. The paths are part of
+                ## the key, so that copies of a tree with the same modification times and sizes (e.g. a test tree) never share results.
+                cache_key = {"version": VERSION, "data_type": data_type, "schema": schema["fingerprint"]}
+                cache_key.update(signatures)
+                cache_key["paths"] = {name: os.path.abspath(paths[name]) for name in INDIVIDUAL_FILES}
+                cached = read_cache_entry(cache_dir, data_type, ind, cache_key)
+            ## Libraries merged under a Main_Individual_Id also depend on the main ID list, so check those mappings are unchanged.
+            if cached is not None and cached["main_ids"] == get_main_id_mappings(cached["stats"], main_id_dict):
+                return ("cached", cached["stats"])
+        with record_time(timings, "get_individual_library_stats"):
+            stats = get_individual_library_stats(paths["mqc_data"], data_type, main_id_dict, json_parser, schema)
+        record_bytes(timings, paths["mqc_data"])
+        ## Read in eager input TSV data and add to the collected stats
+        if schema["schema"].get("tsv_columns"):
+            with record_time(timings, "get_eager_tsv_data"):
+                tsv_dat = get_eager_tsv_data(paths["tsv"], schema["schema"]["tsv_columns"], prefetched.get("tsv"))
+            record_bytes(timings, paths["tsv"])
+            for library in tsv_dat:
+                stats[library].update(tsv_dat[library])
+        stats = project_library_stats(stats, schema)
+    except FileNotFoundError:
+        return ("missing", {})
+    if cache_dir is not None:
+        write_cache_entry(
+            cache_dir,
+            data_type,
+            ind,
+            cache_key,
+            {"stats": stats, "main_ids": get_main_id_mappings(stats, main_id_dict)},
         )
+    return ("collected", stats)
 
-        ## Get stats
-        try:
-            ## First, ensure the MQC data are consistent with the report
-            if files_are_consistent(mqc_data, report_path, args.skip_check):
-                collected_stats.update(get_individual_library_stats(mqc_data, args.analysis_type, main_id_dict))
-                ## Read in eager input TSV data and add to the collected stats
-                tsv_dat = get_eager_tsv_data(tsv_path, ["UDG_Treatment", "Strandedness"])
-                for library in tsv_dat:
-                    collected_stats[library].update(tsv_dat[library])
-            else:
-                print(
-                    f"WARNING: There is a large difference in the creation time between the MultiQC data file '{mqc_data}' and the corresponding HTML '{report_path}'. Skipping.",
-                    file=sys.stderr,
-                )
-                skip_count += 1
-                continue
-        except FileNotFoundError:
-            print(
-                "No multiqc data found for individual {}. Skipping.".format(ind),
-                file=sys.stderr,
-            )
-            skip_count += 1
-            continue
-        print("Collected stats for individual {}.".format(ind), file=sys.stderr)
-    
-    ## Collect mapdamage results where needed, and include read length distribution info in the output
-    md_results_dirs = []
-    for library in collected_stats:
-        try:
-            if 'mapDamage_mqc-generalstats-mapdamage-mapdamage_3_Prime1' in collected_stats[library]:
-                md_results_dirs.append(
-                    '{}/{}/{}/{}/mapdamage/results_{}_rmdup'.format(
-                        args.root_output_path,
-                        args.analysis_type,
-                        pH.get_site_id(library),
-                        pH.get_ind_id(library),
-                        library
-                        )
-                    )
-        except FileNotFoundError:
-            print("Warning: Could not generate read length distribution information for library: {} ".format(library), file=sys.stderr)
-            continue
-    md_results = pyEager.collect_mapdamage_results(md_results_dirs)
-    for result_folder_name in md_results:
-        try:
-            ## Take the basename of the file, then remove "results_" and "_rmdup" to get the library name
-            library = result_folder_name.split('/')[-1].replace("_rmdup", "").replace("results_", "")
-            collected_stats[library]['mean_read_length']    = md_results[result_folder_name]['summary_stats']['mean_readlength'].iloc[0]
-            collected_stats[library]['median_read_length']  = md_results[result_folder_name]['summary_stats']['median'].iloc[0]
-            collected_stats[library]['read_length_std_dev'] = md_results[result_folder_name]['summary_stats']['std'].iloc[0]
-        except KeyError:
-            print("Warning: Could not incorporate read length distribution information for library: {} ".format(library), file=sys.stderr)
-            continue
+def get_main_id_mappings(stats: Dict[str, Dict], main_id_dict: Dict[str, str] = None) -> Dict[str, Union[str, None]]:
+    '''
+    Returns the Main_Individual_Id that each individual ID of the collected libraries maps to (None if not in the list).
+    '''
+    if main_id_dict is None:
+        main_id_dict = {}
+    individual_ids = {pH.get_ind_id(library) for library in stats}
+    return {ind_id: main_id_dict.get(ind_id) for ind_id in sorted(individual_ids)}
 
-    ## Print number of skipped individuals to stderr if any
-    if skip_count > 0:
-        print(
-            "WARNING: No data was found for {} individuals!".format(skip_count),
-            file=sys.stderr,
-        )
+def get_library_values(library: str, stats: Dict, output_columns: Dict[str, str]) -> List[Any]:
+    '''
+    Returns the values of a row of the output table for a library, starting with the library ID.
+    '''
+    try:
+        return [library] + [stats[column] for column in output_columns.values()]
+    except KeyError as e:
+        raise Exception(
+            f"Encountered an error while trying to print stats for library: {library}."
+        ) from e
 
-    ## Print results to output file
-    with open(args.output, "w") as f:
-        ## Add header
-        if args.header:
-            print("Sample", *output_columns.keys(), sep="\t", file=f)
-        else:
-            print("Sample", *output_columns.values(), sep="\t", file=f)
-        ## Add data
-        for library in sorted(collected_stats.keys()):
-            try:
-                print(
+def format_library_row(library: str, stats: Dict, output_columns: Dict[str, str]) -> str:
+    '''
+    Formats the stats of a library as a line of the output table.
+    '''
+    return "\t".join([str(value) for value in get_library_values(library, stats, output_columns)])
+
+class SortedRowSpill:
+    '''
+    Holds the formatted rows of the output table, keyed by (library, data_type). If max_rows is given, the rows are sorted and
+    spilled to a temporary file whenever max_rows rows are held in memory, so that the memory usage does not depend on the number
+    of rows. sorted_rows() merges the spilled chunks and the rows still in memory in sorted order. Like a dictionary, a row added
+    later replaces an earlier row with the same key.
+    '''
+    def __init__(self, max_rows: int = None):
+        self.max_rows = max_rows
+        self._rows = []
+        self._chunks = []
+        self._tmp_dir = None
+        self._n_added = 0
+
+    def add(self, key: Tuple[str, str], row: str) -> None:
+        ## The running number keeps rows with the same key in the order they were added.
+        self._rows.append((key[0], key[1], self._n_added, row))
+        self._n_added += 1
+        if self.max_rows is not None and len(self._rows) >= self.max_rows:
+            self.spill()
+
+    def spill(self) -> None:
+        '''
+        Writes the rows in memory to a sorted chunk file.
+        '''
+        if not self._rows:
+            return
+        if self._tmp_dir is None:
+            self._tmp_dir = tempfile.mkdtemp(prefix="collect_results.")
+        chunk_path = os.path.join(self._tmp_dir, "chunk_{}.tsv".format(len(self._chunks)))
+        self._rows.sort()
+        with open(chunk_path, "w") as f:
+            for library, data_type, n_added, row in self._rows:
+                f.write("{}\t{}\t{}\t{}\n".format(library, data_type, n_added, row))
+        self._chunks.append(chunk_path)
+        self._rows = []
+
+    @staticmethod
+    def _read_chunk(chunk_path: str):
+        with open(chunk_path, "r") as f:
+            for line in f:
+                library, data_type, n_added, row = line.rstrip("\n").split("\t", 3)
+                yield (library, data_type, int(n_added), row)
+
+    def sorted_rows(self, data_types: List[str] = None):
+        '''
+        Yields the (key, row) of all rows, sorted by library and analysis type, optionally only for the given analysis types.
+        '''
+        self._rows.sort()
+        previous = None
+        for library, data_type, n_added, row in heapq.merge(self._rows, *[self._read_chunk(path) for path in self._chunks]):
+            if data_types is not None and data_type not in data_types:
+                continue
+            ## Rows with the same key are adjacent, and the last one added wins.
+            if previous is not None and previous[0] != (library, data_type):
+                yield previous
+            previous = ((library, data_type), row)
+        if previous is not None:
+            yield previous
+
+    def close(self) -> None:
+        '''
+        Removes the spilled chunks.
+        '''
+        if self._tmp_dir is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+        self._chunks = []
+
+def build_output_dataframe(rows: List[List[Any]], header: List[str]):
+    '''
+    Builds a typed pandas DataFrame of the output table. 'N/A' values become NaN, and columns in which all values are
+    numbers (or NaN) get a numeric dtype. Requires pandas.
+    '''
+    import pandas as pd
+    df = pd.DataFrame(
+        [[None if value == "N/A" else value for value in row] for row in rows],
+        columns=header,
+    )
+    for column in df.columns:
+        try:
+            df[column] = pd.to_numeric(df[column])
+        except (ValueError, TypeError):
+            pass
+    return df
+
+def write_output_dataframe(df, file_path: str, output_format: str, footer: List[str]) -> None:
+    '''
+    Writes the output table in a columnar or compressed format. The footer lines with the version and command are
+    stored as file metadata (under the 'collect_results' key) for parquet and feather, and appended as '## ' lines for csv.gz.
+    Requires pandas, and pyarrow for parquet and feather.
+    '''
+    if output_format == "csv.gz":
+        with gzip.open(file_path, "wt") as f:
+            df.to_csv(f, index=False)
+            for line in footer:
+                print(line, file=f)
+        return
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b"collect_results"] = "\n".join(footer).encode()
+    table = table.replace_schema_metadata(metadata)
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, file_path)
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(table, file_path)
+
+def read_output_table(file_path: str, output_columns: Dict[str, str]) -> Tuple[bool, Dict[Tuple[str, Union[str, None]], str], List[str]]:
+    '''
+    Reads an output table written by this script. Returns whether the human-readable header was used, a dictionary
+    with the Library_ID and Data_type as key and the unchanged table line as value, and the footer lines.
+    The Data_type is None if the table has no Data_type column.
+    '''
+    with open(file_path, "r") as f:
+        lines = f.read().splitlines()
+    if not lines:
+        raise ValueError(f"The file '{file_path}' is empty.")
+
+    header = lines[0].split("\t")
+    if header == ["Sample", *output_columns.keys()]:
+        human_header = True
+    elif header == ["Sample", *output_columns.values()]:
+        human_header = False
+    else:
+        raise ValueError(
+            f"The columns of '{file_path}' do not match the output columns of this version of the script. Please run a full collection instead."
+        )
+    data_type_index = header.index("Data_type") if "Data_type" in header else None
+
+    rows = {}
+    footer = []
+    for line in lines[1:]:
+        if line.startswith("## "):
+            footer.append(line)
+        elif line:
+            fields = line.split("\t")
+            data_type = fields[data_type_index] if data_type_index is not None else None
+            rows[(fields[0], data_type)] = line
+    return (human_header, rows, footer)
+
+def get_command_analysis_types(command: str) -> List[str]:
+    '''
+    Returns the analysis types given with -a in a command line recorded in the footer of an output table.
+    '''
+    match = re.search(r" -a (.*)$", command)
+    analysis_types = []
+    if match:
+        for token in match.group(1).split():
+            if token not in ANALYSIS_TYPES:
+                break
+            analysis_types.append(token)
+    return analysis_types
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    '''
+    Parses a shard given as i/N, where i is between 1 and N (like the task IDs of an SGE array job).
+    '''
+    match = re.fullmatch(r"([0-9]+)/([0-9]+)", value)
+    if not match or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        raise argparse.ArgumentTypeError(f"invalid shard '{value}', expected i/N with 1 <= i <= N (e.g. 3/20)")
+    return (int(match.group(1)), int(match.group(2)))
+
+def in_shard(ind: str, shard: Tuple[int, int]) -> bool:
+    '''
+    Returns whether an individual belongs to a shard. Individuals are assigned to shards by a checksum of their Site_ID,
+    so that the assignment is the same in every run, and all individuals of a site are collected by the same shard.
+    '''
+    index, n_shards = shard
+    return zlib.crc32(pH.get_site_id(ind).encode()) % n_shards == index - 1
+
+def read_shard(file_path: str) -> Tuple[List[str], List[str]]:
+    '''
+    Reads the header and footer of an output table written with --shard, without keeping its rows in memory.
+    '''
+    footer = []
+    with open(file_path, "r") as f:
+        header = f.readline().rstrip("\n").split("\t")
+        for line in f:
+            if line.startswith("## "):
+                footer.append(line.rstrip("\n"))
+    return (header, footer)
+
+def iter_shard_rows(file_path: str, data_type_index: Union[int, None]):
+    '''
+    Yields the (Library_ID, Data_type) and unchanged line of each row of an output table. Tables without a Data_type column
+    have a Data_type of ''.
+    '''
+    with open(file_path, "r") as f:
+        f.readline()
+        for line in f:
+            line = line.rstrip("\n")
+            if not line or line.startswith("## "):
+                continue
+            fields = line.split("\t")
+            yield ((fields[0], fields[data_type_index] if data_type_index is not None else ""), line)
+
+def merge_shards(shard_paths: List[str], output: str) -> Tuple[int, int]:
+    '''
+    Merges the output tables of all shards of a --shard run into a single table sorted by library and analysis type, with a single
+    footer and the summed skip counts. Each shard is already sorted, so the shards are merged as streams. Raises a ValueError if the
+    shards are not from the same run, or if any shard is missing. Returns the number of rows written and the summed skip count.
+    '''
+    headers = []
+    commands = []
+    versions = set()
+    shards = []
+    skip_count = 0
+    for path in shard_paths:
+        header, footer = read_shard(path)
+        headers.append(header)
+        command = [line for line in footer if line.startswith("## Command:")]
+        skipped = [line for line in footer if line.startswith("## Skipped:")]
+        shard = re.search(r" --shard ([0-9]+)/([0-9]+)", command[-1]) if command else None
+        if shard is None or not skipped:
+            raise ValueError(f"'{path}' was not written with --shard.")
+        shards.append((int(shard.group(1)), int(shard.group(2))))
+        ## The shards only differ in their --shard and -o options, so the command of the merged table uses the merged output instead
+        commands.append(re.sub(r" -o \S+", lambda match: " -o {}".format(output), command[-1].replace(shard.group(0), ""), count=1))
+        versions.update(line for line in footer if not line.startswith(("## Command:", "## Skipped:")))
+        skip_count += int(skipped[-1].split(":", 1)[1])
+    if any(header != headers[0] for header in headers) or len(set(commands)) > 1 or len(versions) > 1:
+        raise ValueError("The shards were not written by the same command and version of the script.")
+    n_shards = shards[0][1]
+    if sorted(shards) != [(index, n_shards) for index in range(1, n_shards + 1)]:
+        missing = sorted(set(range(1, n_shards + 1)) - {index for index, total in shards if total == n_shards})
+        raise ValueError(
+            "Expected each of the {} shards exactly once.{}".format(
+                n_shards, " Missing shard(s): {}.".format(", ".join(map(str, missing))) if missing else ""
+            )
+        )
+
+    data_type_index = headers[0].index("Data_type") if "Data_type" in headers[0] else None
+    n_rows = 0
+    with open(output, "w") as f:
+        print(*headers[0], sep="\t", file=f)
+        previous = None
+        ## Rows with the same key are adjacent after merging, and the last shard wins, like a dictionary would.
+        for key, line in heapq.merge(*[iter_shard_rows(path, data_type_index) for path in shard_paths], key=lambda row: row[0]):
+            if previous is not None and previous[0] != key:
+                print(previous[1], file=f)
+                n_rows += 1
+            previous = (key, line)
+        if previous is not None:
+            print(previous[1], file=f)
+            n_rows += 1
+        for line in sorted(versions):
+            print(line, file=f)
+        print(commands[0], file=f)
+        print("## Skipped: {}".format(skip_count), file=f)
+    return (n_rows, skip_count)
+
+def merge_main(argv: List[str]) -> None:
+    '''
+    The merge subcommand, which combines the output tables of all shards of a --shard run.
+    '''
+    parser = argparse.ArgumentParser(
+        prog="collect_results.py merge",
+        description="Merge the output tables of all shards of a collect_results.py --shard run into a single table, sorted by library and analysis type, with a single footer and the summed skip counts.",
+    )
+    parser.add_argument("shards", metavar="SHARD", help="The output tables of the shards.", nargs="+")
+    parser.add_argument("-o", "--output", help="The merged output table.", required=True)
+    args = parser.parse_args(argv)
+    print("## {}: {}".format(parser.prog, VERSION), file=sys.stderr)
+    try:
+        n_rows, skip_count = merge_shards(args.shards, args.output)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: Cannot merge shards: {e}", file=sys.stderr)
+        sys.exit(1)
+    print("Merged {} rows from {} shards into '{}'.".format(n_rows, len(args.shards), args.output), file=sys.stderr)
+    if skip_count > 0:
+        print("WARNING: No data was found for {} individuals!".format(skip_count), file=sys.stderr)
+
+def get_sqlite_columns(output_columns: Dict[str, str], schema: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+    '''
+    Returns the name, header and SQLite type of each output column stored in an SQLite sink. The columns taken from the
+    eager input TSV are TEXT, and all other (MultiQC) columns are REAL. The Data_type is part of the key, so it is left out.
+    '''
+    text_columns = set(schema["schema"].get("tsv_columns") or [])
+    return [
+        (name, header, "TEXT" if header in text_columns else "REAL")
+        for name, header in output_columns.items()
+        if name != "Data_type"
+    ]
+
+def quote_sqlite_identifier(name: str) -> str:
+    return '"{}"'.format(name.replace('"', '""'))
+
+def open_sqlite_sink(file_path: str, output_columns: Dict[str, str], schema: Dict[str, Any]) -> sqlite3.Connection:
+    '''
+    Opens (or creates) an SQLite database with a library_stats table holding one row per library, analysis type and
+    modification time of the MultiQC report it was collected from, so that earlier results of reprocessed libraries are kept.
+    The table is indexed by Site_ID and Individual_ID, and by Library_ID through its primary key. Columns of the output
+    columns that the table does not have yet (e.g. from a custom schema) are added.
+    '''
+    connection = sqlite3.connect(file_path, timeout=60)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    columns = get_sqlite_columns(output_columns, schema)
+    with connection:
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS library_stats (Library_ID TEXT NOT NULL, Data_type TEXT NOT NULL, Report_mtime REAL NOT NULL, "
+            "Site_ID TEXT, Individual_ID TEXT, Collected_at REAL, PRIMARY KEY (Library_ID, Data_type, Report_mtime))"
+        )
+        existing = {row[1] for row in connection.execute("PRAGMA table_info(library_stats)")}
+        for name, header, sqlite_type in columns:
+            if name not in existing:
+                connection.execute("ALTER TABLE library_stats ADD COLUMN {} {}".format(quote_sqlite_identifier(name), sqlite_type))
+        connection.execute("CREATE INDEX IF NOT EXISTS library_stats_site ON library_stats (Site_ID, Data_type)")
+        connection.execute("CREATE INDEX IF NOT EXISTS library_stats_individual ON library_stats (Individual_ID, Data_type)")
+    return connection
+
+def write_sqlite_rows(
+    connection: sqlite3.Connection,
+    collected_stats: Dict[Tuple[str, str], Dict],
+    report_mtimes: Dict[Tuple[str, str], float],
+    output_columns: Dict[str, str],
+    schema: Dict[str, Any],
+) -> int:
+    '''
+    Upserts the collected stats of each library into the library_stats table of an SQLite sink, in a single transaction.
+    'N/A' values are stored as NULL. Returns the number of rows written.
+    '''
+    columns = get_sqlite_columns(output_columns, schema)
+    statement = "INSERT OR REPLACE INTO library_stats (Library_ID, Data_type, Report_mtime, Site_ID, Individual_ID, Collected_at, {}) VALUES ({})".format(
+        ", ".join(quote_sqlite_identifier(name) for name, header, sqlite_type in columns),
+        ", ".join(["?"] * (len(columns) + 6)),
+    )
+    collected_at = time.time()
+    rows = []
+    for (library, data_type), stats in collected_stats.items():
+        rows.append(
+            (library, data_type, report_mtimes[(library, data_type)], pH.get_site_id(library), pH.get_ind_id(library), collected_at)
+            + tuple(None if stats[header] == "N/A" else stats[header] for name, header, sqlite_type in columns)
+        )
+    with connection:
+        connection.executemany(statement, rows)
+    return len(rows)
+
+def get_split_output_path(output: str, data_type: str) -> str:
+    '''
+    Returns the path of the output file for a single analysis type, by inserting the analysis type before the
+    extension of the output file name (e.g. collected_data.txt -> collected_data.TF.txt).
+    '''
+    directory, name = os.path.split(output)
+    stem, dot, extension = name.partition(".")
+    return os.path.join(directory, "{}.{}{}{}".format(stem, data_type, dot, extension))
+
+def get_changed_individuals(
+    tasks: List[Tuple[str, str, Dict[str, str]]], since: float, known_individuals: set
+) -> List[Tuple[str, str, Dict[str, str]]]:
+    '''
+    Returns the tasks of individuals (and analysis types) that are not in known_individuals, or for which any of the
+    MultiQC data, MultiQC report, eager input TSV or mapDamage results have been modified after the timestamp since
+    (or no longer exist).
+    '''
+    changed = []
+    for ind, data_type, paths in tasks:
+        if (ind, data_type) not in known_individuals:
+            changed.append((ind, data_type, paths))
+            continue
+        for name, path in paths.items():
+            signature = file_signature(path)
+            ## Not all runs have mapDamage results, so only their modification matters
+            if (signature is None and name != "mapdamage") or (signature is not None and signature[0] > since):
+                changed.append((ind, data_type, paths))
+                break
+    return changed
+
+def get_library_owner(library: str, individuals: set, main_id_dict: Dict[str, str] = None) -> Union[str, None]:
+    '''
+    Returns the individual in individuals under which the library was collected, either its own Individual_ID or its
+    Main_Individual_Id. Returns None if the library belongs to none of the individuals.
+    '''
+    ind_id = pH.get_ind_id(library)
+    if ind_id in individuals:
+        return ind_id
+    if main_id_dict is not None and main_id_dict.get(ind_id) in individuals:
+        return main_id_dict[ind_id]
+    return None
+
+def read_length_stats(lgdistribution: str) -> Dict[str, float]:
+    '''
+    Computes the weighted mean, median and standard deviation of the read lengths in a mapDamage lgdistribution.txt file,
+    summing the occurrences of both strands. The results are identical to the summary stats of pyEager.parse_mapdamage_results,
+    but none of the other mapDamage results are read.
+    '''
+    occurrences = {}
+    header_seen = False
+    with open(lgdistribution, "r") as f:
+        for line in f:
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            ## The first non-comment line is the header (Std, Length, Occurences)
+            if not header_seen:
+                header_seen = True
+                continue
+            length = int(fields[1])
+            occurrences[length] = occurrences.get(length, 0.0) + float(fields[2])
+    if not occurrences:
+        return {"mean": 0.0, "median": 0.0, "std": 0.0}
+    import numpy as np
+    lengths = np.array(sorted(occurrences), dtype=np.int64)
+    weights = np.array([occurrences[length] for length in lengths], dtype=np.float64)
+    ## The median is the first length at which the cumulative occurrences reach half of the total
+    median = lengths[np.cumsum(weights) >= weights.sum() / 2.][0]
+    mean = np.average(lengths, weights=weights)
+    std = np.sqrt(np.average((lengths - mean) ** 2, weights=weights))
+    return {"mean": float(mean), "median": float(median), "std": float(std)}
+
+def collect_read_length_stats(
+    task: Tuple[str, str, str], cache_dir: Union[str, None] = None, timings: Dict[str, float] = None
+) -> Tuple[str, Union[Dict[str, float], None]]:
+    '''
+    Collects the read length stats of a single library and analysis type from the lgdistribution.txt file in its
+    mapDamage results directory. Returns a tuple of the status ("collected", "cached" or "missing") and the stats.
+    '''
+    library, data_type, results_dir = task
+    lgdistribution = os.path.join(results_dir, "lgdistribution.txt")
+    signature = file_signature(lgdistribution)
+    if signature is None:
+        return ("missing", None)
+    cache_key = {"version": VERSION, "lgdistribution": os.path.abspath(lgdistribution), "signature": signature}
+    if cache_dir is not None:
+        stats = read_cache_entry(cache_dir, os.path.join(data_type, "mapdamage"), library, cache_key)
+        if stats is not None:
+            return ("cached", stats)
+    with record_time(timings, "read_length_stats"):
+        stats = read_length_stats(lgdistribution)
+    record_bytes(timings, lgdistribution)
+    if cache_dir is not None:
+        write_cache_entry(cache_dir, os.path.join(data_type, "mapdamage"), library, cache_key, stats)
+    return ("collected", stats)
+
+def get_mapdamage_results_dir(root_output_path: str, library: str, data_type: str) -> str:
+    '''
+    Infers the path to the mapDamage results directory of a library.
+    '''
+    return '{}/{}/{}/{}/mapdamage/results_{}_rmdup'.format(
+        root_output_path,
+        data_type,
+        pH.get_site_id(library),
+        pH.get_ind_id(library),
+        library
+    )
+
+def add_read_length_stats(
+    collected_stats: Dict[Tuple[str, str], Dict],
+    root_output_path: str,
+    schema: Dict[str, Any],
+    cache_dir: Union[str, None] = None,
+    threads: int = 1,
+    processes: int = 1,
+) -> List[Dict[str, Any]]:
+    '''
+    Adds the read length stats from the mapDamage results to the collected stats of each library that needs them, i.e. libraries
+    whose schema version takes the read lengths from mapDamage, and that do not have them in the general stats yet.
+    Returns the timings of each library that was read.
+    '''
+    md_tasks = []
+    for library, data_type in collected_stats:
+        read_length_columns = needs_mapdamage_read_lengths(collected_stats[(library, data_type)], schema)
+        if read_length_columns:
+            md_tasks.append(
+                (
                     library,
-                    *[
-                        collected_stats[library][column]
-                        for column in output_columns.values()
-                    ],
-                    sep="\t",
-                    file=f,
+                    data_type,
+                    get_mapdamage_results_dir(root_output_path, library, data_type),
+                    read_length_columns,
                 )
-            except KeyError as e:
-                raise Exception(
-                    f"Encountered an error while trying to print stats for library: {library}."
-                ) from e
+            )
+    collect_read_lengths = partial(collect_read_length_stats, cache_dir=cache_dir)
+    library_timings = []
+    for (library, data_type, results_dir, read_length_columns), ((status, md_stats), task_timings) in zip(
+        md_tasks,
+        map_individuals(
+            partial(run_timed, collect_read_lengths), [task[:3] for task in md_tasks], threads, processes
+        ),
+    ):
+        library_timings.append(
+            {
+                "library": library,
+                "analysis_type": data_type,
+                "status": status,
+                "seconds": {step: seconds for step, seconds in task_timings.items() if step != "bytes_on_disk"},
+                "bytes_on_disk": task_timings.get("bytes_on_disk", 0),
+            }
+        )
+        if status == "missing":
+            print("Warning: Could not generate read length distribution information for library: {} ".format(library), file=sys.stderr)
+            continue
+        for stat, header in read_length_columns.items():
+            collected_stats[(library, data_type)][header] = md_stats[stat]
+    return library_timings
+
+def _prefetch_file(path: str, read: bool = False, readahead: bool = False) -> Tuple[Union[List[float], None], Union[str, None]]:
+    '''
+    Stats a file, and either reads its contents, or asks the OS to start reading it ahead into the page cache.
+    Returns the signature of the file, and its contents if they were read. Any error is left for the parser to report.
+    '''
+    signature = file_signature(path)
+    contents = None
+    if signature is None:
+        return (signature, contents)
+    try:
+        if read:
+            with open(path, "r") as f:
+                contents = f.read()
+        elif readahead and hasattr(os, "posix_fadvise"):
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+    except OSError:
+        pass
+    return (signature, contents)
+
+async def _prefetch_individual(
+    task: Tuple[str, str, Dict[str, str]], semaphore: "asyncio.Semaphore", executor: ThreadPoolExecutor
+) -> Tuple[str, str, Dict[str, str], Dict[str, Any]]:
+    '''
+    Prefetches the files of an individual concurrently, with at most as many file operations in flight as the semaphore allows.
+    '''
+    import asyncio
+    ind, data_type, paths = task
+    loop = asyncio.get_event_loop()
+
+    async def prefetch(name: str):
+        async with semaphore:
+            return await loop.run_in_executor(
+                executor, partial(_prefetch_file, paths[name], read=(name == "tsv"), readahead=(name == "mqc_data"))
+            )
+
+    results = await asyncio.gather(*[prefetch(name) for name in INDIVIDUAL_FILES])
+    prefetched = {
+        "signatures": {name: signature for name, (signature, contents) in zip(INDIVIDUAL_FILES, results)},
+        "tsv": results[INDIVIDUAL_FILES.index("tsv")][1],
+    }
+    return (ind, data_type, paths, prefetched)
+
+def prefetch_individuals(tasks: List[Tuple[str, str, Dict[str, str]]], limit: int):
+    '''
+    Stats the MultiQC data, MultiQC report and eager input TSV of each individual, reads the eager input TSV and starts the readahead of
+    the MultiQC data, on an asyncio event loop in a background thread, with at most limit file operations in flight. Tasks are yielded
+    in order as soon as they are ready, while the files of up to limit individuals ahead are prefetched, so that the latency of the
+    file system overlaps with parsing. The yielded tasks carry the prefetched data for collect_individual as a fourth element.
+    '''
+    import asyncio
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    executor = ThreadPoolExecutor(max_workers=limit)
+
+    async def make_semaphore():
+        ## Created on the event loop, since older versions of asyncio bind it to the loop it is created on.
+        return asyncio.Semaphore(limit)
+
+    semaphore = asyncio.run_coroutine_threadsafe(make_semaphore(), loop).result()
+    pending = deque()
+    try:
+        for task in tasks:
+            pending.append(asyncio.run_coroutine_threadsafe(_prefetch_individual(task, semaphore, executor), loop))
+            if len(pending) >= limit:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        executor.shutdown(wait=False)
+
+def _map_lazily(executor, func, tasks, window: int):
+    '''
+    Like executor.map, but only takes the next task from tasks once fewer than window tasks are in flight, so that tasks can be produced
+    while earlier ones are running.
+    '''
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(func, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def map_individuals(func, tasks: List, threads: int = 1, processes: int = 1):
+    '''
+    Applies func to each task, using a pool of threads or processes if requested.
+    Results are always yielded in the order of the tasks, so the output does not depend on the pool used.
+    If tasks is an iterator (e.g. from prefetch_individuals) rather than a list, tasks are only taken from it as the pool is ready for them.
+    '''
+    ## Importing multiprocessing is slow, so only do it when a process pool is needed
+    if processes > 1:
+        from concurrent.futures import ProcessPoolExecutor
+    if not isinstance(tasks, list) and max(threads, processes) > 1:
+        pool = ProcessPoolExecutor if processes > 1 else ThreadPoolExecutor
+        with pool(max_workers=max(threads, processes)) as executor:
+            yield from _map_lazily(executor, func, tasks, 2 * max(threads, processes))
+    elif processes > 1:
+        ## Chunk the tasks, so that the arguments bound to func are not pickled once per individual.
+        chunksize = max(1, len(tasks) // (processes * 4))
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            yield from executor.map(func, tasks, chunksize=chunksize)
+    elif threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            yield from executor.map(func, tasks)
+    else:
+        yield from map(func, tasks)
+
+def get_peak_memory() -> Dict[str, Union[int, None]]:
+    '''
+    Returns the peak resident memory of this process and of its finished child processes (e.g. the --processes workers),
+    as reported by getrusage (in kB on Linux). Both are None if the resource module is not available.
+    '''
+    try:
+        import resource
+    except ImportError:
+        return {"self": None, "children": None}
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+def write_timings_report(file_path: str, report: Dict[str, Any]) -> None:
+    '''
+    Writes a timing report as JSON, or as a TSV with one line per individual (and the stage timings as '## ' lines) if the
+    file name ends in '.tsv'.
+    '''
+    if not file_path.endswith(".tsv"):
+        with open(file_path, "w") as f:
+            json.dump(report, f, indent=2)
+        return
+    steps = ["signatures_are_consistent", "cache", "get_individual_library_stats", "get_eager_tsv_data"]
+    with open(file_path, "w") as f:
+        print("Individual", "Analysis_type", "Status", "Total_seconds", *steps, "Bytes_on_disk", sep="\t", file=f)
+        for individual in report["individuals"]:
+            print(
+                individual["individual"],
+                individual["analysis_type"],
+                individual["status"],
+                "{:.6f}".format(individual["seconds"].get("total", 0.0)),
+                *["{:.6f}".format(individual["seconds"].get(step, 0.0)) for step in steps],
+                individual["bytes_on_disk"],
+                sep="\t",
+                file=f,
+            )
+        for stage, seconds in report["stages"].items():
+            print("## Stage {}: {:.6f} s".format(stage, seconds), file=f)
+        print("## Peak memory: {} kB (children: {} kB)".format(report["peak_memory_kb"]["self"], report["peak_memory_kb"]["children"]), file=f)
+        print("## Bytes on disk: {}".format(report["bytes_on_disk"]), file=f)
+
+## The number of individuals queried from the query server at once, so that replies stay small
+SERVER_BATCH_SIZE = 1000
+## samples_eager_status.py of this repository, which the query server uses to answer run status queries
+EAGER_STATUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "samples_eager_status", "samples_eager_status.py")
+
+def load_eager_status_module(file_path: str = EAGER_STATUS_PATH):
+    '''
+    Loads samples_eager_status.py as a module, so that the query server can keep its queue index warm. Returns None if it cannot be found.
+    '''
+    if not os.path.isfile(file_path):
+        return None
+    spec = importlib.util.spec_from_file_location("samples_eager_status", file_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class StatsServer:
+    '''
+    The state of the query server: a warm in-memory index of the collected stats of each individual and analysis type, and
+    of the Autorun_eager queue files for run status queries. On every query, the signatures of the files an entry was
+    collected from are checked, and only entries whose files have changed are collected again. Changes to the main ID list
+    drop all entries.
+    '''
+    def __init__(
+        self,
+        root_output_path: str,
+        main_id_list: str,
+        cache_dir: Union[str, None] = None,
+        schema: Dict[str, Any] = DEFAULT_SCHEMA,
+        json_parser: str = "auto",
+        threads: int = 1,
+        eager_status_root: Union[str, None] = None,
+    ):
+        self.root_output_path = root_output_path
+        self.main_id_list = main_id_list
+        self.cache_dir = cache_dir
+        self.schema = schema
+        self.json_parser = json_parser
+        self.threads = threads
+        self.eager_status_root = eager_status_root
+        self.eager_status = load_eager_status_module() if eager_status_root else None
+        self.eager_status_index = {}
+        self.entries = {}
+        self.main_id_dict = None
+        self.main_id_signature = None
+        ## Queries are answered one at a time for each index, while the individuals of a query are collected in parallel.
+        self.stats_lock = threading.Lock()
+        self.status_lock = threading.Lock()
+
+    def health(self) -> Dict[str, Any]:
+        '''
+        Returns the settings that must match those of a client for its output to be identical to a run without the server.
+        '''
+        return {
+            "version": VERSION,
+            "root_output_path": os.path.abspath(self.root_output_path),
+            "main_id_list": os.path.abspath(self.main_id_list),
+            "schema": self.schema["fingerprint"],
+            "entries": len(self.entries),
+            "eager_status_root": os.path.abspath(self.eager_status_root) if self.eager_status is not None else None,
+        }
+
+    def _refresh_main_ids(self) -> None:
+        signature = file_signature(self.main_id_list)
+        if self.main_id_dict is not None and signature == self.main_id_signature:
+            return
+        if self.cache_dir is None:
+            self.main_id_dict = read_main_id_list(self.main_id_list)
+        else:
+            self.main_id_dict = open_main_id_index(self.main_id_list, self.cache_dir)
+        self.main_id_signature = signature
+        ## The collected stats of libraries merged under a Main_Individual_Id depend on the list, so start afresh
+        self.entries = {}
+
+    def _collect(self, task: Tuple[str, str, Dict[str, str], Dict[str, Any]], skip_check: bool = False) -> Dict[str, Any]:
+        '''
+        Collects the stats of a single individual and analysis type, and the read length stats of its libraries that need them.
+        Returns the index entry, with the signatures of all files read.
+        '''
+        ind, data_type, paths, prefetched = task
+        collect = partial(
+            collect_individual,
+            main_id_dict=self.main_id_dict,
+            skip_check=skip_check,
+            cache_dir=self.cache_dir,
+            json_parser=self.json_parser,
+            schema=self.schema,
+        )
+        (status, stats), timings = run_timed(collect, task)
+        ## The read lengths are returned separately, so that the client can report missing mapDamage results like add_read_length_stats
+        read_lengths = {}
+        lgdistribution_signatures = {}
+        for library, library_stats in stats.items():
+            read_length_columns = needs_mapdamage_read_lengths(library_stats, self.schema)
+            if not read_length_columns:
+                continue
+            results_dir = get_mapdamage_results_dir(self.root_output_path, library, data_type)
+            lgdistribution = os.path.join(results_dir, "lgdistribution.txt")
+            lgdistribution_signatures[lgdistribution] = file_signature(lgdistribution)
+            md_status, md_stats = collect_read_length_stats((library, data_type, results_dir), self.cache_dir, timings)
+            read_lengths[library] = None if md_status == "missing" else {
+                header: md_stats[stat] for stat, header in read_length_columns.items()
+            }
+        return {
+            "signatures": prefetched["signatures"],
+            "lgdistribution": lgdistribution_signatures,
+            "result": {
+                "individual": ind,
+                "analysis_type": data_type,
+                "status": status,
+                "stats": stats,
+                "read_lengths": read_lengths,
+                "timings": timings,
+            },
+        }
+
+    def query_stats(self, tasks: List[Tuple[str, str]], skip_check: bool = False) -> List[Dict[str, Any]]:
+        '''
+        Returns the collected stats of each (individual, analysis type) in tasks, in order. Entries whose files are unchanged
+        are answered from memory, with the status 'cached'.
+        '''
+        with self.stats_lock:
+            self._refresh_main_ids()
+            results = [None] * len(tasks)
+            stale = []
+            for i, (ind, data_type) in enumerate(tasks):
+                paths = get_individual_paths(self.root_output_path, data_type, ind)
+                signatures = get_file_signatures(paths)
+                entry = self.entries.get((ind, data_type, skip_check))
+                if (
+                    entry is not None
+                    and entry["signatures"] == signatures
+                    and all(file_signature(path) == signature for path, signature in entry["lgdistribution"].items())
+                ):
+                    status = entry["result"]["status"]
+                    results[i] = dict(entry["result"], status="cached" if status == "collected" else status, timings={})
+                else:
+                    stale.append((i, (ind, data_type, paths, {"signatures": signatures})))
+            entries = map_individuals(partial(self._collect, skip_check=skip_check), [task for i, task in stale], self.threads)
+            for (i, (ind, data_type, paths, prefetched)), entry in zip(stale, entries):
+                self.entries[(ind, data_type, skip_check)] = entry
+                results[i] = entry["result"]
+            return results
+
+    def query_status(self, individuals: List[str]) -> List[Tuple[str, str]]:
+        '''
+        Returns the status of the latest Autorun_eager run of each individual, like samples_eager_status.py.
+        '''
+        if self.eager_status is None:
+            raise ValueError("This server does not answer run status queries. Start it with --eager_status_root.")
+        with self.status_lock:
+            self.eager_status_index = self.eager_status.update_queue_index(self.eager_status_root, self.eager_status_index)
+            return self.eager_status.get_statuses(self.eager_status_root, self.eager_status_index, individuals)
+
+def make_request_handler(stats_server: StatsServer):
+    '''
+    Returns the HTTP request handler class of the query server. The endpoints take and return JSON:
+    GET /health, POST /stats with {"tasks": [[individual, analysis_type], ...], "skip_check": false}
+    (or {"individuals": [...], "analysis_types": [...]}), and POST /status with {"individuals": [...]}.
+    '''
+    from http.server import BaseHTTPRequestHandler
+
+    class StatsRequestHandler(BaseHTTPRequestHandler):
+        def _reply(self, code: int, body: Any) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, stats_server.health())
+            else:
+                self._reply(404, {"error": "Unknown endpoint '{}'.".format(self.path)})
+
+        def do_POST(self):
+            try:
+                query = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path == "/stats":
+                    if "tasks" in query:
+                        tasks = [tuple(task) for task in query["tasks"]]
+                    else:
+                        tasks = [(ind, data_type) for data_type in query["analysis_types"] for ind in query["individuals"]]
+                    unknown_types = sorted({data_type for ind, data_type in tasks} - set(ANALYSIS_TYPES))
+                    if unknown_types:
+                        raise ValueError("Unknown analysis type(s): {}.".format(", ".join(unknown_types)))
+                    self._reply(200, {"results": stats_server.query_stats(tasks, bool(query.get("skip_check", False)))})
+                elif self.path == "/status":
+                    self._reply(200, {"statuses": stats_server.query_status(query["individuals"])})
+                else:
+                    self._reply(404, {"error": "Unknown endpoint '{}'.".format(self.path)})
+            except UnknownSampleError as e:
+                ## The query is valid, but the MultiQC data of one of its individuals is not
+                self._reply(404, {"error": "Cannot collect the stats of the query: {}".format(e)})
+            except (KeyError, TypeError, ValueError) as e:
+                self._reply(400, {"error": "Invalid query: {}".format(e)})
+            except OSError as e:
+                self._reply(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            print("{} - {}".format(self.address_string(), format % args), file=sys.stderr)
+
+    return StatsRequestHandler
+
+def serve_main(argv: List[str]) -> None:
+    '''
+    The serve subcommand, which runs the query server until it is interrupted.
+    '''
+    parser = argparse.ArgumentParser(
+        prog="collect_results.py serve",
+        description="Run a local query server that keeps the collected stats of each individual, and the Autorun_eager run status, warm in memory. Entries are only collected again when their files change. Use 'collect_results.py --server' and 'samples_eager_status.py --server' to forward queries to it.",
+    )
+    parser.add_argument(
+        "-r",
+        "--root_output_path",
+        help="The root directory where the eager output lies. Defaults to '/mnt/archgen/Autorun_eager/eager_outputs/'.",
+        default="/mnt/archgen/Autorun_eager/eager_outputs/",
+    )
+    parser.add_argument(
+        "--main_id_list",
+        metavar="FILE",
+        help="A file mapping Pandora Full individual IDs to Main individual IDs. It is read again whenever it changes.",
+        default="/mnt/archgen/tools/helper_scripts/assets/pandora_tables/pandora_main_ind_id_list.txt",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        metavar="DIR",
+        help="Directory of the results cache, shared with collection runs. Defaults to '{}'.".format(get_default_cache_dir()),
+        default=get_default_cache_dir(),
+    )
+    parser.add_argument("--no_cache", help="Do not read from or write to the results cache.", default=False, action="store_true")
+    parser.add_argument("--schema", metavar="FILE", help="A JSON or YAML schema file. Defaults to the built-in schema.", default=None)
+    parser.add_argument("--json_parser", help="How to read the general stats from the MultiQC data JSON. Defaults to auto.", default="auto", choices=JSON_PARSERS)
+    parser.add_argument("-t", "--threads", metavar="N", help="Number of threads to use for collecting the individuals of a query in parallel. Defaults to 1.", type=int, default=1)
+    parser.add_argument("--host", help="The address to listen on. Defaults to 127.0.0.1, so that only local clients can connect.", default="127.0.0.1")
+    parser.add_argument("--port", help="The port to listen on. Defaults to 8765.", type=int, default=8765)
+    parser.add_argument(
+        "--eager_status_root",
+        metavar="DIR",
+        help="The Autorun_eager directory with the queue files and array_Logs, for run status queries. Defaults to '/mnt/archgen/Autorun_eager'.",
+        default="/mnt/archgen/Autorun_eager",
+    )
+    args = parser.parse_args(argv)
+    print("## {}: {}".format(parser.prog, VERSION), file=sys.stderr)
+
+    if args.schema:
+        try:
+            schema = load_schema(args.schema)
+        except (OSError, ValueError) as e:
+            print(f"ERROR: Cannot load schema '{args.schema}': {e}", file=sys.stderr)
+            sys.exit(1)
+    else:
+        schema = DEFAULT_SCHEMA
+    if any(version.get("mapdamage_read_lengths") for version in schema["schema"]["versions"]):
+        missing_packages = get_missing_packages(READ_LENGTH_REQUIREMENTS)
+        if missing_packages:
+            print(
+                "ERROR: Computing the read length stats from the mapDamage results requires the package(s): {}. Please install them with 'pip install {}'.".format(
+                    ", ".join(missing_packages), " ".join(missing_packages)
+                ),
+                file=sys.stderr,
+            )
+            sys.exit(1)
+
+    stats_server = StatsServer(
+        args.root_output_path,
+        args.main_id_list,
+        None if args.no_cache else args.cache_dir,
+        schema,
+        args.json_parser,
+        args.threads,
+        args.eager_status_root if os.path.isdir(args.eager_status_root) else None,
+    )
+    if stats_server.eager_status is None:
+        print("WARNING: Run status queries are disabled, since '{}' or samples_eager_status.py cannot be found.".format(args.eager_status_root), file=sys.stderr)
+    from http.server import ThreadingHTTPServer
+    try:
+        httpd = ThreadingHTTPServer((args.host, args.port), make_request_handler(stats_server))
+    except OSError as e:
+        print(f"ERROR: Cannot listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        sys.exit(1)
+    print("Serving on http://{}:{}/".format(args.host, args.port), file=sys.stderr)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+def query_server(url: str, endpoint: str, query: Dict[str, Any] = None) -> Dict[str, Any]:
+    '''
+    Sends a query to the query server at url, and returns its JSON reply. Exits with an error if the server cannot be reached
+    or rejects the query.
+    '''
+    import urllib.request
+    import urllib.error
+    request = urllib.request.Request(
+        "{}/{}".format(url.rstrip("/"), endpoint),
+        data=None if query is None else json.dumps(query).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.load(e)["error"]
+        except (ValueError, KeyError):
+            message = str(e)
+        print(f"ERROR: The server at '{url}' rejected the query: {message}", file=sys.stderr)
+        sys.exit(1)
+    except (urllib.error.URLError, OSError) as e:
+        print(f"ERROR: Cannot reach the server at '{url}': {e}", file=sys.stderr)
+        sys.exit(1)
+
+def query_server_stats(
+    url: str,
+    tasks: List[Tuple[str, str, Dict[str, str]]],
+    skip_check: bool,
+    read_lengths: Dict[Tuple[str, str], Union[Dict[str, Any], None]],
+    batch_size: int = SERVER_BATCH_SIZE,
+):
+    '''
+    Queries the stats of the tasks from the query server in batches, and yields the results in order, like
+    map_individuals(partial(run_timed, collect_individual), tasks). The read length stats of the libraries that need them
+    are added to read_lengths, keyed by library and analysis type.
+    '''
+    for start in range(0, len(tasks), batch_size):
+        reply = query_server(
+            url,
+            "stats",
+            {"tasks": [[ind, data_type] for ind, data_type, paths in tasks[start:start + batch_size]], "skip_check": skip_check},
+        )
+        for result in reply["results"]:
+            for library, library_read_lengths in result["read_lengths"].items():
+                read_lengths[(library, result["analysis_type"])] = library_read_lengths
+            yield ((result["status"], result["stats"]), result["timings"])
+
+def add_server_read_lengths(
+    collected_stats: Dict[Tuple[str, str], Dict], read_lengths: Dict[Tuple[str, str], Union[Dict[str, Any], None]]
+) -> List[Dict[str, Any]]:
+    '''
+    The counterpart of add_read_length_stats for results from the query server, which come with the read length stats of
+    each library that needs them. Reports the libraries without mapDamage results in the same way.
+    '''
+    for key in collected_stats:
+        if key not in read_lengths:
+            continue
+        if read_lengths[key] is None:
+            print("Warning: Could not generate read length distribution information for library: {} ".format(key[0]), file=sys.stderr)
+            continue
+        collected_stats[key].update(read_lengths[key])
+    return []
+
+## The packages needed to watch the root output path with inotify, instead of polling it
+WATCH_INOTIFY_REQUIREMENTS = ["inotify_simple"]
+## The names of the MultiQC files whose changes are watched
+MULTIQC_FILE_NAMES = {"multiqc_data.json", "multiqc_report.html"}
+
+class PollingWatcher:
+    '''
+    Detects new or updated MultiQC reports under root_output_path by polling. The modification times of the analysis type
+    and site directories are checked to find new individuals, so only sites that changed are listed again, and the MultiQC
+    data JSON of each known individual is stat'ed once per poll. If individuals is given, only those are watched.
+    '''
+    def __init__(self, root_output_path: str, analysis_types: List[str], individuals: set = None):
+        self.root_output_path = root_output_path
+        self.analysis_types = analysis_types
+        self.individuals = individuals
+        self.directory_mtimes = {}
+        self.sites = {data_type: set() for data_type in analysis_types}
+        self.mqc_data_paths = {}
+        self.signatures = {}
+        ## The first poll only records the current state
+        self.poll()
+
+    def _list_if_changed(self, path: str) -> Union[List[os.DirEntry], None]:
+        '''
+        Lists the subdirectories of path, or returns None if its modification time has not changed since it was last listed.
+        '''
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            self.directory_mtimes.pop(path, None)
+            return []
+        if self.directory_mtimes.get(path) == mtime:
+            return None
+        self.directory_mtimes[path] = mtime
+        return _list_directories(path)
+
+    def poll(self) -> set:
+        '''
+        Returns the (individual, analysis type) whose MultiQC data JSON has appeared or changed since the last poll.
+        '''
+        for data_type in self.analysis_types:
+            type_path = os.path.join(self.root_output_path, data_type)
+            site_entries = self._list_if_changed(type_path)
+            if site_entries is not None:
+                self.sites[data_type] = {entry.name for entry in site_entries}
+            for site in sorted(self.sites[data_type]):
+                ind_entries = self._list_if_changed(os.path.join(type_path, site))
+                for entry in ind_entries or []:
+                    if pH.get_site_id(entry.name) == site and (self.individuals is None or entry.name in self.individuals):
+                        if (entry.name, data_type) not in self.mqc_data_paths:
+                            self.mqc_data_paths[(entry.name, data_type)] = get_individual_paths(self.root_output_path, data_type, entry.name)["mqc_data"]
+                            self.signatures[(entry.name, data_type)] = None
+        changed = set()
+        for task, mqc_data in self.mqc_data_paths.items():
+            signature = file_signature(mqc_data)
+            if signature != self.signatures[task]:
+                self.signatures[task] = signature
+                changed.add(task)
+        return changed
+
+    def wait(self, timeout: float) -> set:
+        '''
+        Waits for timeout seconds, and returns the (individual, analysis type) whose MultiQC reports have changed meanwhile.
+        '''
+        time.sleep(timeout)
+        return self.poll()
+
+class InotifyWatcher:
+    '''
+    Detects new or updated MultiQC reports under root_output_path with inotify (using inotify_simple). Only the directories
+    that can lead to MultiQC files are watched: the analysis type, site, individual, multiqc and multiqc_data directories.
+    Watches are added for new directories as they are created. If individuals is given, only those are watched.
+    '''
+    def __init__(self, root_output_path: str, analysis_types: List[str], individuals: set = None):
+        from inotify_simple import INotify, flags
+        self.flags = flags
+        self.root_output_path = root_output_path
+        self.analysis_types = analysis_types
+        self.individuals = individuals
+        self.inotify = INotify()
+        self.watch_flags = flags.CREATE | flags.MOVED_TO | flags.CLOSE_WRITE
+        ## The path and depth below the root output path of each watched directory
+        self.watches = {}
+        try:
+            for data_type in analysis_types:
+                if os.path.isdir(os.path.join(root_output_path, data_type)):
+                    self._watch(os.path.join(root_output_path, data_type), 1)
+        except OSError:
+            self.inotify.close()
+            raise
+
+    def _is_watched_directory(self, name: str, depth: int, parent: str) -> bool:
+        if depth == 2:
+            return True
+        if depth == 3:
+            return pH.get_site_id(name) == os.path.basename(parent) and (self.individuals is None or name in self.individuals)
+        return (depth, name) in [(4, "multiqc"), (5, "multiqc_data")]
+
+    def _get_task(self, path: str) -> Union[Tuple[str, str], None]:
+        '''
+        Returns the (individual, analysis type) of a path below the root output path.
+        '''
+        parts = os.path.relpath(path, self.root_output_path).split(os.sep)
+        if len(parts) < 3 or parts[0] not in self.analysis_types:
+            return None
+        return (parts[2], parts[0])
 
-        ## Add footer with version info
-        flags = ""
-        if args.skip_check:
-            flags += " --skip_check"
-        if args.header:
-            flags += " --header"
+    def _watch(self, path: str, depth: int) -> set:
+        '''
+        Watches path and the directories below it that can lead to MultiQC files. Returns the (individual, analysis type)
+        whose MultiQC files already exist below path, since they might have been written before the watch was added.
+        '''
+        self.watches[self.inotify.add_watch(path, self.watch_flags)] = (path, depth)
+        found = set()
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir() and self._is_watched_directory(entry.name, depth + 1, path):
+                    found |= self._watch(entry.path, depth + 1)
+                elif entry.name in MULTIQC_FILE_NAMES and depth >= 4:
+                    found.add(self._get_task(entry.path))
+        return found
 
-        print(f"## {parser.prog}: {VERSION}", file=f)
+    def wait(self, timeout: float) -> set:
+        '''
+        Waits for up to timeout seconds for changes, and returns the (individual, analysis type) whose MultiQC reports have
+        changed. Events arriving within a second of each other are handled together, since MultiQC writes several files.
+        '''
+        changed = set()
+        for event in self.inotify.read(timeout=int(timeout * 1000), read_delay=1000):
+            if event.wd not in self.watches:
+                continue
+            parent, depth = self.watches[event.wd]
+            path = os.path.join(parent, event.name)
+            if event.mask & self.flags.ISDIR:
+                if self._is_watched_directory(event.name, depth + 1, parent):
+                    try:
+                        changed |= self._watch(path, depth + 1)
+                    except FileNotFoundError:
+                        pass
+            elif event.name in MULTIQC_FILE_NAMES:
+                changed.add(self._get_task(path))
+        changed.discard(None)
+        return changed
+
+def get_watcher(root_output_path: str, analysis_types: List[str], individuals: set = None, poll: bool = False):
+    '''
+    Returns an InotifyWatcher if inotify_simple is installed (and poll is not set), and a PollingWatcher otherwise, or if
+    the directories cannot be watched with inotify (e.g. because the limit of inotify watches is reached).
+    '''
+    if not poll and not get_missing_packages(WATCH_INOTIFY_REQUIREMENTS):
+        try:
+            watcher = InotifyWatcher(root_output_path, analysis_types, individuals)
+            print("Watching {} directories with inotify.".format(len(watcher.watches)), file=sys.stderr)
+            return watcher
+        except OSError as e:
+            print(f"WARNING: Cannot watch '{root_output_path}' with inotify ({e}). Polling instead.", file=sys.stderr)
+    watcher = PollingWatcher(root_output_path, analysis_types, individuals)
+    print("Polling {} individuals.".format(len(watcher.mqc_data_paths)), file=sys.stderr)
+    return watcher
+
+def remove_option(argv: List[str], option: str, n_values: int) -> List[str]:
+    '''
+    Returns argv without option (given as '--option VALUE' or '--option=VALUE') and its values.
+    '''
+    remaining = []
+    skip = 0
+    for arg in argv:
+        if skip:
+            skip -= 1
+        elif arg == option:
+            skip = n_values
+        elif not arg.startswith(option + "="):
+            remaining.append(arg)
+    return remaining
+
+def watch_collection(argv: List[str], args: argparse.Namespace, analysis_types: List[str]) -> None:
+    '''
+    The watch mode: collects the output table (or updates it, if it exists), and then keeps it up to date by collecting
+    the individuals whose MultiQC reports are new or have changed, as soon as their MultiQC data and report are consistent.
+    Runs until interrupted.
+    '''
+    individuals = None
+    if args.input:
+        with open(args.input, "r") as f:
+            individuals = {pH._remove_suffix(_) for _ in f.read().splitlines()}
+    ## The watcher records the current state first, so that no change made during the first collection is missed
+    watcher = get_watcher(args.root_output_path, analysis_types, individuals, args.watch_poll)
+    collection_argv = remove_option(remove_option(argv, "--watch", 1), "--watch_poll", 0)
+    update_argv = collection_argv + ["--update", args.output]
+    main(update_argv if os.path.isfile(args.output) else collection_argv)
+    pending = set()
+    try:
+        while True:
+            pending |= watcher.wait(args.watch)
+            ready = set()
+            for ind, data_type in sorted(pending):
+                paths = get_individual_paths(args.root_output_path, data_type, ind)
+                mqc_data_signature = file_signature(paths["mqc_data"])
+                report_signature = file_signature(paths["report"])
+                ## Removed reports are not collected, and the report is written after the data, so wait for both to be consistent
+                if mqc_data_signature is None:
+                    pending.discard((ind, data_type))
+                elif report_signature is None:
+                    continue
+                elif signatures_are_consistent(mqc_data_signature, report_signature, args.skip_check):
+                    ready.add((ind, data_type))
+            pending -= ready
+            if ready:
+                print("Found {} new or updated MultiQC reports. Updating '{}'.".format(len(ready), args.output), file=sys.stderr)
+                main(update_argv, only=ready)
+    except KeyboardInterrupt:
+        pass
+
+class DumpSchemaAction(argparse.Action):
+    '''
+    Prints the built-in MultiQC schema as JSON and exits, as a starting point for a custom --schema file.
+    '''
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, default=argparse.SUPPRESS, help=None):
+        super().__init__(option_strings=option_strings, dest=dest, default=default, nargs=0, help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        print(json.dumps(BUILTIN_SCHEMA, indent=4))
+        parser.exit()
+
+def main(argv: List[str] = None, only: set = None):
+    '''
+    Runs a collection with the command line arguments argv (by default, those of the script).
+    In watch mode, only is the set of (individual, analysis type) whose MultiQC reports have changed, and only those are
+    collected, without reading the input list or discovering the root output path again.
+    '''
+    argv = sys.argv[1:] if argv is None else argv
+    ## Subcommands are dispatched before parsing, so that the options of a collection run stay unchanged
+    if argv and argv[0] == "merge":
+        merge_main(argv[1:])
+        return
+    if argv and argv[0] == "serve":
+        serve_main(argv[1:])
+        return
+    parser = argparse.ArgumentParser(
+        description="This is a script for collecting a batch of library-level multiqc stats for individuals for which capture or shotgun data exists.",
+        epilog="Use 'collect_results.py merge -h' for merging the output tables of the shards of a --shard run, and 'collect_results.py serve -h' for running a local query server.",
+    )
+    parser.add_argument(
+        "-r",
+        "--root_output_path",
+        help="The root directory where the eager output lies. Within this directory there should be the structure <analysis_type>/<site_id>/<individual_id>/*.",
+        required=False,
+        default="/mnt/archgen/Autorun_eager/eager_outputs/",
+    )
+    parser.add_argument(
+        "-i",
+        "--input",
+        help="Input file with a list of individuals for which capture or shotgun data exists. Required, unless --discover is used.",
+        default=None,
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Output file with a list of individuals for which capture or shotgun data exists.",
+        required=True,
+    )
+    parser.add_argument(
+        "-a",
+        "--analysis_type",
+        help="Analysis type: capture or shotgun. Options are: SG, TF, TM, RP, RM, IM, YC. Several analysis types can be given to collect them all in a single run, or 'all' to collect all of them. Defaults to TF.",
+        nargs="+",
+        default=["TF"],
+        choices=ANALYSIS_TYPES + ["all"],
+    )
+    parser.add_argument(
+        "--skip_check",
+        help="By default, results from runs where the consistency of the MultiQC output files cannot be verified will be skipped. Use this flag to disable this behaviour. Only recommended if you know why the check failed to begin with.",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--main_id_list",
+        metavar="FILE",
+        help="A file with two columns, where the first column is the Pandora Full individual ID and the second column is the Pandora Main individual ID. This is used to map Full IDs to Main IDs.",
+        default="/mnt/archgen/tools/helper_scripts/assets/pandora_tables/pandora_main_ind_id_list.txt",
+        required=False,
+    )
+    parser.add_argument(
+        "-H",
+        "--header",
+        help="Use human-readable header, instead of original MultiQC table header.",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        metavar="DIR",
+        help="Directory in which the parsed results of each individual are cached. Results are only parsed again for individuals whose MultiQC data, MultiQC report or eager input TSV have changed. Defaults to '{}'.".format(get_default_cache_dir()),
+        default=get_default_cache_dir(),
+    )
+    parser.add_argument(
+        "--no_cache",
+        help="Do not read from or write to the results cache.",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--cache_max_age",
+        metavar="DAYS",
+        help="Delete the cached results that have not been used in the last DAYS days. The cache is checked at most once a day. Use 0 to never delete cached results. Defaults to {}.".format(CACHE_MAX_AGE_DAYS),
+        type=float,
+        default=CACHE_MAX_AGE_DAYS,
+    )
+    parser.add_argument(
+        "--json_parser",
+        help="How to read the general stats from the MultiQC data JSON. 'scan' decodes only the general stats from a memory-mapped copy of the file, if it has the layout MultiQC writes. 'ijson' streams the file with ijson (if installed). 'full' loads the whole file. 'auto' tries each of these in turn. Defaults to auto.",
+        default="auto",
+        choices=JSON_PARSERS,
+    )
+    parser.add_argument(
+        "--format",
+        help="The format of the output file. 'parquet' and 'feather' require pandas and pyarrow, 'csv.gz' requires pandas. For these formats, missing values are written as NaN instead of 'N/A', and numeric columns are stored as numbers. Defaults to tsv.",
+        default="tsv",
+        choices=OUTPUT_FORMATS,
+    )
+    parser.add_argument(
+        "--discover",
+        help="Walk the root output path once to discover which individuals exist for each analysis type, instead of checking the paths of each individual in the input list. Without an input list, all individuals with MultiQC data are collected. With an input list, individuals that were not discovered are skipped without accessing the file system again.",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--manifest",
+        metavar="FILE",
+        help="Write the manifest of discovered individuals, with the paths and modification times of their MultiQC data, MultiQC report, eager input TSV and mapDamage results, to FILE as JSON. If an input list is given, the individuals in it without MultiQC data are listed under 'missing'. Implies --discover.",
+        default=None,
+    )
+    parser.add_argument(
+        "--split_output",
+        help="When collecting several analysis types, write the results of each analysis type to a separate output file, named after the output file with the analysis type added before the extension (e.g. collected_data.TF.txt). By default, all results are written to a single table, with one row per library and analysis type.",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--schema",
+        metavar="FILE",
+        help="A JSON or YAML (requires PyYAML) file describing the output columns and the MultiQC general stats keys they are taken from in each eager/MultiQC version. Defaults to the built-in schema.",
+        default=None,
+    )
+    parser.add_argument(
+        "--dump_schema",
+        action=DumpSchemaAction,
+        help="Print the built-in schema as JSON and exit.",
+    )
+    parser.add_argument(
+        "--update",
+        metavar="FILE",
+        help="An output table from a previous run of this script. Only individuals whose MultiQC data, eager input TSV or mapDamage results have changed since FILE was written, or that are not in FILE, will be collected again. The results are merged with the remaining results in FILE and written to the output file, which can be FILE itself.",
+        default=None,
+    )
+    parallel_group = parser.add_mutually_exclusive_group()
+    parallel_group.add_argument(
+        "-t",
+        "--threads",
+        metavar="N",
+        help="Number of threads to use for collecting the results of individuals in parallel. Defaults to 1.",
+        type=int,
+        default=1,
+    )
+    parallel_group.add_argument(
+        "--processes",
+        metavar="N",
+        help="Number of processes to use for collecting the results of individuals in parallel. Useful when parsing, rather than file system latency, is the bottleneck. Defaults to 1.",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--shard",
+        metavar="i/N",
+        help="Only collect the individuals of shard i of N (1 <= i <= N), e.g. '--shard $SGE_TASK_ID/20' in an array job. Individuals are assigned to shards by their Site_ID, so all individuals of a site are collected by the same shard. The output tables of all shards can be combined with 'collect_results.py merge'. Only for the tsv output format.",
+        type=parse_shard,
+        default=None,
+    )
+    parser.add_argument(
+        "--max_rows",
+        metavar="N",
+        help="Keep at most N rows of the output table in memory. Further rows are written to sorted temporary files, which are merged when the output is written, so that the memory usage does not grow with the number of libraries. Only for the tsv output format. By default, all rows are kept in memory.",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--prefetch",
+        metavar="N",
+        help="Check and read the files of the next individuals concurrently, with at most N file operations in flight, while the results of earlier individuals are being parsed. Useful on network file systems with high latency. Defaults to 0 (disabled).",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--sqlite",
+        metavar="DB",
+        help="Also write the collected stats to the SQLite database DB, with one row per library, analysis type and modification time of the MultiQC report, so that the stats of earlier processings are kept. Rows are indexed by site, individual and library. In update mode, only the libraries that are collected again are written.",
+        default=None,
+    )
+    parser.add_argument(
+        "--watch",
+        metavar="SECONDS",
+        help="After writing the output table, keep watching the root output path for new or updated MultiQC reports, and update the output table with the results of each individual whose MultiQC data and report are consistent again. Uses inotify if inotify_simple is installed, and otherwise polls every SECONDS. Runs until interrupted. Only for the tsv output format.",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--watch_poll",
+        help="Always poll in watch mode, instead of using inotify, e.g. on network file systems where inotify does not see changes made on other hosts.",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--server",
+        metavar="URL",
+        help="Forward the collection to a query server started with 'collect_results.py serve' (e.g. http://127.0.0.1:8765), which answers from its warm in-memory index and only collects the individuals whose files have changed. The server must use the same root output path, main ID list and schema. -t/--threads, --processes, --prefetch and the cache options are then up to the server.",
+        default=None,
+    )
+    parser.add_argument(
+        "--timings",
+        metavar="FILE",
+        help="Write a timing report to FILE, with the wall time of each stage of the run, the time spent on each step for each individual and library, the size on disk of the files read, and the peak memory usage. Written as JSON, or as TSV if FILE ends in '.tsv'. The slowest individuals are also listed on stderr.",
+        default=None,
+    )
+    parser.add_argument(
+        "--slowest",
+        metavar="N",
+        help="The number of slowest individuals to list on stderr with --timings. Defaults to 10.",
+        type=int,
+        default=10,
+    )
+    parser.add_argument(
+        "-v",
+        "--version",
+        action="version",
+        version="%(prog)s {}".format(VERSION),
+        help="Print the version and exit.",
+    )
+    args = parser.parse_args(argv)
+    ## The end time of each stage of the run, for --timings
+    checkpoints = [("start", time.perf_counter())]
+    if args.manifest:
+        args.discover = True
+    if args.input is None and not args.discover:
+        parser.error("the following arguments are required: -i/--input (unless --discover is used)")
+
+    ## Print version info to stderr on runtime
+    print("## {}: {}".format(parser.prog, VERSION), file=sys.stderr)
+
+    ## Check for the optional packages needed for the output format before collecting anything
+    missing_packages = get_missing_packages(OUTPUT_FORMAT_REQUIREMENTS[args.format])
+    if missing_packages:
+        print(
+            "ERROR: The output format '{}' requires the package(s): {}. Please install them with 'pip install {}'.".format(
+                args.format, ", ".join(missing_packages), " ".join(missing_packages)
+            ),
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    if args.update and args.format != "tsv":
+        print("ERROR: --update can only be used with the tsv output format.", file=sys.stderr)
+        sys.exit(1)
+    if args.max_rows is not None and args.format != "tsv":
+        print("ERROR: --max_rows can only be used with the tsv output format.", file=sys.stderr)
+        sys.exit(1)
+    if args.max_rows is not None and args.max_rows < 1:
+        print("ERROR: --max_rows must be at least 1.", file=sys.stderr)
+        sys.exit(1)
+    if args.shard is not None and args.format != "tsv":
+        print("ERROR: --shard can only be used with the tsv output format.", file=sys.stderr)
+        sys.exit(1)
+    if args.shard is not None and args.update:
+        print("ERROR: --update cannot be used with --shard. Please update the merged output table instead.", file=sys.stderr)
+        sys.exit(1)
+    if args.update and args.split_output:
+        print("ERROR: --update cannot be used with --split_output. Please update the output file of each analysis type separately.", file=sys.stderr)
+        sys.exit(1)
+    if args.watch is not None and (args.format != "tsv" or args.split_output or args.shard is not None or args.update):
+        print("ERROR: --watch can only be used with the tsv output format, and not with --split_output, --shard or --update.", file=sys.stderr)
+        sys.exit(1)
+    if args.watch is not None and args.watch <= 0:
+        print("ERROR: --watch must be a positive number of seconds.", file=sys.stderr)
+        sys.exit(1)
+
+    ## Remove duplicate analysis types, keeping the order they were given in
+    if "all" in args.analysis_type:
+        analysis_types = list(ANALYSIS_TYPES)
+    else:
+        analysis_types = list(dict.fromkeys(args.analysis_type))
+
+    ## Load the schema, which defines the output columns and where to find them in the MultiQC general stats
+    if args.schema:
+        try:
+            schema = load_schema(args.schema)
+        except (OSError, ValueError) as e:
+            print(f"ERROR: Cannot load schema '{args.schema}': {e}", file=sys.stderr)
+            sys.exit(1)
+    else:
+        schema = DEFAULT_SCHEMA
+    output_columns = schema["output_columns"]
+    ## Computing the read lengths from the mapDamage results needs numpy, so check for it before collecting anything
+    if any(version.get("mapdamage_read_lengths") for version in schema["schema"]["versions"]) and not args.server:
+        missing_packages = get_missing_packages(READ_LENGTH_REQUIREMENTS)
+        if missing_packages:
+            print(
+                "ERROR: Computing the read length stats from the mapDamage results requires the package(s): {}. Please install them with 'pip install {}'.".format(
+                    ", ".join(missing_packages), " ".join(missing_packages)
+                ),
+                file=sys.stderr,
+            )
+            sys.exit(1)
+
+    ## The output of a query server is only identical to a local collection if it reads the same files with the same schema
+    if args.server:
+        health = query_server(args.server, "health")
+        expected = {
+            "version": VERSION,
+            "root_output_path": os.path.abspath(args.root_output_path),
+            "main_id_list": os.path.abspath(args.main_id_list),
+            "schema": schema["fingerprint"],
+        }
+        mismatches = [setting for setting, value in expected.items() if health.get(setting) != value]
+        if mismatches:
+            print(
+                "ERROR: The server at '{}' cannot be used, since its {} differ(s) from this run.".format(args.server, ", ".join(mismatches)),
+                file=sys.stderr,
+            )
+            sys.exit(1)
+
+    ## Watch mode runs this function again for every batch of changed individuals, updating the output table
+    if args.watch is not None:
+        watch_collection(argv, args, analysis_types)
+        return
+
+    ## Open the SQLite sink before collecting anything, so that a database that cannot be written is reported early
+    sqlite_connection = None
+    if args.sqlite:
+        try:
+            sqlite_connection = open_sqlite_sink(args.sqlite, output_columns, schema)
+        except sqlite3.Error as e:
+            print(f"ERROR: Cannot open SQLite database '{args.sqlite}': {e}", file=sys.stderr)
+            sys.exit(1)
+    sqlite_rows = 0
+    report_mtimes = {}
+
+    ## Loudly declare when the script is run with the --skip_check flag
+    if args.skip_check:
         print(
-            f"## Command: {parser.prog} -i {args.input} -o {args.output} -a {args.analysis_type}{flags}",
-            file=f,
+            "WARNING: Skipping the check for consistency between MultiQC data and report files. This may result in the inclusion of outdated results, or runtime errors!",
+            file=sys.stderr,
         )
 
+    ## Discover what exists under the root output path
+    manifest = None
+    if args.discover and only is None:
+        manifest = build_manifest(args.root_output_path, analysis_types)
+        for data_type in analysis_types:
+            discovered = manifest["analysis_types"][data_type]
+            print(
+                "Discovered {} individuals with MultiQC data for analysis type {}.".format(
+                    sum(1 for ind in discovered.values() if ind["signatures"]["mqc_data"] is not None), data_type
+                ),
+                file=sys.stderr,
+            )
+
+    ## Read in list of individuals
+    if only is not None:
+        individuals = sorted({ind for ind, data_type in only})
+        print("Collecting {} new or updated individuals.".format(len(individuals)), file=sys.stderr)
+    elif args.input:
+        with open(args.input, "r") as f:
+            individuals = [pH._remove_suffix(_) for _ in f.read().splitlines()]
+            print(
+                "Found {} individuals in input file.".format(len(individuals)), file=sys.stderr
+            )
+    else:
+        individuals = sorted({ind for discovered in manifest["analysis_types"].values() for ind in discovered})
+    if args.shard is not None:
+        individuals = [ind for ind in individuals if in_shard(ind, args.shard)]
+        print("Collecting {} individuals in shard {}/{}.".format(len(individuals), *args.shard), file=sys.stderr)
+
+    ## Read list of main IDs. Unless the cache is disabled, it is indexed once and only the IDs that are needed are looked up.
+    try:
+        if args.no_cache:
+            main_id_dict = read_main_id_list(args.main_id_list)
+        else:
+            main_id_dict = open_main_id_index(args.main_id_list, args.cache_dir)
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    ## Iterate over analysis types and individuals and collect stats, keyed by library and analysis type
+    collected_stats = {}
+    skip_count = 0
+    if manifest is not None and not args.input:
+        ## Only collect the analysis types that have MultiQC data for each discovered individual
+        tasks = [
+            (ind, data_type, discovered["paths"])
+            for data_type in analysis_types
+            for ind, discovered in sorted(manifest["analysis_types"][data_type].items())
+            if discovered["signatures"]["mqc_data"] is not None and (args.shard is None or in_shard(ind, args.shard))
+        ]
+    else:
+        tasks = [
+            (ind, data_type, get_individual_paths(args.root_output_path, data_type, ind))
+            for data_type in analysis_types
+            for ind in individuals
+            if only is None or (ind, data_type) in only
+        ]
+
+    if args.manifest and only is None:
+        if args.input:
+            manifest["missing"] = {
+                data_type: [
+                    ind for ind in individuals
+                    if manifest["analysis_types"][data_type].get(ind, {}).get("signatures", {}).get("mqc_data") is None
+                ]
+                for data_type in analysis_types
+            }
+        write_manifest(args.manifest, manifest)
+
+    ## In update mode, only collect individuals that changed since the previous output was written
+    kept_rows = {}
+    if args.update:
+        try:
+            human_header, kept_rows, footer = read_output_table(args.update, output_columns)
+        except (OSError, ValueError) as e:
+            print(f"ERROR: Cannot update '{args.update}': {e}", file=sys.stderr)
+            sys.exit(1)
+        previous_command = [line for line in footer if line.startswith("## Command:")]
+        previous_analysis_types = get_command_analysis_types(previous_command[-1]) if previous_command else []
+        if set(previous_analysis_types) != set(analysis_types):
+            print(
+                f"ERROR: Cannot update '{args.update}', since it was not collected with '-a {' '.join(analysis_types)}'.",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        if human_header != args.header:
+            print(
+                f"ERROR: Cannot update '{args.update}', since it was {'' if human_header else 'not '}collected with '--header'.",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        ## Tables without a Data_type column can only hold a single analysis type
+        if len(analysis_types) == 1:
+            kept_rows = {(library, analysis_types[0]): row for (library, data_type), row in kept_rows.items()}
+        elif any(data_type is None for library, data_type in kept_rows):
+            print(f"ERROR: Cannot update '{args.update}', since it has no Data_type column.", file=sys.stderr)
+            sys.exit(1)
+        ## In watch mode, the watcher has already found which individuals changed, and their files need not be newer than the table
+        if only is None:
+            known_individuals = {
+                (get_library_owner(library, set(individuals), main_id_dict), data_type) for library, data_type in kept_rows
+            }
+            tasks = get_changed_individuals(tasks, os.path.getmtime(args.update), known_individuals)
+        ## Any results of the individuals that are collected again are replaced
+        changed_individuals = {data_type: set() for data_type in analysis_types}
+        for ind, data_type, paths in tasks:
+            changed_individuals[data_type].add(ind)
+        kept_rows = {
+            (library, data_type): row
+            for (library, data_type), row in kept_rows.items()
+            if get_library_owner(library, changed_individuals.get(data_type, set()), main_id_dict) is None
+        }
+        print(
+            "Found {} new or changed individuals since '{}' was written.".format(len(tasks), args.update),
+            file=sys.stderr,
+        )
+    collect = partial(
+        collect_individual,
+        main_id_dict=main_id_dict,
+        skip_check=args.skip_check,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        json_parser=args.json_parser,
+        schema=schema,
+    )
+    ## The query server returns the read lengths together with the stats of each individual
+    server_read_lengths = {}
+    if args.server:
+        add_read_lengths = partial(add_server_read_lengths, read_lengths=server_read_lengths)
+    else:
+        add_read_lengths = partial(
+            add_read_length_stats,
+            root_output_path=args.root_output_path,
+            schema=schema,
+            cache_dir=None if args.no_cache else args.cache_dir,
+            threads=args.threads,
+            processes=args.processes,
+        )
+    library_timings = []
+    ## The rows of a TSV output are kept in a SortedRowSpill, which spills them to disk in sorted chunks if --max_rows is given.
+    ## Rows kept from the previous output in update mode are added first, so that newly collected rows replace them.
+    spill = SortedRowSpill(args.max_rows) if args.format == "tsv" else None
+    if spill is not None:
+        for key, row in kept_rows.items():
+            spill.add(key, row)
+        kept_rows = {}
+    checkpoints.append(("setup", time.perf_counter()))
+    cache_hits = 0
+    cache_misses = 0
+    individual_timings = []
+    ## Results come back in input order, so merging and reporting is identical to a serial run.
+    ## Individuals that were not discovered are known to be missing, so they are not passed to the workers at all.
+    if manifest is not None:
+        present = [
+            manifest["analysis_types"][data_type].get(ind, {}).get("signatures", {}).get("mqc_data") is not None
+            for ind, data_type, paths in tasks
+        ]
+    else:
+        present = [True] * len(tasks)
+    present_tasks = [task for task, is_present in zip(tasks, present) if is_present]
+    if args.server:
+        results = query_server_stats(args.server, present_tasks, args.skip_check, server_read_lengths)
+    else:
+        results = map_individuals(
+            partial(run_timed, collect),
+            prefetch_individuals(present_tasks, args.prefetch) if args.prefetch > 0 else present_tasks,
+            args.threads,
+            args.processes,
+        )
+    for (ind, data_type, paths), is_present in zip(tasks, present):
+        (status, stats), task_timings = next(results) if is_present else (("missing", {}), {})
+        individual_timings.append(
+            {
+                "individual": ind,
+                "analysis_type": data_type,
+                "status": status,
+                "seconds": {step: seconds for step, seconds in task_timings.items() if step != "bytes_on_disk"},
+                "bytes_on_disk": task_timings.get("bytes_on_disk", 0),
+            }
+        )
+        ## Only mention the analysis type when collecting several
+        label = ind if len(analysis_types) == 1 else "{} ({})".format(ind, data_type)
+        if status == "inconsistent":
+            print(
+                f"WARNING: There is a large difference in the creation time between the MultiQC data file '{paths['mqc_data']}' and the corresponding HTML '{paths['report']}'. Skipping.",
+                file=sys.stderr,
+            )
+            skip_count += 1
+            continue
+        elif status == "missing":
+            print(
+                "No multiqc data found for individual {}. Skipping.".format(label),
+                file=sys.stderr,
+            )
+            skip_count += 1
+            continue
+        elif status == "cached":
+            cache_hits += 1
+        else:
+            cache_misses += 1
+        for library, library_stats in stats.items():
+            collected_stats[(library, data_type)] = library_stats
+        ## Rows in the SQLite sink are keyed by the modification time of the MultiQC report (or data, with --skip_check)
+        if sqlite_connection is not None:
+            report_signature = file_signature(paths["report"]) or file_signature(paths["mqc_data"])
+            for library in stats:
+                report_mtimes[(library, data_type)] = report_signature[0]
+        print("Collected stats for individual {}.".format(label), file=sys.stderr)
+        ## When the rows are spilled to disk, add the read lengths and hand over the rows whenever a full chunk has been collected
+        if args.max_rows is not None and len(collected_stats) >= args.max_rows:
+            library_timings += add_read_lengths(collected_stats)
+            if sqlite_connection is not None:
+                sqlite_rows += write_sqlite_rows(sqlite_connection, collected_stats, report_mtimes, output_columns, schema)
+                report_mtimes = {}
+            for key in collected_stats:
+                spill.add(key, format_library_row(key[0], collected_stats[key], output_columns))
+            collected_stats = {}
+    
+    checkpoints.append(("collect", time.perf_counter()))
+
+    ## Collect mapdamage results where needed, and include read length distribution info in the output
+    library_timings += add_read_lengths(collected_stats)
+    if sqlite_connection is not None:
+        sqlite_rows += write_sqlite_rows(sqlite_connection, collected_stats, report_mtimes, output_columns, schema)
+        sqlite_connection.close()
+        print("Wrote {} rows to SQLite database '{}'.".format(sqlite_rows, args.sqlite), file=sys.stderr)
+    if spill is not None:
+        for key in collected_stats:
+            spill.add(key, format_library_row(key[0], collected_stats[key], output_columns))
+        collected_stats = {}
+
+    checkpoints.append(("mapdamage", time.perf_counter()))
+
+    if not args.no_cache:
+        print(
+            "Results cache: {} hits, {} misses.".format(cache_hits, cache_misses),
+            file=sys.stderr,
+        )
+        if args.cache_max_age > 0:
+            n_pruned = prune_cache(args.cache_dir, args.cache_max_age)
+            if n_pruned > 0:
+                print("Deleted {} cached results not used in the last {:g} days.".format(n_pruned, args.cache_max_age), file=sys.stderr)
+
+    ## Print number of skipped individuals to stderr if any
+    if skip_count > 0:
+        print(
+            "WARNING: No data was found for {} individuals!".format(skip_count),
+            file=sys.stderr,
+        )
+
+    ## Add footer with version info
+    flags = ""
+    if args.skip_check:
+        flags += " --skip_check"
+    if args.header:
+        flags += " --header"
+    if args.update:
+        flags += f" --update {args.update}"
+    if args.split_output:
+        flags += " --split_output"
+    if args.manifest:
+        flags += f" --manifest {args.manifest}"
+    input_flags = f" -i {args.input}" if args.input else ""
+    if args.discover:
+        input_flags += " --discover"
+    if args.schema:
+        flags += f" --schema {args.schema}"
+    if args.format != "tsv":
+        flags += f" --format {args.format}"
+    if args.shard is not None:
+        flags += " --shard {}/{}".format(*args.shard)
+    footer = [
+        f"## {parser.prog}: {VERSION}",
+        f"## Command: {parser.prog}{input_flags} -o {args.output} -a {' '.join(analysis_types)}{flags}",
+    ]
+    ## The skip counts of the shards are summed when merging
+    if args.shard is not None:
+        footer.append(f"## Skipped: {skip_count}")
+    header = ["Sample", *(output_columns.keys() if args.header else output_columns.values())]
+
+    ## Either write all analysis types to the output file, or each analysis type to its own file
+    if args.split_output:
+        outputs = {get_split_output_path(args.output, data_type): [data_type] for data_type in analysis_types}
+    else:
+        outputs = {args.output: analysis_types}
+
+    for output, output_types in outputs.items():
+        ## Build a typed table once for the columnar formats. Rows are sorted by library, then analysis type.
+        if args.format != "tsv":
+            output_keys = sorted(key for key in collected_stats if key[1] in output_types)
+            df = build_output_dataframe(
+                [
+                    get_library_values(library, collected_stats[(library, data_type)], output_columns)
+                    for library, data_type in output_keys
+                ],
+                header,
+            )
+            write_output_dataframe(df, output, args.format, footer)
+            continue
+
+        ## Print results to output file, including any results kept from the previous output in update mode
+        with open(output, "w") as f:
+            ## Add header
+            print(*header, sep="\t", file=f)
+            ## Add data
+            for key, row in spill.sorted_rows(output_types):
+                print(row, file=f)
+            for line in footer:
+                print(line, file=f)
+    if spill is not None:
+        spill.close()
+
+    checkpoints.append(("write", time.perf_counter()))
+
+    ## Report where the time was spent
+    if args.timings:
+        report = {
+            "version": VERSION,
+            "command": sys.argv,
+            "stages": {
+                stage: end - previous_end
+                for (previous_stage, previous_end), (stage, end) in zip(checkpoints, checkpoints[1:])
+            },
+            "peak_memory_kb": get_peak_memory(),
+            "bytes_on_disk": sum(timing["bytes_on_disk"] for timing in individual_timings + library_timings),
+            "individuals": individual_timings,
+            "libraries": library_timings,
+        }
+        report["stages"]["total"] = checkpoints[-1][1] - checkpoints[0][1]
+        slowest = sorted(individual_timings, key=lambda timing: timing["seconds"].get("total", 0.0), reverse=True)[:args.slowest]
+        report["slowest"] = [timing["individual"] for timing in slowest]
+        write_timings_report(args.timings, report)
+        print("Slowest individuals:", file=sys.stderr)
+        for timing in slowest:
+            print(
+                "  {} ({}): {:.3f} s, {} bytes on disk".format(
+                    timing["individual"], timing["analysis_type"], timing["seconds"].get("total", 0.0), timing["bytes_on_disk"]
+                ),
+                file=sys.stderr,
+            )
+
 if __name__ == "__main__":
     main()
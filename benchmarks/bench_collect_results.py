@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+from make_synthetic_tree import make_synthetic_tree
+
+## Benchmark the pyPandoraHelper in this repository, rather than any installed version.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "py_helpers"))
+import pyPandoraHelper as pH
+
+VERSION = "0.1.0"
+
+COLLECT_RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Autorun_multiqc_stats_collect", "collect_results.py")
+
+def get_tree(work_dir: str, n_individuals: int, args: argparse.Namespace) -> dict:
+    '''
+    Creates the synthetic tree for n_individuals individuals in work_dir, or reuses it if it was created by a previous run with the same options.
+    '''
+    tree_dir = os.path.join(work_dir, "n_{}".format(n_individuals))
+    options = {"version": VERSION, "n_individuals": n_individuals, "libraries": args.libraries, "analysis_type": args.analysis_type, "plot_kb": args.plot_kb}
+    tree_json = os.path.join(tree_dir, "tree.json")
+    try:
+        with open(tree_json, "r") as f:
+            tree = json.load(f)
+        if tree["options"] == options:
+            return tree
+    except (OSError, ValueError, KeyError):
+        pass
+    os.makedirs(tree_dir, exist_ok=True)
+    print("Creating synthetic tree with {} individuals in '{}'.".format(n_individuals, tree_dir), file=sys.stderr)
+    tree = make_synthetic_tree(tree_dir, n_individuals, args.libraries, args.analysis_type, args.plot_kb)
+    tree["options"] = options
+    with open(tree_json, "w") as f:
+        json.dump(tree, f)
+    return tree
+
+def run_collect_results(tree: dict, work_dir: str, cache_dir: str, extra_args: list) -> dict:
+    '''
+    Runs collect_results.py on a synthetic tree, and returns its wall time and the peak memory from its timing report.
+    '''
+    output = os.path.join(work_dir, "collected_data.tsv")
+    timings = os.path.join(work_dir, "timings.json")
+    command = [
+        sys.executable, COLLECT_RESULTS_PATH,
+        "-r", tree["root_output_path"],
+        "-i", tree["input"],
+        "--main_id_list", tree["main_id_list"],
+        "-o", output,
+        "-a", *tree["options"]["analysis_type"],
+        "--cache_dir", cache_dir,
+        "--timings", timings,
+        "--slowest", "0",
+    ] + extra_args
+    start = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+    with open(timings, "r") as f:
+        report = json.load(f)
+    peak_memory = report["peak_memory_kb"]
+    peak_kb = max(peak_memory["self"] or 0, peak_memory["children"] or 0)
+    return {"seconds": elapsed, "peak_rss_mb": peak_kb / 1024}
+
+def time_id_helpers(libraries: list) -> list:
+    '''
+    Times parsing the library IDs of a synthetic tree with the ID helpers of pyPandoraHelper that collect_results.py relies on.
+    '''
+    results = []
+    benchmarks = [
+        ("get_site_id", lambda ids: [pH.get_site_id(pandora_id) for pandora_id in ids]),
+        ("parse_ids", lambda ids: pH.parse_ids(ids, levels=["site_id", "ind_id"])),
+        ("PandoraID", lambda ids: [(library_id.site_id, library_id.ind_id) for library_id in map(pH.PandoraID, ids)]),
+    ]
+    for name, function in benchmarks:
+        start = time.perf_counter()
+        function(libraries)
+        results.append((name, time.perf_counter() - start))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark collect_results.py and the pyPandoraHelper ID helpers on synthetic eager output trees of increasing size."
+    )
+    parser.add_argument("-n", "--n_individuals", metavar="N", help="Numbers of individuals to benchmark with. Defaults to 10 1000 50000.", type=int, nargs="+", default=[10, 1000, 50000])
+    parser.add_argument("-l", "--libraries", metavar="N", help="Maximum number of libraries per individual. Defaults to 3.", type=int, default=3)
+    parser.add_argument("-a", "--analysis_type", metavar="TYPE", help="Analysis types to create results for and collect. Defaults to TF.", nargs="+", default=["TF"])
+    parser.add_argument("--plot_kb", metavar="KB", help="Size of the plot data in each MultiQC data JSON, in kB. Defaults to 20.", type=int, default=20)
+    parser.add_argument("-d", "--work_dir", metavar="DIR", help="Directory in which to keep the synthetic trees, so they can be reused by later runs. By default, they are created in a temporary directory and deleted afterwards.", default=None)
+    parser.add_argument("-x", "--collect_args", metavar="ARGS", help="Additional arguments for collect_results.py, as a single quoted string (e.g. '-t 8 --discover').", default="")
+    parser.add_argument("-v", "--version", action="version", version="%(prog)s {}".format(VERSION), help="Print the version and exit.")
+    args = parser.parse_args()
+
+    extra_args = shlex.split(args.collect_args)
+    print("n_individuals", "n_libraries", "benchmark", "seconds", "per_second", "peak_rss_mb", sep="\t")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = args.work_dir if args.work_dir is not None else tmp_dir
+        for n in args.n_individuals:
+            tree = get_tree(work_dir, n, args)
+            n_libraries = len(tree["libraries"])
+            ## The cache is always empty for the first run, and filled for the second.
+            cache_dir = tempfile.mkdtemp(dir=tmp_dir)
+            for benchmark in ["collect_results_cold_cache", "collect_results_warm_cache"]:
+                result = run_collect_results(tree, tmp_dir, cache_dir, extra_args)
+                print(n, n_libraries, benchmark, "{:.3f}".format(result["seconds"]), "{:.0f}".format(n / result["seconds"]), "{:.1f}".format(result["peak_rss_mb"]), sep="\t")
+            for benchmark, seconds in time_id_helpers(tree["libraries"]):
+                print(n, n_libraries, benchmark, "{:.4f}".format(seconds), "{:.0f}".format(n_libraries / seconds), "NA", sep="\t")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+import argparse
+import importlib.util
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+VERSION = "0.1.1"
+
+COLLECT_RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Autorun_multiqc_stats_collect", "collect_results.py")
+
+def load_collect_results():
+    '''
+    Imports collect_results.py as a module, since it is a script and not part of an installed package.
+    '''
+    spec = importlib.util.spec_from_file_location("collect_results", COLLECT_RESULTS_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def write_synthetic_report(path: str, n_libraries: int, plot_mb: int, seed: int = 1):
+    '''
+    Writes a MultiQC data JSON with general stats for n_libraries libraries, preceded by roughly plot_mb MB of plot data,
+    which is what makes real reports of large capture individuals so big.
+    '''
+    rng = random.Random(seed)
+    general_stats = {"ABC001": {"SexDetErrmine_mqc-generalstats-sexdeterrmine-RateX": rng.random()}}
+    for i in range(n_libraries):
+        general_stats["ABC001.A{:04d}".format(i)] = {
+            "base endorSpy_mqc-generalstats-base_endorspy-endogenous_dna": rng.random() * 100,
+            "mapDamage_mqc-generalstats-mapdamage-mapdamage_3_Prime1": rng.random(),
+            "Picard_mqc-generalstats-picard-PERCENT_DUPLICATION": rng.random(),
+        }
+    ## Each row of plot data is roughly 1kB once serialised.
+    plot_rows = [[round(rng.random(), 12) for _ in range(60)] for _ in range(plot_mb * 1024)]
+    data = {
+        "report_data_sources": {"Samtools": {"all_sections": {"ABC001": "/path/to/ABC001.stats"}}},
+        "report_plot_data": {"qualimap_coverage_histogram": {"data": plot_rows}},
+        "report_saved_raw_data": {
+            "multiqc_qualimap_bamqc_genome_results": {"ABC001": {"mean_coverage": 0.5}},
+            "multiqc_general_stats": general_stats,
+        },
+        "config_version": "1.21",
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=4)
+
+def run_worker(mqc_data: str, json_parser: str):
+    '''
+    Reads the general stats once with the requested parser, and prints the wall time and peak RSS as JSON.
+    Run in a separate process per parser, so the peak RSS of one parser does not hide that of the other.
+    '''
+    collect_results = load_collect_results()
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    general_stats = collect_results.read_general_stats(mqc_data, json_parser)
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "seconds": elapsed,
+        "peak_rss_mb": peak_rss / 1024,
+        "added_rss_mb": (peak_rss - baseline_rss) / 1024,
+        "n_keys": len(general_stats),
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the different ways collect_results.py can read the general stats from a MultiQC data JSON, on synthetic reports of increasing size."
+    )
+    parser.add_argument("-s", "--sizes", metavar="MB", help="Sizes of the plot data in the synthetic reports, in MB. Defaults to 10 100.", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("-l", "--libraries", metavar="N", help="Number of libraries in the general stats of each report. Defaults to 50.", type=int, default=50)
+    parser.add_argument("--worker", nargs=2, metavar=("MQC_DATA", "JSON_PARSER"), help=argparse.SUPPRESS)
+    parser.add_argument("-v", "--version", action="version", version="%(prog)s {}".format(VERSION), help="Print the version and exit.")
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    json_parsers = ["full", "scan"]
+    if importlib.util.find_spec("ijson") is not None:
+        json_parsers.append("ijson")
+    else:
+        print("'ijson' is not installed, skipping the ijson parser.", file=sys.stderr)
+
+    print("report_mb", "json_parser", "seconds", "added_rss_mb", sep="\t")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            mqc_data = os.path.join(tmp_dir, "multiqc_data_{}.json".format(size))
+            write_synthetic_report(mqc_data, args.libraries, size)
+            report_mb = os.path.getsize(mqc_data) / 1024 ** 2
+            for json_parser in json_parsers:
+                worker = subprocess.run(
+                    [sys.executable, __file__, "--worker", mqc_data, json_parser],
+                    check=True, capture_output=True, text=True,
+                )
+                result = json.loads(worker.stdout)
+                print("{:.1f}".format(report_mb), json_parser, "{:.3f}".format(result["seconds"]), "{:.1f}".format(result["added_rss_mb"]), sep="\t")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import random
+import sys
+import time
+
+## Benchmark the pyPandoraHelper in this repository, rather than any installed version.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "py_helpers"))
+import pyPandoraHelper as pH
+
+VERSION = "0.1.0"
+
+SCALAR_FUNCTIONS = {
+    "site_id": pH.get_site_id,
+    "ind_id": pH.get_ind_id,
+    "sample_id": pH.get_sample_id,
+    "extract_id": pH.get_extract_id,
+    "library_id": pH.get_library_id,
+    "capture_id": pH.get_capture_id,
+    "sequencing_id": pH.get_sequencing_id,
+}
+
+def make_synthetic_ids(n: int, seed: int = 1) -> list:
+    '''
+    Creates n random Pandora_IDs of varying hierarchical level, some of them with the '_ss' suffix of Autorun_eager.
+    '''
+    rng = random.Random(seed)
+    ids = []
+    for _ in range(n):
+        ind_id = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(rng.choice([3, 4, 5]))) + "{:03d}".format(rng.randint(1, 999))
+        if rng.random() < 0.2:
+            ind_id += "_ss"
+        fields = [ind_id, "{}{:02d}{:02d}".format(rng.choice("ABC"), rng.randint(1, 5), rng.randint(1, 5)), "SG{}".format(rng.randint(1, 3)), str(rng.randint(1, 4))]
+        ids.append(".".join(fields[:rng.choice([1, 2, 4, 4, 4])]))
+    return ids
+
+def scalar_loop(ids: list, keep_ss_suffix: bool) -> dict:
+    '''
+    Infers all ID levels by calling the scalar functions for each ID and level, as callers did before parse_ids().
+    '''
+    result = {"pandora_id": ids}
+    for level, function in SCALAR_FUNCTIONS.items():
+        column = []
+        for pandora_id in ids:
+            try:
+                column.append(function(pandora_id, keep_ss_suffix))
+            except ValueError:
+                column.append(None)
+        result[level] = column
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark inferring all ID levels of many Pandora_IDs with parse_ids(), compared to calling the scalar get_*_id() functions in a loop."
+    )
+    parser.add_argument("-n", "--n_ids", metavar="N", help="Numbers of IDs to benchmark with. Defaults to 10 1000 50000.", type=int, nargs="+", default=[10, 1000, 50000])
+    parser.add_argument("-k", "--keep_ss_suffix", help="Keep the ss suffix in the inferred IDs.", action="store_true")
+    parser.add_argument("-v", "--version", action="version", version="%(prog)s {}".format(VERSION), help="Print the version and exit.")
+    args = parser.parse_args()
+
+    print("n_ids", "method", "seconds", "ids_per_second", sep="\t")
+    for n in args.n_ids:
+        ids = make_synthetic_ids(n)
+        results = {}
+        for method, function in [("scalar_loop", scalar_loop), ("parse_ids", pH.parse_ids)]:
+            start = time.perf_counter()
+            results[method] = function(ids, args.keep_ss_suffix)
+            elapsed = time.perf_counter() - start
+            print(n, method, "{:.4f}".format(elapsed), "{:.0f}".format(n / elapsed), sep="\t")
+        if results["scalar_loop"] != results["parse_ids"]:
+            sys.exit("ERROR: parse_ids() and the scalar functions returned different results!")
+
+if __name__ == "__main__":
+    main()
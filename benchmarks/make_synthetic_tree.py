@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import random
+import string
+import sys
+from typing import Any, Dict, List
+
+VERSION = "0.1.0"
+
+## General stats keys that are the same in the MultiQC reports of eager 2.4.x and 2.5.x
+LIBRARY_KEYS = [
+    "Samtools Flagstat (pre-samtools filter)_mqc-generalstats-samtools_flagstat_pre_samtools_filter-flagstat_total",
+    "Samtools Flagstat (pre-samtools filter)_mqc-generalstats-samtools_flagstat_pre_samtools_filter-mapped_passed",
+    "Samtools Flagstat (post-samtools filter)_mqc-generalstats-samtools_flagstat_post_samtools_filter-flagstat_total",
+    "Samtools Flagstat (post-samtools filter)_mqc-generalstats-samtools_flagstat_post_samtools_filter-mapped_passed",
+    "Picard_mqc-generalstats-picard-PERCENT_DUPLICATION",
+    "FastQC (pre-Trimming)_mqc-generalstats-fastqc_pre_trimming-percent_duplicates",
+    "FastQC (pre-Trimming)_mqc-generalstats-fastqc_pre_trimming-total_sequences",
+]
+SAMPLE_KEYS = [
+    "mtnucratio_mqc-generalstats-mtnucratio-mtreads",
+    "mtnucratio_mqc-generalstats-mtnucratio-mt_cov_avg",
+    "mtnucratio_mqc-generalstats-mtnucratio-mt_nuc_ratio",
+    "mtnucratio_mqc-generalstats-mtnucratio-nuc_cov_avg",
+    "mtnucratio_mqc-generalstats-mtnucratio-nucreads",
+    "QualiMap_mqc-generalstats-qualimap-mapped_reads",
+    "QualiMap_mqc-generalstats-qualimap-mean_coverage",
+    "QualiMap_mqc-generalstats-qualimap-median_coverage",
+    "QualiMap_mqc-generalstats-qualimap-1_x_pc",
+    "QualiMap_mqc-generalstats-qualimap-2_x_pc",
+    "QualiMap_mqc-generalstats-qualimap-3_x_pc",
+    "QualiMap_mqc-generalstats-qualimap-4_x_pc",
+    "QualiMap_mqc-generalstats-qualimap-5_x_pc",
+    "QualiMap_mqc-generalstats-qualimap-avg_gc",
+    "QualiMap_mqc-generalstats-qualimap-total_reads",
+    "QualiMap_mqc-generalstats-qualimap-general_error_rate",
+    "SexDetErrmine_mqc-generalstats-sexdeterrmine-RateErrX",
+    "SexDetErrmine_mqc-generalstats-sexdeterrmine-RateErrY",
+    "SexDetErrmine_mqc-generalstats-sexdeterrmine-RateX",
+    "SexDetErrmine_mqc-generalstats-sexdeterrmine-RateY",
+]
+NUCLEAR_CONTAMINATION_FIELDS = [
+    "Method1_ML_SE", "Method1_ML_estimate", "Method1_MOM_SE", "Method1_MOM_estimate",
+    "Method2_ML_SE", "Method2_ML_estimate", "Method2_MOM_SE", "Method2_MOM_estimate", "Num_SNPs",
+]
+
+## General stats keys that differ between the MultiQC reports of eager 2.4.x and 2.5.x
+EAGER_VERSION_KEYS = {
+    "2.4.5": {
+        "library": [
+            "endorSpy_mqc-generalstats-endorspy-endogenous_dna",
+            "endorSpy_mqc-generalstats-endorspy-endogenous_dna_post",
+            "DamageProfiler_mqc-generalstats-damageprofiler-3_Prime1",
+            "DamageProfiler_mqc-generalstats-damageprofiler-3_Prime2",
+            "DamageProfiler_mqc-generalstats-damageprofiler-5_Prime1",
+            "DamageProfiler_mqc-generalstats-damageprofiler-5_Prime2",
+            "DamageProfiler_mqc-generalstats-damageprofiler-mean_readlength",
+            "DamageProfiler_mqc-generalstats-damageprofiler-median",
+            "DamageProfiler_mqc-generalstats-damageprofiler-std",
+        ],
+        "sample": [
+            "nuclear_contamination_mqc-generalstats-nuclear_contamination-{}".format(field) for field in NUCLEAR_CONTAMINATION_FIELDS
+        ] + [
+            "snp_coverage_mqc-generalstats-snp_coverage-Covered_Snps",
+            "snp_coverage_mqc-generalstats-snp_coverage-Total_Snps",
+        ],
+        ## eager 2.4.x does not split any stats by UDG treatment
+        "udg": [],
+    },
+    "2.5": {
+        "library": [
+            "mapDamage_mqc-generalstats-mapdamage-mapdamage_3_Prime1",
+            "mapDamage_mqc-generalstats-mapdamage-mapdamage_3_Prime2",
+            "mapDamage_mqc-generalstats-mapdamage-mapdamage_5_Prime1",
+            "mapDamage_mqc-generalstats-mapdamage-mapdamage_5_Prime2",
+        ],
+        "sample": [
+            "base nuclear_contamination_mqc-generalstats-base_nuclear_contamination-{}".format(field) for field in NUCLEAR_CONTAMINATION_FIELDS
+        ] + [
+            "base snp_coverage_mqc-generalstats-base_snp_coverage-Covered_Snps",
+            "base snp_coverage_mqc-generalstats-base_snp_coverage-Total_Snps",
+        ],
+        ## eager 2.5.x reports the endogenous DNA in keys like <Library_ID>_udg<treatment>
+        "udg": [
+            "base endorSpy_mqc-generalstats-base_endorspy-endogenous_dna",
+            "base endorSpy_mqc-generalstats-base_endorspy-endogenous_dna_post",
+        ],
+    },
+}
+
+EAGER_TSV_HEADER = ["Sample_Name", "Library_ID", "Lane", "Colour_Chemistry", "SeqType", "Organism", "Strandedness", "UDG_Treatment", "R1", "R2", "BAM"]
+
+def site_name(i: int) -> str:
+    '''
+    Returns a unique three letter Site_ID for the i-th site.
+    '''
+    letters = string.ascii_uppercase
+    return letters[i // 676 % 26] + letters[i // 26 % 26] + letters[i % 26]
+
+def random_value(rng: random.Random) -> float:
+    '''
+    Returns a random stat, rounded like the different kinds of values in real reports (counts, percentages and ratios).
+    '''
+    return round(rng.random() * 100, rng.choice([0, 2, 6]))
+
+def write_report(path: str, general_stats: Dict, plot_kb: int, rng: random.Random) -> None:
+    '''
+    Writes a MultiQC data JSON with the provided general stats, preceded by roughly plot_kb kB of plot data,
+    like the plot data that makes up most of real reports.
+    '''
+    ## Each row of plot data is roughly 1kB once serialised.
+    plot_rows = [[round(rng.random(), 12) for _ in range(60)] for _ in range(plot_kb)]
+    data = {
+        "report_data_sources": {"Samtools": {"all_sections": {name: "/path/to/{}.stats".format(name) for name in general_stats}}},
+        "report_plot_data": {"qualimap_coverage_histogram": {"data": plot_rows}},
+        "report_saved_raw_data": {
+            "multiqc_qualimap_bamqc_genome_results": {name: {"mean_coverage": 0.5} for name in general_stats if "." not in name},
+            "multiqc_general_stats": general_stats,
+        },
+        "config_version": "1.21",
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=4)
+
+def write_mapdamage_results(results_dir: str, rng: random.Random) -> None:
+    '''
+    Writes the mapDamage results of a library, with a random read length distribution.
+    '''
+    os.makedirs(results_dir, exist_ok=True)
+    for file_name, column in [("3pGtoA_freq.txt", "3pG>A"), ("5pCtoT_freq.txt", "5pC>T")]:
+        with open(os.path.join(results_dir, file_name), "w") as f:
+            f.write("pos\t{}\n".format(column))
+            for position in range(1, 26):
+                f.write("{}\t{}\n".format(position, rng.random() * 0.3))
+    with open(os.path.join(results_dir, "lgdistribution.txt"), "w") as f:
+        f.write("# table produced by mapDamage version 2.2.1\n# using mapped file - and hs_ref.fa as reference file\n# Std: strand of reads\n")
+        f.write("Std\tLength\tOccurences \n")
+        for strand in "+-":
+            for length in range(30, 30 + rng.randint(1, 90)):
+                f.write("{}\t{}\t{}\n".format(strand, length, rng.randint(1, 5000)))
+
+def make_synthetic_tree(
+    output_dir: str,
+    n_individuals: int,
+    max_libraries: int = 3,
+    analysis_types: List[str] = ["TF"],
+    plot_kb: int = 20,
+    seed: int = 1,
+) -> Dict[str, Any]:
+    '''
+    Creates eager_outputs and eager_inputs trees in output_dir, with the results of n_individuals individuals for each analysis type,
+    and writes the list of individuals (input.txt) and a main ID list (main_ids.txt) next to them. Half of the individuals
+    have eager 2.5.x style reports with mapDamage results, the other half eager 2.4.x style reports. Some individuals are
+    single stranded ('_ss'), some have libraries merged in from another Full individual ID, and some have no results at all.
+    Returns a summary of the tree.
+    '''
+    rng = random.Random(seed)
+    output_root = os.path.join(output_dir, "eager_outputs")
+    input_root = os.path.join(output_dir, "eager_inputs")
+    individuals = []
+    main_ids = []
+    all_libraries = []
+    n_reports = 0
+    for i in range(n_individuals):
+        ## Sites have up to 50 individuals each, like the larger sites in Pandora.
+        site = site_name(i // 50)
+        ind = "{}{:03d}".format(site, i % 50 + 1)
+        individuals.append(ind)
+        eager_version = "2.5" if i % 2 == 0 else "2.4.5"
+        version_keys = EAGER_VERSION_KEYS[eager_version]
+        single_stranded = rng.random() < 0.2
+        suffix = "_ss" if single_stranded else ""
+        ## Libraries merged in from another Full individual ID, which is mapped to this individual in the main ID list.
+        ## These are only generated for eager 2.4.x reports, since the mapDamage results are stored under the Full individual ID.
+        merged_ind = None
+        if eager_version == "2.4.5" and rng.random() < 0.05:
+            merged_ind = "{}{:03d}".format(site, 900 + i % 50)
+            main_ids.append((merged_ind, ind))
+        ## About 3% of the individuals in the input list have not been processed yet.
+        if rng.random() < 0.03:
+            continue
+        for analysis_type in analysis_types:
+            general_stats = {ind + suffix: {key: random_value(rng) for key in SAMPLE_KEYS + version_keys["sample"]}}
+            tsv_rows = []
+            libraries = []
+            for j in range(rng.randint(1, max_libraries)):
+                library_ind = merged_ind if merged_ind is not None and j == 1 else ind
+                library = "{}{}.A{:02d}{:02d}.{}1.1".format(library_ind, suffix, j // 3 + 1, j % 3 + 1, analysis_type)
+                libraries.append(library)
+                general_stats[library] = {key: random_value(rng) for key in LIBRARY_KEYS + version_keys["library"]}
+                udg_treatment = rng.choice(["none", "half", "full"])
+                if version_keys["udg"]:
+                    general_stats["{}_udg{}".format(library, udg_treatment)] = {key: random_value(rng) for key in version_keys["udg"]}
+                tsv_rows.append([
+                    ind + suffix, library, "1", "4", "SE", "hs", "single" if single_stranded else "double", udg_treatment,
+                    "/path/to/{}_R1.fastq.gz".format(library), "NA", "NA",
+                ])
+            ind_dir = os.path.join(output_root, analysis_type, site, ind)
+            os.makedirs(os.path.join(ind_dir, "multiqc", "multiqc_data"), exist_ok=True)
+            write_report(os.path.join(ind_dir, "multiqc", "multiqc_data", "multiqc_data.json"), general_stats, plot_kb, rng)
+            with open(os.path.join(ind_dir, "multiqc", "multiqc_report.html"), "w") as f:
+                f.write("<html></html>\n")
+            tsv_dir = os.path.join(input_root, analysis_type, site, ind)
+            os.makedirs(tsv_dir, exist_ok=True)
+            with open(os.path.join(tsv_dir, "{}.tsv".format(ind)), "w") as f:
+                f.write("\t".join(EAGER_TSV_HEADER) + "\n")
+                for row in tsv_rows:
+                    f.write("\t".join(row) + "\n")
+            if eager_version == "2.5":
+                for library in libraries:
+                    write_mapdamage_results(os.path.join(ind_dir, "mapdamage", "results_{}_rmdup".format(library)), rng)
+            all_libraries.extend(libraries)
+            n_reports += 1
+    with open(os.path.join(output_dir, "input.txt"), "w") as f:
+        f.write("\n".join(individuals) + "\n")
+    with open(os.path.join(output_dir, "main_ids.txt"), "w") as f:
+        f.write("Full_Individual_Id\tMain_Individual_Id\n")
+        for full_id, main_id in main_ids:
+            f.write("{}\t{}\n".format(full_id, main_id))
+    return {
+        "root_output_path": output_root,
+        "input": os.path.join(output_dir, "input.txt"),
+        "main_id_list": os.path.join(output_dir, "main_ids.txt"),
+        "individuals": individuals,
+        "libraries": all_libraries,
+        "n_reports": n_reports,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create synthetic eager_outputs and eager_inputs trees, with MultiQC data in the layouts of eager 2.4.x and 2.5.x, to run collect_results.py on."
+    )
+    parser.add_argument("-o", "--output_dir", metavar="DIR", help="The directory in which to create the eager_outputs and eager_inputs trees, and the input.txt and main_ids.txt files.", required=True)
+    parser.add_argument("-n", "--individuals", metavar="N", help="Number of individuals. Defaults to 10.", type=int, default=10)
+    parser.add_argument("-l", "--libraries", metavar="N", help="Maximum number of libraries per individual. Each individual has between 1 and N libraries. Defaults to 3.", type=int, default=3)
+    parser.add_argument("-a", "--analysis_type", metavar="TYPE", help="Analysis types to create results for. Defaults to TF.", nargs="+", default=["TF"])
+    parser.add_argument("--plot_kb", metavar="KB", help="Size of the plot data in each MultiQC data JSON, in kB. Defaults to 20.", type=int, default=20)
+    parser.add_argument("--seed", metavar="N", help="Seed of the random number generator. Defaults to 1.", type=int, default=1)
+    parser.add_argument("-v", "--version", action="version", version="%(prog)s {}".format(VERSION), help="Print the version and exit.")
+    args = parser.parse_args()
+
+    tree = make_synthetic_tree(args.output_dir, args.individuals, args.libraries, args.analysis_type, args.plot_kb, args.seed)
+    print(
+        "Created {} MultiQC reports with {} libraries for {} individuals in '{}'.".format(
+            tree["n_reports"], len(tree["libraries"]), len(tree["individuals"]), args.output_dir
+        ),
+        file=sys.stderr,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+VERSION = "0.1.0"
+
+COLLECT_RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Autorun_multiqc_stats_collect", "collect_results.py")
+## Use the pyPandoraHelper in this repository, rather than any installed version.
+PY_HELPERS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "py_helpers")
+
+## Packages that collect_results.py must only import on the code paths that need them
+LAZY_MODULES = ["numpy", "pandas", "pyarrow", "ijson", "yaml", "pyEager", "asyncio", "multiprocessing"]
+
+def parse_importtime(stderr: str) -> dict:
+    '''
+    Parses the output of 'python -X importtime', and returns the cumulative import time (in microseconds) of each top-level import.
+    Nested imports are indented in the output, and are included in the cumulative time of the top-level import.
+    '''
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        ## Top-level imports are indented by a single space
+        if name.startswith("  "):
+            continue
+        imports[name.strip()] = int(fields[1])
+    return imports
+
+def list_imported_modules(stderr: str) -> set:
+    '''
+    Returns the names of all modules (including nested imports) in the output of 'python -X importtime'.
+    '''
+    return {
+        line.split("|")[2].strip()
+        for line in stderr.splitlines()
+        if line.startswith("import time:") and line.count("|") == 2 and line.split("|")[1].strip().isdigit()
+    }
+
+def run_importtime(args: list) -> str:
+    '''
+    Runs python -X importtime with args, and returns its stderr.
+    '''
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PY_HELPERS_PATH, os.environ.get("PYTHONPATH")])))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True
+    )
+    return result.stderr
+
+def measure(args: list, baseline: set, repeats: int) -> tuple:
+    '''
+    Returns the median time (in ms) spent on the imports that are not made by a bare interpreter, and the set of modules imported.
+    '''
+    times = []
+    modules = set()
+    for _ in range(repeats):
+        stderr = run_importtime(args)
+        imports = parse_importtime(stderr)
+        times.append(sum(microseconds for name, microseconds in imports.items() if name not in baseline) / 1000)
+        modules = list_imported_modules(stderr)
+    return (statistics.median(times), modules)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that the import time of collect_results.py stays within a budget, and that its heavy dependencies are only imported when needed. Exits with an error if not."
+    )
+    parser.add_argument("-b", "--budget", metavar="MS", help="The maximum median import time, in ms, on top of the imports of a bare interpreter. Defaults to 100.", type=float, default=100)
+    parser.add_argument("-n", "--repeats", metavar="N", help="Number of times to run each command. Defaults to 5.", type=int, default=5)
+    parser.add_argument("-v", "--version", action="version", version="%(prog)s {}".format(VERSION), help="Print the version and exit.")
+    args = parser.parse_args()
+
+    baseline = set(parse_importtime(run_importtime(["-c", "pass"])))
+    failures = []
+    print("command", "import_ms", "budget_ms", sep="\t")
+    for command in [["--version"], ["--help"]]:
+        import_ms, modules = measure([COLLECT_RESULTS_PATH, *command], baseline, args.repeats)
+        print("collect_results.py {}".format(" ".join(command)), "{:.1f}".format(import_ms), "{:.0f}".format(args.budget), sep="\t")
+        if import_ms > args.budget:
+            failures.append("'collect_results.py {}' spent {:.1f} ms on imports, more than the budget of {:.0f} ms.".format(" ".join(command), import_ms, args.budget))
+        eager_modules = [module for module in LAZY_MODULES if module in modules]
+        if eager_modules:
+            failures.append("'collect_results.py {}' imported {}, which should only be imported when needed.".format(" ".join(command), ", ".join(eager_modules)))
+
+    for failure in failures:
+        print("ERROR: {}".format(failure), file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
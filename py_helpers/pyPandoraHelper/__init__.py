@@ -1,4 +1,4 @@
-__version__ = "0.2.1"
+__version__ = "0.5.1"
 from pyPandoraHelper.pyPandoraHelper import (
   _remove_suffix,
   get_site_id,
@@ -7,5 +7,9 @@ from pyPandoraHelper.pyPandoraHelper import (
   get_extract_id,
   get_library_id,
   get_capture_id,
-  get_sequencing_id
+  get_sequencing_id,
+  ID_LEVELS,
+  parse_ids,
+  parse_ids_series,
+  PandoraID
 )
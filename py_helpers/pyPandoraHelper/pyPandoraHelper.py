@@ -1,5 +1,9 @@
 #!/usr/bin/env python3
-VERSION = '0.2.1' 
+import sys
+import itertools
+import weakref
+from functools import total_ordering
+VERSION = '0.5.1'
 
 def _remove_suffix(ind_id: str, keep_ss_suffix: bool = False) -> str:
   '''
@@ -88,6 +92,183 @@ def get_sequencing_id(id: str, keep_ss_suffix: bool = False) -> str:
   result=_remove_suffix(x[0], keep_ss_suffix)+'.'+x[1]+'.'+x[2]+'.'+x[3]
   return(result)
 
+## The ID levels returned by parse_ids(), from highest to lowest.
+ID_LEVELS = ['site_id', 'ind_id', 'sample_id', 'extract_id', 'library_id', 'capture_id', 'sequencing_id']
+_LEVEL_NAMES = ['Site_ID', 'Individual_ID', 'Sample_ID', 'Extract_ID', 'Library_ID', 'Capture_ID', 'Sequencing_ID']
+
+def _parse_id(id: str, keep_ss_suffix: bool = False) -> tuple:
+  '''
+  This function splits a Pandora_ID once, and returns all IDs that can be inferred from it, in the order of ID_LEVELS.
+  IDs that cannot be inferred are returned as None. The results are identical to those of the get_*_id() functions.
+  '''
+  x=id.strip().split('.')
+  ## Same logic as in _remove_suffix(), inlined since this is called for every ID.
+  ind_id=x[0].strip()
+  if not keep_ss_suffix and ind_id[-3:] == '_ss':
+    ind_id=ind_id[0:-3]
+  ## Same logic as in get_site_id()
+  if len(id) < 6 or ( len(id) == 6 and not id[-3:].isdigit()):
+    site_id=id
+  elif ind_id.endswith("_ss"):
+    site_id=ind_id[0:-6]
+  else:
+    site_id=ind_id[0:-3]
+  if len(x) < 2:
+    return((site_id, ind_id, None, None, None, None, None))
+  ## get_sample_id() fails on an empty second field, while the other functions do not.
+  sample_id=ind_id+'.'+x[1][0] if x[1] else None
+  extract_id=ind_id+'.'+x[1][0:3]
+  library_id=ind_id+'.'+x[1]
+  capture_id=library_id+'.'+x[2] if len(x) > 2 else None
+  sequencing_id=capture_id+'.'+x[3] if len(x) > 3 else None
+  result=(site_id, ind_id, sample_id, extract_id, library_id, capture_id, sequencing_id)
+  return(result)
+
+def parse_ids(ids, keep_ss_suffix: bool = False, levels: list = None, errors: str = 'coerce') -> dict:
+  '''
+  This function takes an iterable of Pandora_IDs and infers all requested ID levels (default: all of ID_LEVELS) at once.
+  Each Pandora_ID is only split once, which is much faster than calling the get_*_id() functions for each ID and level.
+  Returns a dictionary with 'pandora_id' and each requested level as keys, and lists of IDs as values.
+  If a level cannot be inferred from an ID, the value is None, or a ValueError is raised if errors='raise'.
+  '''
+  if levels is None:
+    levels=ID_LEVELS
+  for level in levels:
+    if level not in ID_LEVELS:
+      raise ValueError('Unknown ID level: {}. The allowed values are: {}'.format(level, ID_LEVELS))
+  if errors not in ['coerce', 'raise']:
+    raise ValueError("The errors argument must be either 'coerce' or 'raise'.")
+  ids=list(ids)
+  ## Transpose the parsed IDs into one column per level
+  columns=list(zip(*[_parse_id(id, keep_ss_suffix) for id in ids])) or [()]*len(ID_LEVELS)
+  result={'pandora_id': ids}
+  for level in levels:
+    i=ID_LEVELS.index(level)
+    if errors == 'raise' and None in columns[i]:
+      raise ValueError('The provided Pandora_ID does not contain the {}.'.format(_LEVEL_NAMES[i]))
+    result[level]=list(columns[i])
+  return(result)
+
+def parse_ids_series(ids, keep_ss_suffix: bool = False, levels: list = None, errors: str = 'coerce'):
+  '''
+  This function is the pandas equivalent of parse_ids(). It takes a pandas.Series (or any iterable) of Pandora_IDs, and
+  returns a pandas.DataFrame with one column per requested level, with the same index as the input Series.
+  IDs that cannot be inferred are returned as None. Requires pandas.
+  '''
+  import pandas as pd
+  if not isinstance(ids, pd.Series):
+    ids=pd.Series(list(ids))
+  result=parse_ids(ids.tolist(), keep_ss_suffix, levels, errors)
+  del result['pandora_id']
+  ## The object dtype keeps None for IDs that cannot be inferred, rather than NaN in a string column.
+  return(pd.DataFrame(result, index=ids.index, dtype=object))
+
+@total_ordering
+class PandoraID:
+  '''
+  This class holds a parsed Pandora_ID. The ID is only split once on creation, and all IDs of higher hierarchical level are kept.
+  PandoraIDs are immutable, hashable and ordered like their string, so they can be sorted and used as dictionary keys.
+  Use PandoraID.intern() instead of PandoraID() to share a single instance between duplicate IDs.
+  '''
+  ## No __dict__ per instance, which keeps large sets of IDs small in memory.
+  __slots__ = ('_id', '_levels', '_ss', '__weakref__')
+  _interned = weakref.WeakValueDictionary()
+
+  def __init__(self, id: str):
+    object.__setattr__(self, '_id', id.strip())
+    object.__setattr__(self, '_levels', _parse_id(id, keep_ss_suffix=False))
+    object.__setattr__(self, '_ss', id.strip().split('.')[0].strip()[-3:] == '_ss')
+
+  @classmethod
+  def intern(cls, id: str) -> 'PandoraID':
+    '''
+    This function returns the existing PandoraID for the provided Pandora_ID if there is one, or creates it otherwise.
+    '''
+    result=cls._interned.get(id)
+    if result is None:
+      result=cls(id)
+      cls._interned[id]=result
+    return(result)
+
+  def get(self, level: str, keep_ss_suffix: bool = False) -> str:
+    '''
+    This function returns the ID of the requested level (one of ID_LEVELS), like the corresponding get_*_id() function.
+    '''
+    if level not in ID_LEVELS:
+      raise ValueError('Unknown ID level: {}. The allowed values are: {}'.format(level, ID_LEVELS))
+    i=ID_LEVELS.index(level)
+    result=self._levels[i]
+    if result is None:
+      raise ValueError('The provided Pandora_ID does not contain the {}.'.format(_LEVEL_NAMES[i]))
+    ## The Site_ID never has a suffix. For all other levels, the suffix directly follows the Individual_ID.
+    if keep_ss_suffix and self._ss and level != 'site_id':
+      ind_id=self._levels[1]
+      result=ind_id+'_ss'+result[len(ind_id):]
+    return(result)
+
+  @property
+  def is_ss(self) -> bool:
+    '''True if the Individual_ID carries the '_ss' suffix added by Autorun_eager for single stranded libraries.'''
+    return(self._ss)
+
+  ## Shorthands for get(), without the '_ss' suffix.
+  @property
+  def site_id(self) -> str:
+    return(self.get('site_id'))
+
+  @property
+  def ind_id(self) -> str:
+    return(self.get('ind_id'))
+
+  @property
+  def sample_id(self) -> str:
+    return(self.get('sample_id'))
+
+  @property
+  def extract_id(self) -> str:
+    return(self.get('extract_id'))
+
+  @property
+  def library_id(self) -> str:
+    return(self.get('library_id'))
+
+  @property
+  def capture_id(self) -> str:
+    return(self.get('capture_id'))
+
+  @property
+  def sequencing_id(self) -> str:
+    return(self.get('sequencing_id'))
+
+  def __setattr__(self, name, value):
+    raise AttributeError('PandoraID objects are immutable.')
+
+  def __delattr__(self, name):
+    raise AttributeError('PandoraID objects are immutable.')
+
+  ## Needed since __setattr__ is blocked, which the default pickling of __slots__ relies on.
+  def __reduce__(self):
+    return((PandoraID, (self._id,)))
+
+  def __str__(self):
+    return(self._id)
+
+  def __repr__(self):
+    return('PandoraID({!r})'.format(self._id))
+
+  def __hash__(self):
+    return(hash(self._id))
+
+  def __eq__(self, other):
+    if not isinstance(other, PandoraID):
+      return(NotImplemented)
+    return(self._id == other._id)
+
+  def __lt__(self, other):
+    if not isinstance(other, PandoraID):
+      return(NotImplemented)
+    return(self._id < other._id)
+
 def test():
   '''
   This function runs test cases for the functions in this module.
@@ -123,6 +304,27 @@ def test():
       print('')
       pass
 
+def convert_ids(in_handle, out_handle, levels: list, keep_ss_suffix: bool = False, chunk_size: int = 100000) -> int:
+  '''
+  This function reads one Pandora_ID per line from in_handle, and writes each Pandora_ID and the requested ID levels as a line of a TSV to out_handle.
+  IDs are converted in chunks with parse_ids(), and levels that cannot be inferred from an ID are left empty.
+  Returns the number of IDs for which at least one of the requested levels could not be inferred.
+  '''
+  n_invalid=0
+  while True:
+    ids=[line.rstrip('\r\n') for line in itertools.islice(in_handle, chunk_size)]
+    if not ids:
+      break
+    parsed=parse_ids(ids, keep_ss_suffix, levels)
+    lines=[]
+    for row in zip(*[parsed[key] for key in ['pandora_id']+levels]):
+      if None in row:
+        n_invalid+=1
+        row=['' if x is None else x for x in row]
+      lines.append('\t'.join(row))
+    out_handle.write('\n'.join(lines)+'\n')
+  return(n_invalid)
+
 def main():
   import argparse
   
@@ -131,38 +333,56 @@ def main():
     class customAction(argparse.Action):
       def __call__(self, parser, args, values, option_string=None):
         test()
+        parser.exit()
     return customAction
 
   parser = argparse.ArgumentParser(description='This is a helper module for the pyPandora package. It contains functions that help parse Pandora_IDs.')
   parser.add_argument('-t','--test', nargs=0, action=make_action('test'), help='Run test cases for the functions in this module. Ignored all other arguments.')
   parser.add_argument('-k','--keep_ss_suffix', action='store_true', help='Keep the ss suffix in the Individual ID (if applicable).')
   parser.add_argument('-v','--version', action='version', version='%(prog)s '+VERSION)
-  parser.add_argument('-g','--get', type=str, help='The function to run. Options: site_id, ind_id, sample_id, extract_id, library_id, capture_id, sequencing_id')
-  parser.add_argument('pandora_id', type=str, help='The Pandora_ID to infer from')
+  parser.add_argument('-g','--get', type=str, help='The function to run. Options: site_id, ind_id, sample_id, extract_id, library_id, capture_id, sequencing_id. Multiple options can be given as a comma-separated list (e.g. site_id,library_id). When reading IDs from a file or stdin, defaults to all options.')
+  ## A single Pandora_ID and an input file cannot be combined, since only one of them would be used
+  id_source = parser.add_mutually_exclusive_group()
+  id_source.add_argument('-i','--input', type=str, help='A file with one Pandora_ID per line to infer from, or "-" for stdin. The results are printed as a TSV with the Pandora_ID in the first column, followed by one column per requested option. Cannot be combined with a pandora_id argument.')
+  parser.add_argument('-H','--header', action='store_true', help='Print a header line before the results, when reading IDs from a file or stdin.')
+  id_source.add_argument('pandora_id', type=str, nargs='?', help='The Pandora_ID to infer from. If neither this nor --input is provided, Pandora_IDs are read from stdin.')
   args = parser.parse_args()
   
   allowed_get_values = ["site_id", "ind_id", "individual_id", "sample_id", "extract_id", "library_id", "lib_id", "capture_id", "sequencing_id" ]
-  if args.test:
-    test()
-  elif args.get not in allowed_get_values:
+  aliases = {"individual_id": "ind_id", "lib_id": "library_id"}
+  bulk_mode = args.pandora_id is None
+  if args.get is None and bulk_mode:
+    levels = ID_LEVELS
+  elif args.get is None or any(get not in allowed_get_values for get in args.get.split(',')):
     print('The provided value for the -g/--get argument is not allowed.')
     print('The allowed values are:',allowed_get_values)
+    sys.exit(1)
   else:
-    ## TODO ValueError handling for CLI.
-    if args.get == "site_id":
-      print(get_site_id(args.pandora_id, args.keep_ss_suffix))
-    elif args.get in ["ind_id", "individual_id"]:
-      print(get_ind_id(args.pandora_id, args.keep_ss_suffix))
-    elif args.get == "sample_id":
-      print(get_sample_id(args.pandora_id, args.keep_ss_suffix))
-    elif args.get == "extract_id":
-      print(get_extract_id(args.pandora_id, args.keep_ss_suffix))
-    elif args.get in ["library_id", "lib_id"]:
-      print(get_library_id(args.pandora_id, args.keep_ss_suffix))
-    elif args.get == "capture_id":
-      print(get_capture_id(args.pandora_id, args.keep_ss_suffix))
-    elif args.get == "sequencing_id":
-      print(get_sequencing_id(args.pandora_id, args.keep_ss_suffix))
+    levels = [aliases.get(get, get) for get in args.get.split(',')]
+
+  if bulk_mode:
+    if args.input is None or args.input == '-':
+      ## Do not silently wait for input typed into the terminal
+      if sys.stdin.isatty():
+        parser.error('No Pandora_ID was provided, either as an argument, with -i/--input, or via stdin.')
+      in_handle = sys.stdin
+    else:
+      try:
+        in_handle = open(args.input, 'r')
+      except OSError as e:
+        parser.error("Cannot read the input file '{}': {}".format(args.input, e.strerror))
+    with in_handle:
+      if args.header:
+        print('pandora_id', *levels, sep='\t')
+      n_invalid = convert_ids(in_handle, sys.stdout, levels, args.keep_ss_suffix)
+    if n_invalid > 0:
+      print('WARNING: {} Pandora_IDs did not contain all requested IDs. These are left empty in the output.'.format(n_invalid), file=sys.stderr)
+  else:
+    try:
+      print(*[PandoraID(args.pandora_id).get(level, args.keep_ss_suffix) for level in levels], sep='\t')
+    except ValueError as e:
+      print(e, file=sys.stderr)
+      sys.exit(1)
   
 if __name__ == '__main__':
   main()
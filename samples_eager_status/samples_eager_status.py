@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import re
+import sys
+import urllib.error
+import urllib.request
+from typing import Dict, List, Tuple, Union
+
+VERSION = "0.2.0"
+
+## Queue lines are commands, so the IDs in them are delimited by path separators, spaces, dots etc.
+ID_DELIMITERS = re.compile(r"[^A-Za-z0-9_]+")
+## Spawner log file names look like AE_spawner<...>txt.o<job_id>.<array_index>
+SPAWNER_LOG_NAME = re.compile(r"^AE_spawner.*txt\.o.*\.([0-9]+)$")
+QUEUE_SUFFIX = "_Autorun_eager_queue.txt"
+
+
+def file_signature(path: str) -> Union[List[float], None]:
+    '''
+    Returns the modification time and size of a file, used to detect if the file has changed. Returns None if the file does not exist.
+    '''
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat_result.st_mtime, stat_result.st_size]
+
+
+def parse_queue_file(queue_path: str) -> Dict[str, int]:
+    '''
+    Reads an Autorun_eager queue file once, and returns the last line number (i.e. the array index of the spawner job)
+    on which each ID appears. IDs with the '_ss' suffix are also indexed without it, since the individual ID matches those lines too.
+    '''
+    ids = {}
+    with open(queue_path, "r") as f:
+        for line_number, line in enumerate(f, start=1):
+            for token in ID_DELIMITERS.split(line):
+                if not token:
+                    continue
+                ids[token] = line_number
+                if token.endswith("_ss"):
+                    ids[token[:-3]] = line_number
+    return ids
+
+
+def update_queue_index(root: str, index: Dict) -> Dict:
+    '''
+    Brings the index of all queue files in root up to date. Queue files that are unchanged since they were indexed
+    are not read again, and queue files that no longer exist are dropped from the index.
+    '''
+    queue_paths = sorted(
+        os.path.join(root, name) for name in os.listdir(root) if name.endswith(QUEUE_SUFFIX)
+    )
+    queues = {}
+    for queue_path in queue_paths:
+        signature = file_signature(queue_path)
+        previous = index.get("queues", {}).get(queue_path)
+        if previous is not None and previous["signature"] == signature:
+            queues[queue_path] = previous
+        else:
+            ## Completed statuses are only valid for the queue file they were read for.
+            queues[queue_path] = {
+                "signature": signature,
+                "ids": parse_queue_file(queue_path),
+                "statuses": {},
+            }
+    index["version"] = VERSION
+    index["queues"] = queues
+    return index
+
+
+def get_latest_runs(index: Dict) -> Dict[str, Tuple[str, int]]:
+    '''
+    Merges the index of all queue files into the queue file and array index of the last run of each ID.
+    Like in samples_eager_status.sh, the last queue file (in sorted order) listing an ID wins.
+    '''
+    latest_runs = {}
+    for queue_path in sorted(index["queues"]):
+        for iid, line_number in index["queues"][queue_path]["ids"].items():
+            latest_runs[iid] = (queue_path, line_number)
+    return latest_runs
+
+
+def list_spawner_logs(log_dir: str) -> Dict[int, List[str]]:
+    '''
+    Lists the spawner logs of a run directory once, and returns the paths of the logs for each array index.
+    '''
+    logs = {}
+    try:
+        with os.scandir(log_dir) as entries:
+            for entry in entries:
+                match = SPAWNER_LOG_NAME.match(entry.name)
+                if match:
+                    logs.setdefault(int(match.group(1)), []).append(entry.path)
+    except FileNotFoundError:
+        pass
+    for array_index in logs:
+        logs[array_index].sort()
+    return logs
+
+
+def read_status(log_paths: List[str]) -> str:
+    '''
+    Returns the status from the first 'Pipeline completed' line in the spawner logs, formatted like samples_eager_status.sh
+    (e.g. 'Pipeline-completed-successfully-'). Returns an empty string if the pipeline has not completed.
+    '''
+    for log_path in log_paths:
+        with open(log_path, "r", errors="replace") as f:
+            for line in f:
+                if "Pipeline completed" in line:
+                    fields = line.split() + ["", "", ""]
+                    return "-".join(fields[1:4])
+    return ""
+
+
+def get_statuses(root: str, index: Dict, individuals: List[str]) -> List[Tuple[str, str]]:
+    '''
+    Returns the status of the latest run of each individual. Each run log directory is only listed once, and
+    completed statuses are stored in the index, so their logs need not be read again.
+    '''
+    latest_runs = get_latest_runs(index)
+    spawner_logs = {}
+    results = []
+    for iid in individuals:
+        latest_run = latest_runs.get(iid) if iid else None
+        if latest_run is None:
+            results.append((iid, ""))
+            continue
+        queue_path, array_index = latest_run
+        statuses = index["queues"][queue_path]["statuses"]
+        status = statuses.get(str(array_index))
+        if status is None:
+            run = os.path.basename(queue_path)
+            if run not in spawner_logs:
+                spawner_logs[run] = list_spawner_logs(os.path.join(root, "array_Logs", run))
+            status = read_status(spawner_logs[run].get(array_index, []))
+            ## A run that has not completed yet might still do so, so only remember completed runs.
+            if status:
+                statuses[str(array_index)] = status
+        results.append((iid, status))
+    return results
+
+
+def load_index(index_path: str) -> Dict:
+    '''
+    Loads a persisted index. Returns an empty index if the file does not exist, cannot be read, or was written by another version.
+    '''
+    try:
+        with open(index_path, "r") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get("version") != VERSION:
+        return {}
+    return index
+
+
+def save_index(index_path: str, index: Dict) -> None:
+    '''
+    Persists the index, writing to a temporary file first so that a concurrent run never reads a partial index.
+    '''
+    tmp_path = "{}.{}.tmp".format(index_path, os.getpid())
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+
+
+def query_server(url: str, endpoint: str, query: Dict = None) -> Dict:
+    '''
+    Sends a query to a query server started with 'collect_results.py serve', and returns its JSON reply.
+    Exits with an error if the server cannot be reached or rejects the query.
+    '''
+    request = urllib.request.Request(
+        "{}/{}".format(url.rstrip("/"), endpoint),
+        data=None if query is None else json.dumps(query).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.load(e)["error"]
+        except (ValueError, KeyError):
+            message = str(e)
+        print("[samples_eager_status.py]: The server at '{}' rejected the query: {}".format(url, message), file=sys.stderr)
+        sys.exit(1)
+    except (urllib.error.URLError, OSError) as e:
+        print("[samples_eager_status.py]: Cannot reach the server at '{}': {}".format(url, e), file=sys.stderr)
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="This is a script for checking if Autorun_eager has completed and run successfully for a list of individual IDs. It produces the same output as samples_eager_status.sh, but reads each queue file and run log directory only once."
+    )
+    parser.add_argument(
+        "-i",
+        "--input",
+        help="An input txt file with one column containing the Pandora individual ID (e.g. ABC001).",
+        required=True,
+    )
+    parser.add_argument(
+        "-r",
+        "--root",
+        help="The Autorun_eager directory, containing the *_Autorun_eager_queue.txt files and the array_Logs directory. Defaults to '/mnt/archgen/Autorun_eager'.",
+        default="/mnt/archgen/Autorun_eager",
+    )
+    parser.add_argument(
+        "--index",
+        metavar="FILE",
+        help="A file in which to persist the index of the queue files and completed runs between invocations. Only queue files that changed since the last invocation are read again.",
+        default=None,
+    )
+    parser.add_argument(
+        "--server",
+        metavar="URL",
+        help="Forward the query to a query server started with 'collect_results.py serve' (e.g. http://127.0.0.1:8765), which keeps the index of the queue files warm in memory. The server must use the same Autorun_eager directory. --index is then not used.",
+        default=None,
+    )
+    parser.add_argument(
+        "-v",
+        "--version",
+        action="version",
+        version="%(prog)s {}".format(VERSION),
+        help="Print the version and exit.",
+    )
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.input):
+        print("[samples_eager_status.py]: Input file does not exist.", file=sys.stderr)
+        sys.exit(1)
+
+    ## Only the first column of each line is the ID
+    with open(args.input, "r") as f:
+        individuals = [(line.split() or [""])[0] for line in f]
+
+    if args.server:
+        health = query_server(args.server, "health")
+        if health.get("eager_status_root") != os.path.abspath(args.root):
+            print(
+                "[samples_eager_status.py]: The server at '{}' answers run status queries for '{}', not '{}'.".format(
+                    args.server, health.get("eager_status_root"), args.root
+                ),
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        for iid, status in query_server(args.server, "status", {"individuals": individuals})["statuses"]:
+            print(iid, status, sep="\t")
+        return
+
+    index = load_index(args.index) if args.index else {}
+    index = update_queue_index(args.root, index)
+    for iid, status in get_statuses(args.root, index, individuals):
+        print(iid, status, sep="\t")
+
+    if args.index:
+        save_index(args.index, index)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLLECT_RESULTS_PATH = os.path.join(REPO_PATH, "Autorun_multiqc_stats_collect", "collect_results.py")
+## Test the scripts and pyPandoraHelper in this repository, rather than any installed version.
+PY_HELPERS_PATH = os.path.join(REPO_PATH, "py_helpers")
+for path in [PY_HELPERS_PATH, os.path.join(REPO_PATH, "Autorun_multiqc_stats_collect"), os.path.join(REPO_PATH, "benchmarks")]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from make_synthetic_tree import make_synthetic_tree
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: wall-clock checks, which only run with RUN_BENCHMARKS=1")
+
+
+@pytest.fixture
+def make_tree(tmp_path):
+    '''
+    Returns a function that creates a small synthetic eager output tree (see benchmarks/make_synthetic_tree.py) in a new
+    directory under tmp_path, and returns its summary.
+    '''
+    def make(n_individuals: int = 60, analysis_types: list = ["TF"], seed: int = 1) -> dict:
+        tree_dir = tmp_path / "tree_{}_{}_{}".format(n_individuals, "_".join(analysis_types), seed)
+        tree_dir.mkdir()
+        return make_synthetic_tree(str(tree_dir), n_individuals, 3, analysis_types, plot_kb=1, seed=seed)
+    return make
+
+
+@pytest.fixture
+def tree(make_tree):
+    return make_tree(analysis_types=["TF", "SG"])
+
+
+def run_collect_results(tree: dict, output: str, *args: str, input_list: bool = True) -> subprocess.CompletedProcess:
+    '''
+    Runs collect_results.py on a synthetic tree, and returns the completed process. Fails the test if it exits with an error.
+    '''
+    command = [
+        sys.executable, COLLECT_RESULTS_PATH,
+        "-r", tree["root_output_path"],
+        "--main_id_list", tree["main_id_list"],
+        "-o", str(output),
+        *(["-i", tree["input"]] if input_list else []),
+        *args,
+    ]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PY_HELPERS_PATH, os.environ.get("PYTHONPATH")])))
+    result = subprocess.run(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    assert result.returncode == 0, result.stderr
+    return result
+
+
+def read_rows(file_path: str) -> list:
+    '''
+    Returns the lines of an output table, without the '## ' footer lines, which record the command.
+    '''
+    with open(file_path, "r") as f:
+        return [line for line in f.read().splitlines() if not line.startswith("## ")]
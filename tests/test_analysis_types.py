@@ -0,0 +1,19 @@
+from conftest import read_rows, run_collect_results
+
+
+def test_multiple_analysis_types_equal_separate_runs(tree, tmp_path):
+    run_collect_results(tree, tmp_path / "TF.tsv", "-a", "TF", "--no_cache")
+    run_collect_results(tree, tmp_path / "SG.tsv", "-a", "SG", "--no_cache")
+    run_collect_results(tree, tmp_path / "both.tsv", "-a", "TF", "SG", "--no_cache")
+    run_collect_results(tree, tmp_path / "split.tsv", "-a", "TF", "SG", "--no_cache", "--split_output")
+    tf_rows = read_rows(tmp_path / "TF.tsv")
+    sg_rows = read_rows(tmp_path / "SG.tsv")
+    both_rows = read_rows(tmp_path / "both.tsv")
+
+    ## A single table holds the rows of both analysis types, and split output files equal the separate runs
+    assert both_rows[0] == tf_rows[0] == sg_rows[0]
+    data_type_column = both_rows[0].split("\t").index("Data_type")
+    sort_key = lambda row: (row.split("\t")[0], row.split("\t")[data_type_column])
+    assert both_rows[1:] == sorted(tf_rows[1:] + sg_rows[1:], key=sort_key)
+    assert read_rows(tmp_path / "split.TF.tsv") == tf_rows
+    assert read_rows(tmp_path / "split.SG.tsv") == sg_rows
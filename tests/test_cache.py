@@ -0,0 +1,141 @@
+import os
+import re
+import shutil
+import time
+
+import collect_results
+from conftest import read_rows, run_collect_results
+
+
+def get_mqc_data_path(tree: dict, data_type: str = "TF") -> str:
+    '''
+    Returns the path to the MultiQC data JSON of the first individual of a tree that has one.
+    '''
+    for ind in tree["individuals"]:
+        path = os.path.join(tree["root_output_path"], data_type, ind[:3], ind, "multiqc", "multiqc_data", "multiqc_data.json")
+        if os.path.isfile(path):
+            return path
+
+
+def rewrite_keeping_signature(path: str, old: str, new: str) -> None:
+    '''
+    Replaces old with new (of the same length) in a file, and restores its modification time, so that its size and
+    modification time are unchanged.
+    '''
+    assert len(old) == len(new)
+    stat_result = os.stat(path)
+    with open(path, "r") as f:
+        contents = f.read()
+    assert old in contents
+    with open(path, "w") as f:
+        f.write(contents.replace(old, new, 1))
+    os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+
+
+def test_copies_of_a_tree_do_not_share_cached_results(make_tree, tmp_path):
+    tree = make_tree(analysis_types=["TF"])
+    ## A copy of the tree, with the same modification times and sizes, but one different value
+    copy_dir = str(tmp_path / "copy")
+    shutil.copytree(os.path.dirname(tree["root_output_path"]), copy_dir)
+    copy = {
+        name: (value.replace(os.path.dirname(tree["root_output_path"]), copy_dir) if isinstance(value, str) else value)
+        for name, value in tree.items()
+    }
+    mqc_data = get_mqc_data_path(copy)
+    with open(mqc_data, "r") as f:
+        value = f.read().split('"Picard_mqc-generalstats-picard-PERCENT_DUPLICATION": ')[1].split(",")[0]
+    rewrite_keeping_signature(mqc_data, '"Picard_mqc-generalstats-picard-PERCENT_DUPLICATION": ' + value, '"Picard_mqc-generalstats-picard-PERCENT_DUPLICATION": ' + "9" * len(value))
+
+    cache_dir = str(tmp_path / "cache")
+    run_collect_results(tree, tmp_path / "original.tsv", "--cache_dir", cache_dir)
+    result = run_collect_results(copy, tmp_path / "copy.tsv", "--cache_dir", cache_dir)
+    run_collect_results(copy, tmp_path / "uncached.tsv", "--no_cache")
+    assert "Results cache: 0 hits" in result.stderr
+    assert read_rows(tmp_path / "copy.tsv") == read_rows(tmp_path / "uncached.tsv")
+    assert read_rows(tmp_path / "copy.tsv") != read_rows(tmp_path / "original.tsv")
+
+
+def test_cache_is_invalidated_when_a_file_changes(make_tree, tmp_path):
+    tree = make_tree(analysis_types=["TF"])
+    mqc_data = get_mqc_data_path(tree)
+    report = os.path.join(os.path.dirname(os.path.dirname(mqc_data)), "multiqc_report.html")
+    field = '"Picard_mqc-generalstats-picard-PERCENT_DUPLICATION": '
+    with open(mqc_data, "r") as f:
+        value = re.search(re.escape(field) + r"([0-9.]+)", f.read()).group(1)
+    cache_dir = str(tmp_path / "cache")
+    run_collect_results(tree, tmp_path / "first.tsv", "--cache_dir", cache_dir)
+
+    ## Same size, newer modification time (also of the report, so that the two stay consistent)
+    rewrite_keeping_signature(mqc_data, field + value, field + "7" * len(value))
+    newer = os.path.getmtime(mqc_data) + 10
+    for path in [mqc_data, report]:
+        os.utime(path, (newer, newer))
+    result = run_collect_results(tree, tmp_path / "mtime.tsv", "--cache_dir", cache_dir)
+    run_collect_results(tree, tmp_path / "mtime_uncached.tsv", "--no_cache")
+    assert ", 1 misses." in result.stderr
+    assert read_rows(tmp_path / "mtime.tsv") == read_rows(tmp_path / "mtime_uncached.tsv")
+    assert read_rows(tmp_path / "mtime.tsv") != read_rows(tmp_path / "first.tsv")
+
+    ## Same modification time, different size
+    stat_result = os.stat(mqc_data)
+    with open(mqc_data, "r") as f:
+        contents = f.read()
+    with open(mqc_data, "w") as f:
+        f.write(contents.replace(field + "7" * len(value), field + "7" * (len(value) + 1), 1))
+    os.utime(mqc_data, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+    result = run_collect_results(tree, tmp_path / "size.tsv", "--cache_dir", cache_dir)
+    run_collect_results(tree, tmp_path / "size_uncached.tsv", "--no_cache")
+    assert ", 1 misses." in result.stderr
+    assert read_rows(tmp_path / "size.tsv") == read_rows(tmp_path / "size_uncached.tsv")
+    assert read_rows(tmp_path / "size.tsv") != read_rows(tmp_path / "mtime.tsv")
+
+
+def age_file(path: str, days: float) -> None:
+    mtime = time.time() - days * 24 * 60 * 60
+    os.utime(path, (mtime, mtime))
+
+
+def test_prune_cache_deletes_old_entries(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    for name in ["old", "recent"]:
+        collect_results.write_cache_entry(cache_dir, "TF", name, {}, {})
+    age_file(os.path.join(cache_dir, "TF", "old.json"), 100)
+    ## Files that are not cache entries are left alone
+    other = os.path.join(cache_dir, "notes.txt")
+    with open(other, "w") as f:
+        f.write("keep\n")
+    age_file(other, 100)
+    assert collect_results.prune_cache(cache_dir, 90) == 1
+    assert sorted(os.listdir(os.path.join(cache_dir, "TF"))) == ["recent.json"]
+    assert os.path.isfile(other)
+    ## The cache is only walked once per interval
+    age_file(os.path.join(cache_dir, "TF", "recent.json"), 100)
+    assert collect_results.prune_cache(cache_dir, 90) == 0
+    assert collect_results.prune_cache(cache_dir, 90, interval=0) == 1
+
+
+def test_used_entries_are_kept(make_tree, tmp_path):
+    tree = make_tree(analysis_types=["TF"])
+    cache_dir = tmp_path / "cache"
+    run_collect_results(tree, tmp_path / "first.tsv", "--cache_dir", str(cache_dir))
+    entries = sorted(str(path) for path in cache_dir.rglob("*") if path.suffix in [".json", ".sqlite"])
+    for path in entries:
+        age_file(path, 100)
+    stale = cache_dir / "TF" / "ZZZ001.json"
+    stale.write_text("{}")
+    age_file(stale, 100)
+    os.remove(cache_dir / "last_pruned")
+
+    ## Nothing is deleted with --cache_max_age 0
+    run_collect_results(tree, tmp_path / "second.tsv", "--cache_dir", str(cache_dir), "--cache_max_age", "0")
+    assert stale.exists()
+    assert not (cache_dir / "last_pruned").exists()
+    for path in entries:
+        age_file(path, 100)
+
+    ## Entries read by the run are marked as used, so only the stale entry is deleted
+    result = run_collect_results(tree, tmp_path / "third.tsv", "--cache_dir", str(cache_dir))
+    assert "Deleted 1 cached results not used in the last 90 days." in result.stderr
+    assert not stale.exists()
+    assert sorted(str(path) for path in cache_dir.rglob("*") if path.suffix in [".json", ".sqlite"]) == entries
+    assert read_rows(tmp_path / "third.tsv") == read_rows(tmp_path / "first.tsv")
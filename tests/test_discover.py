@@ -0,0 +1,35 @@
+import json
+import os
+
+import collect_results
+from conftest import read_rows, run_collect_results
+
+
+def test_discover_equals_collecting_the_input_list(tree, tmp_path):
+    run_collect_results(tree, tmp_path / "input_list.tsv", "-a", "TF", "SG", "--no_cache")
+    run_collect_results(tree, tmp_path / "discovered.tsv", "-a", "TF", "SG", "--no_cache", "--discover", input_list=False)
+    run_collect_results(tree, tmp_path / "both.tsv", "-a", "TF", "SG", "--no_cache", "--discover")
+    assert read_rows(tmp_path / "discovered.tsv") == read_rows(tmp_path / "input_list.tsv")
+    assert read_rows(tmp_path / "both.tsv") == read_rows(tmp_path / "input_list.tsv")
+
+
+def test_manifest_lists_discovered_and_missing_individuals(tree, tmp_path):
+    ## A directory that is not where the paths of an individual would be inferred from its ID is not discovered
+    os.makedirs(os.path.join(tree["root_output_path"], "TF", "AAA", "XYZ001", "multiqc"))
+    manifest_path = tmp_path / "manifest.json"
+    run_collect_results(tree, tmp_path / "collected_data.tsv", "-a", "TF", "SG", "--no_cache", "--manifest", str(manifest_path))
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    assert sorted(manifest["analysis_types"]) == ["SG", "TF"]
+    for data_type in ["TF", "SG"]:
+        with_reports = {
+            ind for ind in tree["individuals"]
+            if os.path.isfile(collect_results.get_individual_paths(tree["root_output_path"], data_type, ind)["mqc_data"])
+        }
+        discovered = manifest["analysis_types"][data_type]
+        assert set(discovered) == with_reports
+        assert sorted(manifest["missing"][data_type]) == sorted(set(tree["individuals"]) - with_reports)
+        for ind, individual in discovered.items():
+            for name, path in individual["paths"].items():
+                assert individual["signatures"][name] == collect_results.file_signature(path), (ind, name)
+    assert manifest["missing"]["TF"]
@@ -0,0 +1,33 @@
+import io
+import os
+
+import collect_results
+
+
+def test_iter_eager_tsv_strips_line_endings_and_whitespace():
+    contents = "Sample_Name\tLibrary_ID\tUDG_Treatment \r\nABC001\tABC001.A0101\thalf \r\n\r\nABC001\tABC001.A0102\tnone\n"
+    rows = list(collect_results.iter_eager_tsv(io.StringIO(contents), ["Library_ID", "UDG_Treatment"]))
+    assert rows == [("ABC001.A0101", "half"), ("ABC001.A0102", "none")]
+
+
+def test_index_eager_inputs_equals_reading_each_tsv(tree):
+    columns = ["UDG_Treatment", "Strandedness"]
+    expected = {}
+    for ind in tree["individuals"]:
+        tsv = collect_results.get_individual_paths(tree["root_output_path"], "TF", ind)["tsv"]
+        if os.path.isfile(tsv):
+            for library, values in collect_results.get_eager_tsv_data(tsv, columns).items():
+                expected[library] = tuple(values[column] for column in columns)
+    assert expected
+    assert collect_results.index_eager_inputs(tree["root_output_path"], "TF", columns) == expected
+    assert collect_results.index_eager_inputs(tree["root_output_path"], "TF", columns, threads=4) == expected
+
+
+def test_index_eager_tsvs_skips_missing_files_and_the_last_tsv_wins(tmp_path):
+    header = "Sample_Name\tLibrary_ID\tUDG_Treatment\n"
+    first = tmp_path / "first.tsv"
+    first.write_text(header + "ABC001\tABC001.A0101\tnone\nABC001\tABC001.A0102\tnone\n")
+    second = tmp_path / "second.tsv"
+    second.write_text(header + "ABC001\tABC001.A0101\thalf\n")
+    index = collect_results.index_eager_tsvs([str(first), str(tmp_path / "missing.tsv"), str(second)], ["UDG_Treatment"])
+    assert index == {"ABC001.A0101": ("half",), "ABC001.A0102": ("none",)}
@@ -0,0 +1,64 @@
+import glob
+import json
+import os
+
+import pytest
+
+import collect_results
+
+GENERAL_STATS = {"ABC001.A0101.TF1.1": {"Picard_mqc-generalstats-picard-PERCENT_DUPLICATION": 0.5}}
+
+
+def write_json(path: str, data: dict, indent: int = 4) -> str:
+    with open(path, "w") as f:
+        json.dump(data, f, indent=indent)
+    return path
+
+
+@pytest.mark.parametrize("json_parser", collect_results.JSON_PARSERS)
+def test_json_parsers_agree_on_a_tree(tree, json_parser):
+    pytest.importorskip("ijson")
+    paths = sorted(glob.glob(os.path.join(tree["root_output_path"], "*", "*", "*", "multiqc", "multiqc_data", "multiqc_data.json")))
+    assert paths
+    for path in paths:
+        with open(path, "r") as f:
+            expected = json.load(f)["report_saved_raw_data"]["multiqc_general_stats"]
+        assert collect_results.read_general_stats(path, json_parser) == expected
+
+
+def test_json_parsers_ignore_keys_in_string_values_and_nested_objects(tmp_path):
+    pytest.importorskip("ijson")
+    data = {
+        "report_data_sources": {"report_saved_raw_data": {"multiqc_general_stats": {"nested": {}}}},
+        "report_plot_data": {
+            "title": '"report_saved_raw_data": {\n        "multiqc_general_stats": {"in a string": {}}}',
+            "samples": ["report_saved_raw_data", "multiqc_general_stats"],
+        },
+        "report_saved_raw_data": {
+            "multiqc_picard": {"multiqc_general_stats": {"nested module": {}}},
+            "multiqc_general_stats": GENERAL_STATS,
+        },
+        "config": {"multiqc_general_stats": {"after": {}}},
+    }
+    path = write_json(str(tmp_path / "multiqc_data.json"), data)
+    for json_parser in collect_results.JSON_PARSERS:
+        assert collect_results.read_general_stats(path, json_parser) == GENERAL_STATS
+
+
+def test_scan_does_not_match_keys_outside_the_saved_raw_data(tmp_path):
+    data = {
+        "report_saved_raw_data": {"multiqc_picard": {}},
+        "config": {"multiqc_general_stats": {"after": {}}},
+    }
+    path = write_json(str(tmp_path / "multiqc_data.json"), data)
+    assert collect_results._read_general_stats_scan(path) is None
+    with pytest.raises(KeyError):
+        collect_results.read_general_stats(path, "scan")
+
+
+def test_scan_falls_back_on_other_layouts(tmp_path):
+    data = {"report_plot_data": {}, "report_saved_raw_data": {"multiqc_general_stats": GENERAL_STATS}}
+    path = write_json(str(tmp_path / "multiqc_data.json"), data, indent=None)
+    assert collect_results._read_general_stats_scan(path) is None
+    assert collect_results.read_general_stats(path, "scan") == GENERAL_STATS
+    assert collect_results.read_general_stats(path, "auto") == GENERAL_STATS
@@ -0,0 +1,64 @@
+import os
+import pickle
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import collect_results
+from conftest import COLLECT_RESULTS_PATH
+
+MAIN_ID_LIST = "Full_Individual_Id\tMain_Individual_Id\nABC901\tABC001\nABC902\tABC002\n\nABC901\tABC003\n"
+
+
+def test_index_equals_reading_the_list(tmp_path):
+    list_path = tmp_path / "main_ids.txt"
+    list_path.write_text(MAIN_ID_LIST)
+    main_id_dict = collect_results.read_main_id_list(str(list_path))
+    index = collect_results.open_main_id_index(str(list_path), str(tmp_path / "cache"))
+    assert isinstance(index, collect_results.MainIdIndex)
+    ## The last line of an ID wins
+    assert main_id_dict == {"ABC901": "ABC003", "ABC902": "ABC002"}
+    for full_id in ["ABC901", "ABC902", "ABC001", "XYZ"]:
+        assert index.get(full_id) == main_id_dict.get(full_id)
+        assert (full_id in index) == (full_id in main_id_dict)
+    assert index.get("XYZ", "default") == "default"
+    with pytest.raises(KeyError):
+        index["XYZ"]
+    ## Worker processes and threads open their own connection
+    assert pickle.loads(pickle.dumps(index))["ABC901"] == "ABC003"
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert list(executor.map(collect_results.MainIdIndex(index.index_path).get, ["ABC901", "ABC902"] * 4)) == ["ABC003", "ABC002"] * 4
+
+
+def test_index_is_only_rebuilt_when_the_list_changes(tmp_path):
+    list_path = tmp_path / "main_ids.txt"
+    list_path.write_text(MAIN_ID_LIST)
+    cache_dir = str(tmp_path / "cache")
+    index_path = collect_results.open_main_id_index(str(list_path), cache_dir).index_path
+    inode = os.stat(index_path).st_ino
+    assert collect_results.open_main_id_index(str(list_path), cache_dir).index_path == index_path
+    assert os.stat(index_path).st_ino == inode
+
+    list_path.write_text(MAIN_ID_LIST + "ABC904\tABC004\n")
+    index = collect_results.open_main_id_index(str(list_path), cache_dir)
+    assert index["ABC904"] == "ABC004"
+    assert os.stat(index_path).st_ino != inode
+
+
+def test_malformed_lines_are_reported(make_tree, tmp_path):
+    list_path = tmp_path / "main_ids.txt"
+    list_path.write_text(MAIN_ID_LIST + "ABC905\n")
+    with pytest.raises(ValueError, match="Malformed line 6"):
+        collect_results.open_main_id_index(str(list_path), str(tmp_path / "cache"))
+    with pytest.raises(ValueError, match="Malformed line 6"):
+        collect_results.read_main_id_list(str(list_path))
+    tree = make_tree(analysis_types=["TF"])
+    result = subprocess.run(
+        [sys.executable, COLLECT_RESULTS_PATH, "-r", tree["root_output_path"], "-i", tree["input"], "-o", str(tmp_path / "out.tsv"),
+         "--main_id_list", str(list_path), "--cache_dir", str(tmp_path / "cache")],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    assert result.returncode == 1
+    assert "ERROR: Malformed line 6" in result.stderr
@@ -0,0 +1,57 @@
+import gzip
+import io
+
+import pytest
+
+import collect_results
+from conftest import read_rows, run_collect_results
+
+pd = pytest.importorskip("pandas")
+
+
+def read_tsv(file_path: str):
+    return pd.read_csv(io.StringIO("\n".join(read_rows(file_path))), sep="\t", na_values=["N/A"], keep_default_na=False)
+
+
+def read_footer(file_path: str) -> list:
+    with open(file_path, "r") as f:
+        return [line.rstrip("\n") for line in f if line.startswith("## ")]
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "feather", "csv.gz"])
+def test_output_formats_round_trip(tree, tmp_path, output_format):
+    if output_format != "csv.gz":
+        pytest.importorskip("pyarrow")
+    run_collect_results(tree, tmp_path / "collected_data.tsv", "-a", "TF", "SG", "--no_cache")
+    output = tmp_path / "collected_data.{}".format(output_format)
+    run_collect_results(tree, output, "-a", "TF", "SG", "--no_cache", "--format", output_format)
+    expected = read_tsv(tmp_path / "collected_data.tsv")
+
+    if output_format == "csv.gz":
+        with gzip.open(output, "rt") as f:
+            lines = f.read().splitlines()
+        df = pd.read_csv(io.StringIO("\n".join(line for line in lines if not line.startswith("## "))), keep_default_na=True)
+        footer = [line for line in lines if line.startswith("## ")]
+    else:
+        import pyarrow.feather
+        import pyarrow.parquet
+        table = pyarrow.parquet.read_table(output) if output_format == "parquet" else pyarrow.feather.read_table(output)
+        df = table.to_pandas()
+        footer = table.schema.metadata[b"collect_results"].decode().split("\n")
+
+    ## The same values, with numeric columns as numbers
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+    assert pd.api.types.is_numeric_dtype(df["Picard_mqc-generalstats-picard-PERCENT_DUPLICATION"])
+    assert footer[0] == read_footer(tmp_path / "collected_data.tsv")[0]
+    assert footer[1].endswith(" --format {}".format(output_format))
+
+
+def test_output_dataframe_has_real_missing_values():
+    df = collect_results.build_output_dataframe(
+        [["ABC001.A0101.TF1.1", "N/A", "1.5", "N/A"], ["ABC001.A0102.TF1.1", "12", "N/A", "half"]],
+        ["Sample", "snps_covered", "endogenous", "UDG_Treatment"],
+    )
+    assert pd.api.types.is_numeric_dtype(df["snps_covered"]) and pd.api.types.is_numeric_dtype(df["endogenous"])
+    assert df["snps_covered"].isna().tolist() == [True, False]
+    assert df["endogenous"].tolist()[0] == 1.5
+    assert df["UDG_Treatment"].isna().tolist() == [True, False]
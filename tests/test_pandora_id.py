@@ -0,0 +1,58 @@
+import pickle
+
+import pytest
+
+import pyPandoraHelper as pH
+from test_parse_ids import IDS, scalar
+
+
+@pytest.mark.parametrize("keep_ss_suffix", [False, True])
+def test_pandora_id_equals_the_scalar_functions(keep_ss_suffix):
+    for id in IDS:
+        pandora_id = pH.PandoraID(id)
+        for level in pH.ID_LEVELS:
+            expected = scalar(level, id, keep_ss_suffix)
+            if expected is None:
+                with pytest.raises(ValueError):
+                    pandora_id.get(level, keep_ss_suffix)
+            else:
+                assert pandora_id.get(level, keep_ss_suffix) == expected, (id, level)
+    assert pH.PandoraID("ABC001_ss.A0101").is_ss
+    assert pH.PandoraID("ABC001_ss.A0101").library_id == "ABC001.A0101"
+
+
+def test_pandora_ids_are_ordered_and_hashed_like_their_strings():
+    ids = ["ABC002.A0101", "ABC001.B0101", "ABB001", "ABC001.A0101.SG1.1", "ABC001.A0101"]
+    pandora_ids = [pH.PandoraID(id) for id in ids]
+    assert [str(pandora_id) for pandora_id in sorted(pandora_ids)] == sorted(ids)
+    assert pH.PandoraID("ABC001") < pH.PandoraID("ABC001.A0101") <= pH.PandoraID("ABC001.A0101")
+    assert pH.PandoraID("ABC002") > pH.PandoraID("ABC001.A0101")
+    assert pH.PandoraID("ABC001.A0101") == pH.PandoraID(" ABC001.A0101 ")
+    assert pH.PandoraID("ABC001.A0101") != "ABC001.A0101"
+    stats = {pandora_id: n for n, pandora_id in enumerate(pandora_ids)}
+    assert stats[pH.PandoraID("ABC001.B0101")] == 1
+    with pytest.raises(TypeError):
+        pH.PandoraID("ABC001") < "ABC002"
+
+
+def test_pandora_ids_are_immutable_and_picklable():
+    pandora_id = pH.PandoraID("ABC001_ss.A0101.SG1.1")
+    with pytest.raises(AttributeError):
+        pandora_id.ind_id = "ABC002"
+    with pytest.raises(AttributeError):
+        del pandora_id._id
+    with pytest.raises(AttributeError):
+        pandora_id.__dict__
+    copy = pickle.loads(pickle.dumps(pandora_id))
+    assert copy == pandora_id
+    assert copy.get("capture_id", keep_ss_suffix=True) == "ABC001_ss.A0101.SG1"
+
+
+def test_interned_pandora_ids_share_one_instance():
+    first = pH.PandoraID.intern("ABC001.A0101.SG1.1")
+    assert pH.PandoraID.intern("ABC001.A0101.SG1.1") is first
+    assert pH.PandoraID("ABC001.A0101.SG1.1") is not first
+    assert pH.PandoraID("ABC001.A0101.SG1.1") == first
+    ## Interned instances are only kept while they are in use
+    del first
+    assert "ABC001.A0101.SG1.1" not in pH.PandoraID._interned
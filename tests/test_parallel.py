@@ -0,0 +1,14 @@
+import pytest
+
+from conftest import run_collect_results
+
+
+@pytest.mark.parametrize("parallel_args", [["-t", "4"], ["--processes", "2"]])
+def test_parallel_output_is_identical_to_serial(tree, tmp_path, parallel_args):
+    output = tmp_path / "collected_data.tsv"
+    serial = run_collect_results(tree, output, "-a", "TF", "SG", "--no_cache")
+    serial_output = output.read_bytes()
+    parallel = run_collect_results(tree, output, "-a", "TF", "SG", "--no_cache", *parallel_args)
+    assert output.read_bytes() == serial_output
+    ## Results are reported in input order, so the messages are identical too
+    assert parallel.stderr == serial.stderr
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+import pyPandoraHelper as pH
+
+IDS = [
+    "ABC", "ABC001", "ABC001_ss", "ABCDE001_ss", "ABC001.A0101", "ABC001_ss.A0101", "ABC001.A0101.SG1",
+    "ABC001.A0101.SG1.1", "ABCDE001_ss.A0101.SG1.1", " ABC001.A0102.TF1.2 ", "ABC001.",
+]
+SCALAR_FUNCTIONS = {
+    "site_id": pH.get_site_id,
+    "ind_id": pH.get_ind_id,
+    "sample_id": pH.get_sample_id,
+    "extract_id": pH.get_extract_id,
+    "library_id": pH.get_library_id,
+    "capture_id": pH.get_capture_id,
+    "sequencing_id": pH.get_sequencing_id,
+}
+
+
+def scalar(level: str, id: str, keep_ss_suffix: bool):
+    '''
+    Returns the ID of a level from the scalar function, or None if it cannot be inferred.
+    '''
+    try:
+        return SCALAR_FUNCTIONS[level](id, keep_ss_suffix)
+    except (ValueError, IndexError):
+        return None
+
+
+@pytest.mark.parametrize("keep_ss_suffix", [False, True])
+def test_parse_ids_equals_the_scalar_functions(keep_ss_suffix):
+    parsed = pH.parse_ids(IDS, keep_ss_suffix)
+    assert parsed["pandora_id"] == IDS
+    for level in pH.ID_LEVELS:
+        assert parsed[level] == [scalar(level, id, keep_ss_suffix) for id in IDS], level
+
+
+@pytest.mark.parametrize("keep_ss_suffix", [False, True])
+def test_parse_ids_series_equals_parse_ids(keep_ss_suffix):
+    ids = pd.Series(IDS, index=range(10, 10 + len(IDS)))
+    parsed = pH.parse_ids_series(ids, keep_ss_suffix, levels=["site_id", "library_id"])
+    assert list(parsed.columns) == ["site_id", "library_id"]
+    assert list(parsed.index) == list(ids.index)
+    expected = pH.parse_ids(IDS, keep_ss_suffix, levels=["site_id", "library_id"])
+    assert parsed["site_id"].tolist() == expected["site_id"]
+    assert parsed["library_id"].tolist() == expected["library_id"]
+
+
+def test_parse_ids_errors():
+    assert pH.parse_ids(["ABC001"], levels=["site_id", "ind_id"], errors="raise")["ind_id"] == ["ABC001"]
+    with pytest.raises(ValueError, match="Library_ID"):
+        pH.parse_ids(["ABC001.A0101", "ABC001"], levels=["library_id"], errors="raise")
+    with pytest.raises(ValueError, match="Library_ID"):
+        pH.parse_ids_series(pd.Series(["ABC001"]), levels=["library_id"], errors="raise")
+    with pytest.raises(ValueError):
+        pH.parse_ids(["ABC001"], levels=["unknown_id"])
+    with pytest.raises(ValueError):
+        pH.parse_ids(["ABC001"], errors="ignore")
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import PY_HELPERS_PATH
+
+PANDORA_HELPER_PATH = os.path.join(PY_HELPERS_PATH, "pyPandoraHelper", "pyPandoraHelper.py")
+IDS = ["ABC001.A0101.SG1.1", "ABC001_ss", "ABC002.B0203"]
+
+
+def run_helper(*args: str, stdin: str = "") -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, PANDORA_HELPER_PATH, *args], input=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+
+
+@pytest.fixture
+def id_file(tmp_path):
+    file_path = tmp_path / "ids.txt"
+    file_path.write_text("\n".join(IDS) + "\n")
+    return str(file_path)
+
+
+def test_input_file_and_stdin_give_the_same_table(id_file):
+    from_file = run_helper("-i", id_file, "-H", "-g", "site_id,library_id")
+    assert from_file.returncode == 0, from_file.stderr
+    assert from_file.stdout.splitlines() == [
+        "pandora_id\tsite_id\tlibrary_id",
+        "ABC001.A0101.SG1.1\tABC\tABC001.A0101",
+        "ABC001_ss\tABC\t",
+        "ABC002.B0203\tABC\tABC002.B0203",
+    ]
+    ## The individual ID has no library ID, which is reported once for the whole input
+    assert "WARNING: 1 Pandora_IDs" in from_file.stderr
+    for input_args in [["-i", "-"], []]:
+        from_stdin = run_helper(*input_args, "-H", "-g", "site_id,library_id", stdin="\n".join(IDS) + "\n")
+        assert from_stdin.stdout == from_file.stdout
+
+
+def test_input_defaults_to_all_levels(id_file):
+    result = run_helper("-i", id_file)
+    assert result.returncode == 0, result.stderr
+    lines = result.stdout.splitlines()
+    assert len(lines) == len(IDS)
+    ## The Pandora_ID, followed by site, individual, sample, extract, library, capture and sequencing IDs
+    assert lines[0].split("\t")[:3] == ["ABC001.A0101.SG1.1", "ABC", "ABC001"]
+    assert len(lines[0].split("\t")) == 8
+
+
+def test_single_id_with_several_levels():
+    result = run_helper("ABC001.A0101", "-g", "sample_id,site_id")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == "ABC001.A\tABC\n"
+
+
+def test_input_file_and_pandora_id_are_exclusive(id_file):
+    result = run_helper("-i", id_file, "ABC001")
+    assert result.returncode == 2
+    assert "not allowed with argument -i/--input" in result.stderr
+
+
+def test_missing_input_file_is_a_usage_error(tmp_path):
+    result = run_helper("-i", str(tmp_path / "missing.txt"))
+    assert result.returncode == 2
+    assert "Cannot read the input file" in result.stderr
+    assert "Traceback" not in result.stderr
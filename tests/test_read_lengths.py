@@ -0,0 +1,40 @@
+import glob
+import os
+
+import pytest
+
+import collect_results
+
+pyEager = pytest.importorskip("pyEager")
+
+
+def pyeager_read_length_stats(results_dir: str) -> dict:
+    summary_stats = pyEager.parse_mapdamage_results(results_dir, os.path.basename(results_dir))["summary_stats"]
+    return {"mean": summary_stats["mean_readlength"][0], "median": summary_stats["median"][0], "std": summary_stats["std"][0]}
+
+
+def test_read_length_stats_equal_pyeager_on_a_tree(tree):
+    results_dirs = sorted(glob.glob(os.path.join(tree["root_output_path"], "*", "*", "*", "mapdamage", "results_*_rmdup")))
+    assert results_dirs
+    for results_dir in results_dirs:
+        stats = collect_results.read_length_stats(os.path.join(results_dir, "lgdistribution.txt"))
+        assert stats == pytest.approx(pyeager_read_length_stats(results_dir))
+
+
+@pytest.mark.parametrize("rows", [
+    ## Lengths on a single strand, and a median exactly at half of the occurrences
+    [("+", 30, 5), ("+", 35, 5), ("+", 40, 10)],
+    ## Lengths on both strands, only some of them on both
+    [("+", 30, 1), ("-", 30, 3), ("-", 31, 2), ("+", 45, 7), ("-", 60, 1)],
+])
+def test_read_length_stats_equal_pyeager_on_edge_cases(tmp_path, rows):
+    results_dir = tmp_path / "results_ABC001.A0101.TF1.1_rmdup"
+    results_dir.mkdir()
+    with open(results_dir / "lgdistribution.txt", "w") as f:
+        f.write("# table produced by mapDamage version 2.2.1\n# Std: strand of reads\nStd\tLength\tOccurences \n")
+        for row in rows:
+            f.write("{}\t{}\t{}\n".format(*row))
+    for name, column in [("3pGtoA_freq.txt", "3pG>A"), ("5pCtoT_freq.txt", "5pC>T")]:
+        (results_dir / name).write_text("pos\t{}\n1\t0.1\n".format(column))
+    stats = collect_results.read_length_stats(str(results_dir / "lgdistribution.txt"))
+    assert stats == pytest.approx(pyeager_read_length_stats(str(results_dir)))
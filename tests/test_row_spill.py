@@ -0,0 +1,30 @@
+import os
+import random
+
+import collect_results
+from conftest import read_rows, run_collect_results
+
+
+def test_spilled_rows_are_merged_in_order():
+    rng = random.Random(1)
+    keys = [("LIB{:03d}.A0101.TF1.1".format(i), data_type) for i in range(100) for data_type in ["SG", "TF"]]
+    rng.shuffle(keys)
+    spill = collect_results.SortedRowSpill(max_rows=7)
+    expected = {}
+    for n, key in enumerate(keys + keys[:20]):
+        spill.add(key, "row {}".format(n))
+        expected[key] = "row {}".format(n)
+    try:
+        assert len(spill._chunks) > 1
+        assert list(spill.sorted_rows()) == sorted(expected.items())
+        assert list(spill.sorted_rows(["TF"])) == sorted((key, row) for key, row in expected.items() if key[1] == "TF")
+    finally:
+        tmp_dir = spill._tmp_dir
+        spill.close()
+    assert not os.path.exists(tmp_dir)
+
+
+def test_max_rows_output_equals_default_output(tree, tmp_path):
+    run_collect_results(tree, tmp_path / "default.tsv", "-a", "TF", "SG", "--no_cache")
+    run_collect_results(tree, tmp_path / "spilled.tsv", "-a", "TF", "SG", "--no_cache", "--max_rows", "3")
+    assert read_rows(tmp_path / "spilled.tsv") == read_rows(tmp_path / "default.tsv")
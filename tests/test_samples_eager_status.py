@@ -0,0 +1,96 @@
+import os
+import shutil
+import subprocess
+import sys
+
+from conftest import REPO_PATH
+
+SAMPLES_EAGER_STATUS_PATH = os.path.join(REPO_PATH, "samples_eager_status", "samples_eager_status.py")
+
+
+def write_spawner_log(root: str, run: str, array_index: int, status: str) -> None:
+    log_dir = os.path.join(root, "array_Logs", run)
+    os.makedirs(log_dir, exist_ok=True)
+    with open(os.path.join(log_dir, "AE_spawner_{}.txt.o1234.{}".format(run, array_index)), "w") as f:
+        f.write("N E X T F L O W\n")
+        if status:
+            f.write("-[nf-core/eager] Pipeline completed {}-\n".format(status))
+
+
+def make_autorun_eager_root(root: str) -> None:
+    '''
+    Creates two queue files, where the later one runs ABC001 again, and the spawner logs of their array jobs.
+    '''
+    os.makedirs(root)
+    runs = {
+        "2026-01-01_Autorun_eager_queue.txt": ["ABC001", "ABC002_ss", "ABC0012"],
+        "2026-02-01_Autorun_eager_queue.txt": ["DEF001", "ABC001"],
+    }
+    for run, individuals in runs.items():
+        with open(os.path.join(root, run), "w") as f:
+            for ind in individuals:
+                f.write("cd /mnt/archgen/Autorun_eager/eager_outputs/TF/{}/{} ; nextflow run nf-core/eager -profile eva\n".format(ind[:3], ind))
+    write_spawner_log(root, "2026-01-01_Autorun_eager_queue.txt", 1, "successfully")
+    write_spawner_log(root, "2026-01-01_Autorun_eager_queue.txt", 2, "successfully")
+    write_spawner_log(root, "2026-01-01_Autorun_eager_queue.txt", 3, "with errors")
+    write_spawner_log(root, "2026-02-01_Autorun_eager_queue.txt", 1, "")
+    write_spawner_log(root, "2026-02-01_Autorun_eager_queue.txt", 2, "with errors")
+
+
+def run_samples_eager_status(root: str, input_path: str, *args: str) -> str:
+    result = subprocess.run(
+        [sys.executable, SAMPLES_EAGER_STATUS_PATH, "-i", input_path, "-r", root, *args],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_statuses_of_the_latest_runs(tmp_path):
+    root = str(tmp_path / "Autorun_eager")
+    make_autorun_eager_root(root)
+    input_path = tmp_path / "input.txt"
+    input_path.write_text("ABC001\nABC002\nABC0012\nDEF001\nXYZ001\n")
+    ## The last queue file listing an ID wins, IDs are matched as whole IDs, and _ss IDs also match the individual ID
+    assert run_samples_eager_status(root, str(input_path)) == "\n".join([
+        "ABC001\tPipeline-completed-with",
+        "ABC002\tPipeline-completed-successfully-",
+        "ABC0012\tPipeline-completed-with",
+        "DEF001\t",
+        "XYZ001\t",
+    ]) + "\n"
+
+
+def test_persisted_index_keeps_completed_runs(tmp_path):
+    root = str(tmp_path / "Autorun_eager")
+    make_autorun_eager_root(root)
+    input_path = tmp_path / "input.txt"
+    input_path.write_text("ABC002\nDEF001\n")
+    index_path = str(tmp_path / "index.json")
+    first = run_samples_eager_status(root, str(input_path), "--index", index_path)
+
+    ## Completed runs are answered from the index, without reading their logs again, while runs that had not completed are checked again
+    shutil.rmtree(os.path.join(root, "array_Logs", "2026-01-01_Autorun_eager_queue.txt"))
+    write_spawner_log(root, "2026-02-01_Autorun_eager_queue.txt", 1, "successfully")
+    assert first == "ABC002\tPipeline-completed-successfully-\nDEF001\t\n"
+    assert run_samples_eager_status(root, str(input_path), "--index", index_path) == "ABC002\tPipeline-completed-successfully-\nDEF001\tPipeline-completed-successfully-\n"
+
+    ## A changed queue file is read again, and the statuses of its runs are no longer taken from the index
+    with open(os.path.join(root, "2026-01-01_Autorun_eager_queue.txt"), "a") as f:
+        f.write("cd /mnt/archgen/Autorun_eager/eager_outputs/TF/GHI/GHI001 ; nextflow run nf-core/eager -profile eva\n")
+    assert run_samples_eager_status(root, str(input_path), "--index", index_path) == "ABC002\t\nDEF001\tPipeline-completed-successfully-\n"
+
+
+def test_output_equals_the_shell_script(tmp_path):
+    root = str(tmp_path / "Autorun_eager")
+    make_autorun_eager_root(root)
+    input_path = tmp_path / "input.txt"
+    ## Without IDs that are substrings of other IDs, which the shell script also matches
+    input_path.write_text("ABC001\nABC002\nDEF001\nXYZ001\n")
+    with open(os.path.join(REPO_PATH, "samples_eager_status", "samples_eager_status.sh"), "r") as f:
+        script = f.read().replace("/mnt/archgen/Autorun_eager", root)
+    script_path = tmp_path / "samples_eager_status.sh"
+    script_path.write_text(script)
+    result = subprocess.run(["bash", str(script_path), "-i", str(input_path)], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    assert result.returncode == 0, result.stderr
+    assert run_samples_eager_status(root, str(input_path)) == result.stdout
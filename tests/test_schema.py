@@ -0,0 +1,116 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+import collect_results
+from conftest import COLLECT_RESULTS_PATH, read_rows, run_collect_results
+
+MARKER_25 = "mapDamage_mqc-generalstats-mapdamage-mapdamage_3_Prime1"
+MARKER_24 = "DamageProfiler_mqc-generalstats-damageprofiler-3_Prime1"
+SNPS_25 = "base snp_coverage_mqc-generalstats-base_snp_coverage-Covered_Snps"
+SNPS_24 = "snp_coverage_mqc-generalstats-snp_coverage-Covered_Snps"
+ENDOGENOUS_25 = "base endorSpy_mqc-generalstats-base_endorspy-endogenous_dna"
+ENDOGENOUS_24 = "endorSpy_mqc-generalstats-endorspy-endogenous_dna"
+FLAGSTAT_TOTAL = "Samtools Flagstat (pre-samtools filter)_mqc-generalstats-samtools_flagstat_pre_samtools_filter-flagstat_total"
+
+
+def project(stats: dict, schema: dict = None) -> dict:
+    schema = collect_results.compile_schema(collect_results.BUILTIN_SCHEMA) if schema is None else schema
+    return collect_results.project_library_stats({"ABC001.A0101.TF1.1": stats}, schema)["ABC001.A0101.TF1.1"]
+
+
+def test_projection_of_each_eager_version():
+    row = project({MARKER_25: 0.2, SNPS_25: 100, ENDOGENOUS_25: 1.5, FLAGSTAT_TOTAL: 1000})
+    assert (row[collect_results.SCHEMA_VERSION_KEY], row["snps_covered"], row["endogenous"], row[FLAGSTAT_TOTAL]) == ("eager-2.5", 100, 1.5, 1000)
+    row = project({MARKER_24: 0.2, SNPS_24: 200, ENDOGENOUS_24: 2.5})
+    assert (row[collect_results.SCHEMA_VERSION_KEY], row["snps_covered"], row["endogenous"], row[FLAGSTAT_TOTAL]) == ("eager-2.4", 200, 2.5, "N/A")
+    ## Every output column is present, whether or not it has a source
+    assert list(row) == [column["header"] for column in collect_results.BUILTIN_SCHEMA["columns"]] + [collect_results.SCHEMA_VERSION_KEY]
+
+
+def test_projection_of_mixed_and_partial_key_sets():
+    ## A 2.5 report with a stat only under its 2.4 key, and an earlier column missing, keeps all later columns
+    row = project({MARKER_25: 0.2, SNPS_24: 300, ENDOGENOUS_25: 3.5, ENDOGENOUS_24: 9.9})
+    assert row[collect_results.SCHEMA_VERSION_KEY] == "eager-2.5"
+    assert (row["snps_covered"], row["endogenous"], row["snps_total"]) == (300, 3.5, "N/A")
+    ## Without a marker, the keys of any version are used
+    row = project({SNPS_24: 400, ENDOGENOUS_25: 4.5})
+    assert (row[collect_results.SCHEMA_VERSION_KEY], row["snps_covered"], row["endogenous"]) == (None, 400, 4.5)
+
+
+def test_columns_are_resolved_once_per_key_set():
+    schema = collect_results.compile_schema(collect_results.BUILTIN_SCHEMA)
+    libraries = {"ABC001.A010{}.TF1.1".format(i): {MARKER_25: i, SNPS_25: i} for i in range(5)}
+    libraries["ABC002.A0101.TF1.1"] = {MARKER_24: 1, SNPS_24: 2}
+    projected = collect_results.project_library_stats(libraries, schema)
+    assert [projected[library]["snps_covered"] for library in libraries] == [0, 1, 2, 3, 4, 2]
+    assert len(schema["resolved"]) == 2
+
+
+def test_dumped_schema_reproduces_the_builtin_schema(tree, tmp_path):
+    schema_path = tmp_path / "schema.json"
+    result = subprocess.run([sys.executable, COLLECT_RESULTS_PATH, "--dump_schema"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    assert result.returncode == 0, result.stderr
+    schema_path.write_text(result.stdout)
+    assert collect_results.load_schema(str(schema_path))["fingerprint"] == collect_results.DEFAULT_SCHEMA["fingerprint"]
+    run_collect_results(tree, tmp_path / "builtin.tsv", "-a", "TF", "SG", "--no_cache")
+    run_collect_results(tree, tmp_path / "dumped.tsv", "-a", "TF", "SG", "--no_cache", "--schema", str(schema_path))
+    assert read_rows(tmp_path / "dumped.tsv") == read_rows(tmp_path / "builtin.tsv")
+
+
+def test_yaml_schema_with_a_new_version(tree, tmp_path):
+    pytest.importorskip("yaml")
+    schema_path = tmp_path / "schema.yaml"
+    schema_path.write_text("""
+versions:
+  - name: eager-3.0
+    markers: [new_marker]
+  - name: eager-2.5
+    markers: ["{marker_25}"]
+  - name: eager-2.4
+    markers: ["{marker_24}"]
+library_key_separators: [_udg]
+columns:
+  - name: Covered_SNPs
+    header: snps_covered
+    sources:
+      eager-3.0: [new_snps]
+      eager-2.5: ["{snps_25}"]
+      eager-2.4: ["{snps_24}"]
+  - name: Data_type
+    header: Data_type
+""".format(marker_25=MARKER_25, marker_24=MARKER_24, snps_25=SNPS_25, snps_24=SNPS_24))
+    schema = collect_results.load_schema(str(schema_path))
+    assert schema["output_columns"] == {"Covered_SNPs": "snps_covered", "Data_type": "Data_type"}
+    row = project({"new_marker": 1, "new_snps": 500, SNPS_25: 1}, schema)
+    assert (row[collect_results.SCHEMA_VERSION_KEY], row["snps_covered"]) == ("eager-3.0", 500)
+
+    ## Only the columns of the schema are written, with the same values as with the built-in schema
+    run_collect_results(tree, tmp_path / "builtin.tsv", "-a", "TF", "--no_cache")
+    run_collect_results(tree, tmp_path / "custom.tsv", "-a", "TF", "--no_cache", "--schema", str(schema_path), "-H")
+    builtin_rows = [row.split("\t") for row in read_rows(tmp_path / "builtin.tsv")]
+    columns = [0, builtin_rows[0].index("snps_covered"), builtin_rows[0].index("Data_type")]
+    custom_rows = read_rows(tmp_path / "custom.tsv")
+    assert custom_rows[0] == "Sample\tCovered_SNPs\tData_type"
+    assert custom_rows[1:] == ["\t".join(row[i] for i in columns) for row in builtin_rows[1:]]
+
+
+@pytest.mark.parametrize("schema, message", [
+    ([], "must be a mapping"),
+    ({"versions": [], "columns": [{"name": "a"}]}, "must have a 'name' and a 'header'"),
+    ({"versions": [], "columns": [{"name": "a", "header": "a"}, {"name": "a", "header": "b"}]}, "appears more than once"),
+    ({"versions": [], "columns": [{"name": "a", "header": "a", "sources": {"eager-9": ["a"]}}]}, "unknown version"),
+])
+def test_invalid_schemas_are_rejected(tree, tmp_path, schema, message):
+    schema_path = tmp_path / "schema.json"
+    schema_path.write_text(json.dumps(schema))
+    with pytest.raises(ValueError, match=message):
+        collect_results.load_schema(str(schema_path))
+    result = subprocess.run(
+        [sys.executable, COLLECT_RESULTS_PATH, "-r", tree["root_output_path"], "-i", tree["input"], "-o", str(tmp_path / "out.tsv"), "--schema", str(schema_path)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    assert result.returncode == 1
+    assert "ERROR: Cannot load schema" in result.stderr
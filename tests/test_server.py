@@ -0,0 +1,124 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from conftest import COLLECT_RESULTS_PATH, PY_HELPERS_PATH, read_rows, run_collect_results
+
+
+def get_free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def server(tree, tmp_path):
+    '''
+    Starts the query server on the synthetic tree, and returns its URL. The server is stopped after the test.
+    '''
+    port = get_free_port()
+    command = [
+        sys.executable, COLLECT_RESULTS_PATH, "serve",
+        "-r", tree["root_output_path"],
+        "--main_id_list", tree["main_id_list"],
+        "--cache_dir", str(tmp_path / "cache"),
+        "--eager_status_root", str(tmp_path / "no_Autorun_eager"),
+        "--port", str(port),
+    ]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PY_HELPERS_PATH, os.environ.get("PYTHONPATH")])))
+    ## The request log goes to a file, so that a full pipe never blocks the server
+    log = tmp_path / "server.log"
+    with open(log, "w") as log_handle:
+        process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=log_handle)
+    try:
+        deadline = time.monotonic() + 30
+        while "Serving on" not in log.read_text():
+            if process.poll() is not None or time.monotonic() > deadline:
+                pytest.fail("The query server did not start:\n" + log.read_text())
+            time.sleep(0.05)
+        yield "http://127.0.0.1:{}".format(port)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def request(url: str, endpoint: str, query=None):
+    '''
+    Returns the status code and the JSON reply of the query server.
+    '''
+    data = None if query is None else (query if isinstance(query, bytes) else json.dumps(query).encode())
+    try:
+        with urllib.request.urlopen(urllib.request.Request("{}/{}".format(url, endpoint), data=data)) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_health(server, tree):
+    code, reply = request(server, "health")
+    assert code == 200
+    assert reply["root_output_path"] == os.path.abspath(tree["root_output_path"])
+    assert reply["eager_status_root"] is None
+    assert reply["entries"] == 0
+
+
+def test_stats_are_answered_from_memory(server, tree):
+    ind = tree["individuals"][0]
+    code, reply = request(server, "stats", {"individuals": [ind], "analysis_types": ["TF", "SG"]})
+    assert code == 200
+    assert [(result["individual"], result["analysis_type"]) for result in reply["results"]] == [(ind, "TF"), (ind, "SG")]
+    assert {result["status"] for result in reply["results"]} == {"collected"}
+    code, again = request(server, "stats", {"tasks": [[ind, "TF"]]})
+    assert code == 200
+    assert again["results"][0]["status"] == "cached"
+    assert again["results"][0]["stats"] == reply["results"][0]["stats"]
+
+
+@pytest.mark.parametrize(
+    "endpoint, query, expected_code",
+    [
+        ("stats", {"tasks": [["ABC001", "XX"]]}, 400),
+        ("stats", {"individuals": ["ABC001"]}, 400),
+        ("stats", b"not json", 400),
+        ("status", {"individuals": ["ABC001"]}, 400),
+        ("unknown", {}, 404),
+    ],
+)
+def test_invalid_queries_are_rejected(server, endpoint, query, expected_code):
+    code, reply = request(server, endpoint, query)
+    assert code == expected_code
+    assert reply["error"]
+
+
+def test_unknown_sample_is_reported(server, tree):
+    ind = tree["individuals"][0]
+    mqc_data = os.path.join(tree["root_output_path"], "TF", ind[:3], ind, "multiqc", "multiqc_data", "multiqc_data.json")
+    with open(mqc_data, "r") as f:
+        data = json.load(f)
+    general_stats = data["report_saved_raw_data"]["multiqc_general_stats"]
+    ## Drop the sample stats, so that the libraries of the individual have no sample to belong to
+    for key in [key for key in general_stats if "." not in key]:
+        del general_stats[key]
+    with open(mqc_data, "w") as f:
+        json.dump(data, f, indent=4)
+    code, reply = request(server, "stats", {"tasks": [[ind, "TF"]]})
+    assert code == 404
+    assert "Unknown sample for library: {}".format(ind) in reply["error"]
+    ## The server keeps answering other queries
+    code, reply = request(server, "stats", {"tasks": [[tree["individuals"][1], "TF"]]})
+    assert code == 200
+
+
+def test_server_output_is_identical(server, tree, tmp_path):
+    output = tmp_path / "collected_data.tsv"
+    run_collect_results(tree, output, "-a", "TF", "SG", "--no_cache")
+    plain_rows = read_rows(output)
+    run_collect_results(tree, output, "-a", "TF", "SG", "--server", server)
+    assert read_rows(output) == plain_rows
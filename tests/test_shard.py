@@ -0,0 +1,20 @@
+import subprocess
+import sys
+
+from conftest import COLLECT_RESULTS_PATH, read_rows, run_collect_results
+
+
+def test_shards_and_merge_equal_an_unsharded_run(tree, tmp_path):
+    run_collect_results(tree, tmp_path / "unsharded.tsv", "-a", "TF", "SG", "--no_cache")
+    shards = []
+    for i in range(1, 4):
+        shards.append(str(tmp_path / "shard_{}.tsv".format(i)))
+        run_collect_results(tree, shards[-1], "-a", "TF", "SG", "--no_cache", "--shard", "{}/3".format(i))
+    ## The two sites of the tree are collected by different shards, and the remaining shard has no rows
+    assert sorted(len(read_rows(shard)) > 1 for shard in shards) == [False, True, True]
+    result = subprocess.run(
+        [sys.executable, COLLECT_RESULTS_PATH, "merge", "-o", str(tmp_path / "merged.tsv"), *shards],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert read_rows(tmp_path / "merged.tsv") == read_rows(tmp_path / "unsharded.tsv")
@@ -0,0 +1,26 @@
+import sqlite3
+
+from conftest import read_rows, run_collect_results
+
+
+def read_library_stats(db_path: str) -> list:
+    '''
+    Returns all rows of the library_stats table of a SQLite database, without the time of collection.
+    '''
+    connection = sqlite3.connect(db_path)
+    try:
+        cursor = connection.execute("SELECT * FROM library_stats ORDER BY Library_ID, Data_type, Report_mtime")
+        columns = [description[0] for description in cursor.description]
+        return [{name: value for name, value in zip(columns, row) if name != "Collected_at"} for row in cursor]
+    finally:
+        connection.close()
+
+
+def test_rerunning_the_sqlite_sink_is_idempotent(tree, tmp_path):
+    db_path = str(tmp_path / "library_stats.sqlite")
+    run_collect_results(tree, tmp_path / "first.tsv", "-a", "TF", "SG", "--no_cache", "--sqlite", db_path)
+    first = read_library_stats(db_path)
+    run_collect_results(tree, tmp_path / "second.tsv", "-a", "TF", "SG", "--no_cache", "--sqlite", db_path)
+    ## One row per library and analysis type, which is replaced rather than added again
+    assert len(first) == len(read_rows(tmp_path / "first.tsv")) - 1
+    assert read_library_stats(db_path) == first
@@ -0,0 +1,51 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import startup_budget
+from conftest import COLLECT_RESULTS_PATH, PY_HELPERS_PATH
+
+## The budget of benchmarks/startup_budget.py, on top of the imports of a bare interpreter
+BUDGET_MS = 100
+
+## Runs collect_results.py as __main__ with the given arguments, and prints the names of all modules imported on the way
+LIST_MODULES = '''
+import json, runpy, sys
+sys.argv = sys.argv[1:]
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+except SystemExit:
+    pass
+print(json.dumps(sorted(sys.modules)))
+'''
+
+
+def list_modules(*args: str) -> set:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PY_HELPERS_PATH, os.environ.get("PYTHONPATH")])))
+    result = subprocess.run(
+        [sys.executable, "-c", LIST_MODULES, COLLECT_RESULTS_PATH, *args],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True,
+    )
+    return {name.split(".")[0] for name in json.loads(result.stdout.splitlines()[-1])}
+
+
+@pytest.mark.parametrize("command", ["--version", "--help"])
+def test_heavy_modules_are_not_imported(command):
+    modules = list_modules(command)
+    ## The modules that collect_results.py imports at the top are listed, so the check can see them
+    assert {"pyPandoraHelper", "sqlite3", "argparse"} <= modules
+    ## pandas, numpy, pyEager and the other heavy dependencies are only imported on the code paths that need them
+    assert sorted(modules & {"pandas", "numpy", "pyEager"}) == []
+    assert sorted(modules & set(startup_budget.LAZY_MODULES)) == []
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="Wall-clock budgets are only checked with RUN_BENCHMARKS=1.")
+@pytest.mark.parametrize("command", ["--version", "--help"])
+def test_startup_stays_within_budget(command):
+    baseline = set(startup_budget.parse_importtime(startup_budget.run_importtime(["-c", "pass"])))
+    import_ms, _ = startup_budget.measure([startup_budget.COLLECT_RESULTS_PATH, command], baseline, 5)
+    assert import_ms <= BUDGET_MS
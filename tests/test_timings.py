@@ -0,0 +1,46 @@
+import json
+
+from conftest import read_rows, run_collect_results
+
+
+def test_timings_json_report(tree, tmp_path):
+    output = tmp_path / "collected_data.tsv"
+    run_collect_results(tree, output, "-a", "TF", "SG", "--no_cache")
+    plain_rows = read_rows(output)
+    timings = tmp_path / "timings.json"
+    result = run_collect_results(tree, output, "-a", "TF", "SG", "--no_cache", "--timings", str(timings), "--slowest", "3")
+    ## Timing the run does not change its output
+    assert read_rows(output) == plain_rows
+    with open(timings, "r") as f:
+        report = json.load(f)
+    assert list(report["stages"]) == ["setup", "collect", "mapdamage", "write", "total"]
+    assert report["bytes_on_disk"] == sum(timing["bytes_on_disk"] for timing in report["individuals"] + report["libraries"])
+    statuses = {timing["status"] for timing in report["individuals"]}
+    assert statuses == {"collected", "missing"}
+    for timing in report["individuals"]:
+        if timing["status"] == "collected":
+            assert timing["bytes_on_disk"] > 0
+            assert "signatures_are_consistent" in timing["seconds"]
+            assert "get_individual_library_stats" in timing["seconds"]
+        else:
+            assert timing["bytes_on_disk"] == 0
+    assert len(report["slowest"]) == 3
+    assert result.stderr.count(" bytes on disk") == 3
+
+
+def test_timings_tsv_report(make_tree, tmp_path):
+    tree = make_tree(n_individuals=20)
+    output = tmp_path / "collected_data.tsv"
+    timings = tmp_path / "timings.tsv"
+    run_collect_results(tree, output, "--no_cache", "--timings", str(timings))
+    with open(timings, "r") as f:
+        lines = f.read().splitlines()
+    header = lines[0].split("\t")
+    assert header[:4] == ["Individual", "Analysis_type", "Status", "Total_seconds"]
+    assert "signatures_are_consistent" in header
+    assert header[-1] == "Bytes_on_disk"
+    rows = [line.split("\t") for line in lines[1:] if not line.startswith("## ")]
+    assert len(rows) == 20
+    footer = [int(line.split(": ")[1]) for line in lines if line.startswith("## Bytes on disk: ")]
+    ## The total also counts the mapDamage results read for each library
+    assert len(footer) == 1 and footer[0] >= sum(int(row[-1]) for row in rows) > 0
@@ -0,0 +1,34 @@
+import os
+import re
+import time
+
+import collect_results
+from conftest import read_rows, run_collect_results
+
+
+def test_update_equals_a_full_run(make_tree, tmp_path):
+    tree = make_tree(analysis_types=["TF", "SG"])
+    ## The previous table lacks the last individuals, which are then added to the input list
+    partial_input = tmp_path / "partial_input.txt"
+    partial_input.write_text("\n".join(tree["individuals"][:-5]) + "\n")
+    run_collect_results(tree, tmp_path / "previous.tsv", "-a", "TF", "SG", "--no_cache", "-i", str(partial_input), input_list=False)
+
+    ## The report of one individual that is already in the table changes after it was written
+    ind = [ind for ind in tree["individuals"][:-5] if os.path.isfile(collect_results.get_individual_paths(tree["root_output_path"], "SG", ind)["mqc_data"])][0]
+    paths = collect_results.get_individual_paths(tree["root_output_path"], "SG", ind)
+    field = '"Picard_mqc-generalstats-picard-PERCENT_DUPLICATION": '
+    with open(paths["mqc_data"], "r") as f:
+        contents = f.read()
+    with open(paths["mqc_data"], "w") as f:
+        f.write(contents.replace(field, field + "1", 1))
+    newer = time.time() + 10
+    for path in [paths["mqc_data"], paths["report"]]:
+        os.utime(path, (newer, newer))
+
+    result = run_collect_results(tree, tmp_path / "updated.tsv", "-a", "TF", "SG", "--no_cache", "--update", str(tmp_path / "previous.tsv"))
+    run_collect_results(tree, tmp_path / "full.tsv", "-a", "TF", "SG", "--no_cache")
+    ## Only the new individuals, the changed one and those without results are collected again
+    n_collected = int(re.search(r"Found (\d+) new or changed individuals", result.stderr).group(1))
+    assert 11 <= n_collected < 2 * len(tree["individuals"]) - 10
+    assert read_rows(tmp_path / "updated.tsv") == read_rows(tmp_path / "full.tsv")
+    assert read_rows(tmp_path / "updated.tsv") != read_rows(tmp_path / "previous.tsv")
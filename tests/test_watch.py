@@ -0,0 +1,91 @@
+import json
+import os
+import time
+
+import collect_results
+from conftest import read_rows
+
+
+class OneChangeWatcher:
+    '''
+    Reports a single change on the first wait, and interrupts the watch mode on the next.
+    '''
+    def __init__(self, changed: set):
+        self.changed = changed
+
+    def wait(self, timeout: float) -> set:
+        if self.changed is None:
+            raise KeyboardInterrupt
+        changed, self.changed = self.changed, None
+        return changed
+
+
+def test_watch_collects_reports_older_than_the_table(make_tree, tmp_path, monkeypatch):
+    tree = make_tree(analysis_types=["TF"])
+    output = str(tmp_path / "collected_data.tsv")
+    ind = [ind for ind in tree["individuals"] if os.path.isfile(collect_results.get_individual_paths(tree["root_output_path"], "TF", ind)["mqc_data"])][0]
+    paths = collect_results.get_individual_paths(tree["root_output_path"], "TF", ind)
+    watcher = OneChangeWatcher(None)
+    monkeypatch.setattr(collect_results, "get_watcher", lambda *args: watcher)
+    argv = ["-r", tree["root_output_path"], "-i", tree["input"], "--main_id_list", tree["main_id_list"], "-o", output, "--no_cache"]
+
+    ## The first collection writes the table, and then the watch mode is interrupted
+    collect_results.main(argv + ["--watch", "1"])
+    assert all("12345.678" not in row for row in read_rows(output))
+
+    ## Rewrite the report of an individual with modification times older than the table, e.g. when copied from elsewhere
+    with open(paths["mqc_data"], "r") as f:
+        data = json.load(f)
+    general_stats = data["report_saved_raw_data"]["multiqc_general_stats"]
+    library = sorted(name for name in general_stats if "." in name)[0]
+    general_stats[library]["Picard_mqc-generalstats-picard-PERCENT_DUPLICATION"] = 12345.678
+    with open(paths["mqc_data"], "w") as f:
+        json.dump(data, f)
+    an_hour_ago = time.time() - 3600
+    for path in [paths["mqc_data"], paths["report"]]:
+        os.utime(path, (an_hour_ago, an_hour_ago))
+
+    watcher.changed = {(ind, "TF")}
+    collect_results.main(argv + ["--watch", "1"])
+    rows = read_rows(output)
+    column = rows[0].split("\t").index("Picard_mqc-generalstats-picard-PERCENT_DUPLICATION")
+    assert [row for row in rows if row.startswith(library + "\t")][0].split("\t")[column] == "12345.678"
+
+
+class ScriptedWatcher:
+    '''
+    On each wait, runs the next step of a script, which returns the changes to report. Interrupts the watch mode when the
+    script is done.
+    '''
+    def __init__(self, steps: list):
+        self.steps = list(steps)
+
+    def wait(self, timeout: float) -> set:
+        if not self.steps:
+            raise KeyboardInterrupt
+        return self.steps.pop(0)()
+
+
+def test_watch_waits_for_the_report_written_after_the_data(make_tree, tmp_path, monkeypatch):
+    tree = make_tree(analysis_types=["TF"])
+    output = str(tmp_path / "collected_data.tsv")
+    ind = [ind for ind in tree["individuals"] if os.path.isfile(collect_results.get_individual_paths(tree["root_output_path"], "TF", ind)["mqc_data"])][0]
+    paths = collect_results.get_individual_paths(tree["root_output_path"], "TF", ind)
+    argv = ["-r", tree["root_output_path"], "-i", tree["input"], "--main_id_list", tree["main_id_list"], "--no_cache"]
+    collect_results.main(argv + ["-o", str(tmp_path / "full.tsv")])
+
+    ## MultiQC has written the data of a new individual, but not its report yet
+    report_path = str(tmp_path / "multiqc_report.html")
+    os.rename(paths["report"], report_path)
+
+    def write_report() -> set:
+        os.rename(report_path, paths["report"])
+        now = time.time()
+        for path in [paths["mqc_data"], paths["report"]]:
+            os.utime(path, (now, now))
+        return set()
+
+    watcher = ScriptedWatcher([lambda: {(ind, "TF")}, write_report])
+    monkeypatch.setattr(collect_results, "get_watcher", lambda *args: watcher)
+    collect_results.main(argv + ["-o", output, "--watch", "1"])
+    assert read_rows(output) == read_rows(tmp_path / "full.tsv")